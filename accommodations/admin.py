@@ -4,6 +4,11 @@ from django.contrib.auth.models import Group
 from accommodations import forms
 from django import forms
 from .models import Accommodation, Location, AccommodationImage, LandlordProfile, StudentProfile, SiteContent
+from .models import SearchFilterDaily, SearchQueryDaily
+from .services.cache_service import invalidate_on_commit, landlord_tags, listing_tags
+from .services.notification_service import ACCOMMODATION_APPROVED, LANDLORD_VERIFIED, NotificationService
+from .services.suggest_service import SuggestService
+from seo.services.area_stats_service import AreaStatsService
 from django.db import models
 from django.utils import timezone
 
@@ -23,26 +28,41 @@ class AccommodationAdmin(admin.ModelAdmin):
     inlines = [AccommodationImageInline]
     actions = ['approve_accommodations', 'disapprove_accommodations']
 
+    def _bulk_update(self, queryset, **changes):
+        # update() sends no post_save, so invalidate the cached pages ourselves
+        # and bump updated_at (Last-Modified, sitemap lastmod) like a save would
+        rows = list(queryset.values_list('pk', 'location_id', 'landlord_id'))
+        queryset.update(**changes, updated_at=timezone.now())
+        tags = [tag for row in rows for tag in listing_tags(*row)]
+        if tags:
+            invalidate_on_commit(*tags)
+        if 'is_approved' in changes:
+            AreaStatsService.refresh_on_commit(location_ids={location_id for _, location_id, _ in rows})
+
     def approve_accommodations(self, request, queryset):
-        queryset.update(is_approved=True)
+        newly_approved = list(queryset.filter(is_approved=False).values_list('pk', flat=True))
+        self._bulk_update(queryset, is_approved=True)
+        NotificationService.notify(ACCOMMODATION_APPROVED, newly_approved)
     approve_accommodations.short_description = "Approve selected accommodations"
 
     def disapprove_accommodations(self, request, queryset):
-        queryset.update(is_approved=False)
+        self._bulk_update(queryset, is_approved=False)
     disapprove_accommodations.short_description = "Disapprove selected accommodations"
 
     def feature_accommodations(self, request, queryset):
-        queryset.update(is_featured=True)
+        self._bulk_update(queryset, is_featured=True)
     feature_accommodations.short_description = "Mark selected as featured"
 
     def unfeature_accommodations(self, request, queryset):
-        queryset.update(is_featured=False)
+        self._bulk_update(queryset, is_featured=False)
     unfeature_accommodations.short_description = "Remove featured from selected"
 
 
 @admin.register(Location)
 class LocationAdmin(admin.ModelAdmin):
-    list_display = ['name']
+    list_display = ['name', 'subregion']
+    list_filter = ['subregion__region']
+    list_select_related = ['subregion__region']
     search_fields = ['name']
 
 @admin.register(AccommodationImage)
@@ -63,12 +83,28 @@ class LandlordProfileAdmin(admin.ModelAdmin):
     search_fields = ['user__username', 'company_name']
     actions = ['verify_landlords', 'unverify_landlords']
 
+    def _bulk_update(self, queryset, **changes):
+        # update() sends no post_save, so invalidate the cached pages ourselves
+        rows = list(queryset.values_list('user_id', 'company_name', 'is_verified'))
+        queryset.update(**changes)
+        # Their listings' pages show the profile, so they count as updated too
+        Accommodation.objects.filter(landlord_id__in=[row[0] for row in rows]).update(updated_at=timezone.now())
+        tags = [tag for landlord_id, _, _ in rows for tag in landlord_tags(landlord_id)]
+        if tags:
+            invalidate_on_commit(*tags)
+        if 'is_verified' in changes:
+            for landlord_id, company_name, is_verified in rows:
+                if is_verified != changes['is_verified']:
+                    SuggestService.landlord_changed(landlord_id, company_name, changes['is_verified'])
+
     def verify_landlords(self, request, queryset):
-        queryset.update(is_verified=True)
+        newly_verified = list(queryset.filter(is_verified=False).values_list('user_id', flat=True))
+        self._bulk_update(queryset, is_verified=True)
+        NotificationService.notify(LANDLORD_VERIFIED, newly_verified)
     verify_landlords.short_description = "Verify selected landlords"
 
     def unverify_landlords(self, request, queryset):
-        queryset.update(is_verified=False)
+        self._bulk_update(queryset, is_verified=False)
     unverify_landlords.short_description = "Unverify selected landlords"
 
 # Create landlord group in admin
@@ -153,3 +189,42 @@ admin.site.site_header = "StudentPA Admin"
 admin.site.site_title = "StudentPA Admin Portal"
 # admin.site.site_title = "Clothing Exchange"
 admin.site.index_title = "Welcome to StudentPA Administration"
+
+
+class ZeroResultsFilter(admin.SimpleListFilter):
+    title = 'results'
+    parameter_name = 'results'
+
+    def lookups(self, request, model_admin):
+        return [('none', 'Searches that found nothing')]
+
+    def queryset(self, request, queryset):
+        if self.value() == 'none':
+            return queryset.filter(zero_result_searches__gt=0)
+        return queryset
+
+
+class SearchRollupAdmin(admin.ModelAdmin):
+    # Rebuilt hourly by SearchAnalyticsService.rollup; read-only here
+    date_hierarchy = 'date'
+    list_filter = ['date', ZeroResultsFilter]
+    ordering = ['-date', '-searches']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(SearchQueryDaily)
+class SearchQueryDailyAdmin(SearchRollupAdmin):
+    list_display = ['query', 'date', 'searches', 'zero_result_searches']
+    search_fields = ['query']
+
+
+@admin.register(SearchFilterDaily)
+class SearchFilterDailyAdmin(SearchRollupAdmin):
+    list_display = ['filters', 'date', 'searches', 'zero_result_searches', 'p95_latency_ms']
+    search_fields = ['filters']
+    ordering = ['-date', '-p95_latency_ms']
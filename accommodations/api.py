@@ -0,0 +1,202 @@
+"""
+Read-only JSON API, v1 (mounted at /api/v1/). Rows are read with values()
+projections; `fields=a,b` limits a response to those fields. Responses use
+the same ETags and page cache tags as the matching HTML pages.
+"""
+from django.urls import reverse
+from django.views.decorators.http import condition, require_safe
+
+from seo.models import Region, Subregion
+from .models import Accommodation, Location
+from .pagination import KeysetPaginator
+from .services.api_service import ApiService, Projection, error_response, json_response
+from .services.cache_service import cache_public_page, cached_query, tag_versions
+from .services.etag_service import browse_etag, browse_ordering, detail_etag, detail_last_modified, viewer
+from .services.search_service import SearchService
+from .views import BROWSE_PAGE_SIZE
+
+MAX_PAGE_SIZE = 50
+
+# None: computed by the view rather than read from the row
+LISTING = Projection(
+    {
+        'id': 'id',
+        'url': None,
+        'room_type': 'room_type',
+        'price': 'price',
+        'available_rooms': 'available_rooms',
+        'is_featured': 'is_featured',
+        'location_id': 'location_id',
+        'location': 'location__name',
+        'landlord': 'landlord__landlordprofile__company_name',
+        'landlord_verified': 'landlord__landlordprofile__is_verified',
+        'description': 'description',
+        'image': None,
+        'images': None,
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    },
+    # Lists leave out what only the detail page shows
+    default=[
+        'id', 'url', 'room_type', 'price', 'available_rooms', 'is_featured', 'location_id',
+        'location', 'landlord', 'landlord_verified', 'image', 'created_at', 'updated_at',
+    ],
+)
+LISTING_DETAIL = Projection(LISTING.fields, default=[name for name in LISTING.fields if name != 'image'])
+LOCATION = Projection({'id': 'id', 'name': 'name', 'subregion_id': 'subregion_id'})
+AREA = Projection({
+    'id': 'id',
+    'name': 'name',
+    'slug': 'slug',
+    'url': None,
+    'listing_count': 'listing_stats__listing_count',
+    'min_price': 'listing_stats__min_price',
+    'median_price': 'listing_stats__median_price',
+    'subregions': None,
+})
+
+
+def _tags_etag(request, *tags):
+    who = viewer(request)
+    if who is None:
+        return None
+    return '-'.join(['api', *(str(version) for version in tag_versions(tags).values()), who])
+
+
+def _page_url(request, cursor):
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query['cursor'] = cursor
+    return f'{request.path}?{query.urlencode()}'
+
+
+def _page_size(request):
+    size = request.GET.get('limit', '')
+    if not size:
+        return BROWSE_PAGE_SIZE
+    if not size.isdigit() or not 1 <= int(size) <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return int(size)
+
+
+def _render_listings(projection, rows, names):
+    images = {}
+    if 'image' in names or 'images' in names:
+        images = ApiService.listing_images([row['id'] for row in rows])
+    results = []
+    for row in rows:
+        item = projection.render(row, names)
+        if 'url' in names:
+            item['url'] = reverse('accommodation_detail', args=[row['id']])
+        if 'image' in names:
+            item['image'] = next(iter(images.get(row['id'], ())), None)
+        if 'images' in names:
+            item['images'] = images.get(row['id'], [])
+        results.append(item)
+    return results
+
+
+@require_safe
+@condition(etag_func=browse_etag)
+def listings(request):
+    """Browse page results: same filters and sorts, cursor pagination"""
+    try:
+        names = LISTING.select(request.GET.get('fields'))
+        page_size = _page_size(request)
+    except ValueError as error:
+        return error_response(str(error))
+
+    search_query = request.GET.get('search', '')
+    accommodations = Accommodation.objects.public()
+    if search_query:
+        accommodations = SearchService.search(accommodations, search_query)
+    accommodations = accommodations.browse(
+        request.GET.get('room_type', ''), request.GET.get('location', ''), request.GET.get('price_range', ''),
+    )
+    ordering = browse_ordering(request.GET.get('sort', ''), search_query)
+
+    # The sort keys are read along so the paginator can build cursors from the rows
+    rows = accommodations.values(*LISTING.lookups(names, extra=['id', *(name.lstrip('-') for name in ordering)]))
+    page = KeysetPaginator(rows, ordering, per_page=page_size).page(request.GET.get('cursor'))
+    response = json_response({
+        'results': _render_listings(LISTING, page.object_list, names),
+        'next': _page_url(request, page.next_cursor),
+        'previous': _page_url(request, page.previous_cursor),
+    })
+    return cache_public_page(response, 'browse', 'locations')
+
+
+@require_safe
+@condition(etag_func=detail_etag, last_modified_func=detail_last_modified)
+def listing_detail(request, pk):
+    try:
+        names = LISTING_DETAIL.select(request.GET.get('fields'))
+    except ValueError as error:
+        return error_response(str(error))
+
+    row = (
+        Accommodation.objects.filter(pk=pk, is_approved=True)
+        .values(*LISTING_DETAIL.lookups(names, extra=['id', 'landlord_id', 'location_id']))
+        .first()
+    )
+    if row is None:
+        return error_response("Listing not found", status=404)
+    response = json_response(_render_listings(LISTING_DETAIL, [row], names)[0])
+    return cache_public_page(
+        response, f'listing:{pk}', f'landlord:{row["landlord_id"]}', f'location:{row["location_id"]}',
+    )
+
+
+@require_safe
+@condition(etag_func=lambda request: _tags_etag(request, 'locations'))
+def locations(request):
+    try:
+        names = LOCATION.select(request.GET.get('fields'))
+    except ValueError as error:
+        return error_response(str(error))
+
+    results = cached_query(
+        f'api:locations:{",".join(names)}', 3600,
+        lambda: [
+            LOCATION.render(row, names)
+            for row in Location.objects.order_by('name', 'id').values(*LOCATION.lookups(names))
+        ],
+        tags=['locations'],
+    )
+    return cache_public_page(json_response({'results': results}), 'locations')
+
+
+def _load_areas(names):
+    subregions = {}
+    if 'subregions' in names:
+        lookups = AREA.lookups(names, extra=['region_id', 'region__slug', 'slug'])
+        rows = Subregion.objects.order_by('name').values(*lookups)
+        for row in rows:
+            item = AREA.render(row, names)
+            if 'url' in names:
+                item['url'] = reverse('subregion_page', args=[row['region__slug'], row['slug']])
+            subregions.setdefault(row['region_id'], []).append(item)
+
+    results = []
+    for row in Region.objects.order_by('name').values(*AREA.lookups(names, extra=['id', 'slug'])):
+        item = AREA.render(row, names)
+        if 'url' in names:
+            item['url'] = reverse('region_page', args=[row['slug']])
+        if 'subregions' in names:
+            item['subregions'] = subregions.get(row['id'], [])
+        results.append(item)
+    return results
+
+
+@require_safe
+@condition(etag_func=lambda request: _tags_etag(request, 'areas'))
+def areas(request):
+    """Regions with their subregions and listing stats"""
+    try:
+        names = AREA.select(request.GET.get('fields'))
+    except ValueError as error:
+        return error_response(str(error))
+
+    results = cached_query(f'api:areas:{",".join(names)}', 3600, lambda: _load_areas(names), tags=['areas'])
+    return cache_public_page(json_response({'results': results}), 'areas')
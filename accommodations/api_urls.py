@@ -0,0 +1,9 @@
+from django.urls import path
+from . import api
+
+urlpatterns = [
+    path("listings/", api.listings, name="api_listings"),
+    path("listings/<int:pk>/", api.listing_detail, name="api_listing_detail"),
+    path("locations/", api.locations, name="api_locations"),
+    path("areas/", api.areas, name="api_areas"),
+]
@@ -1,6 +1,17 @@
+import atexit
+
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class AccommodationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accommodations'
+
+    def ready(self):
+        from . import checks  # noqa: F401
+
+        if settings.LISTING_COUNTER_FLUSH_INTERVAL:
+            # Save the view counts still buffered when the process exits
+            from .services.listing_stats_service import counter
+            atexit.register(counter.close)
@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+from django.core.files.storage import FileSystemStorage
+from django.utils.module_loading import import_string
+
+# Backends every process can share without a database query per read
+SHARED_CACHES = (
+    'django.core.cache.backends.redis.RedisCache',
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Cache tag versions, the recompute locks and the suggestion journal only
+    work when web workers and the qcluster worker see the same cache, and the
+    page cache and cached_db sessions only save queries if it isn't the
+    database. Development (DEBUG) and tests may use the per-process default.
+    """
+    backend = settings.CACHES['default']['BACKEND']
+    if not (settings.DEBUG or settings.TESTING) and backend not in SHARED_CACHES:
+        return [Error(
+            f"The default cache ({backend}) can't be used in production.",
+            hint="Set REDIS_URL. Per-process caches miss changes made by other processes, "
+                 "and a database cache turns every cache and session read into a query.",
+            obj='CACHES',
+            id='accommodations.E001',
+        )]
+    return []
+
+
+@register(Tags.files)
+def check_shared_storage(app_configs, **kwargs):
+    """
+    The qcluster worker opens the files the web processes store (uploaded
+    images, proof of payment PDFs), so unless tasks run inline they need
+    storage both can reach; a separate worker dyno can't see the web
+    dyno's disk.
+    """
+    backend = settings.STORAGES['default']['BACKEND']
+    if settings.DEBUG or settings.TESTING or settings.Q_CLUSTER.get('sync'):
+        return []
+    if issubclass(import_string(backend), FileSystemStorage):
+        return [Error(
+            f"The default storage ({backend}) keeps uploads on this machine's disk, "
+            "where the background worker can't read them.",
+            hint="Set MEDIA_STORAGE to a shared storage backend, or Q_SYNC=True to run tasks in the web process.",
+            obj='STORAGES',
+            id='accommodations.E002',
+        )]
+    return []
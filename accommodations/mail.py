@@ -0,0 +1,157 @@
+import base64
+import re
+import smtplib
+import uuid
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.core.mail.backends.smtp import EmailBackend
+from django.core.mail.message import sanitize_address
+
+# 57 raw bytes make one 76 character base64 line; read ~56 KB at a time
+STREAM_CHUNK_SIZE = 57 * 1024
+
+
+def _rewind(fileobj):
+    if hasattr(fileobj, 'seek'):
+        fileobj.seek(0)
+
+
+def _base64_chunks(fileobj, chunk_size=STREAM_CHUNK_SIZE):
+    """Base64 lines (CRLF terminated) for a file, read chunk_size bytes at a time"""
+    chunk_size -= chunk_size % 57
+    _rewind(fileobj)
+    buffer = b''
+    while True:
+        data = fileobj.read(chunk_size - len(buffer))
+        if not data:
+            break
+        buffer += data
+        if len(buffer) == chunk_size:
+            yield base64.encodebytes(buffer).replace(b'\n', b'\r\n')
+            buffer = b''
+    if buffer:
+        yield base64.encodebytes(buffer).replace(b'\n', b'\r\n')
+
+
+def _quote_periods(data):
+    # SMTP DATA: a line starting with '.' has to be doubled
+    return re.sub(br'(?m)^\.', b'..', data)
+
+
+class StreamingEmailMessage(EmailMessage):
+    """
+    EmailMessage with file attachments that are never read into memory as a
+    whole. StreamingSMTPBackend base64-encodes them chunk by chunk straight
+    into the SMTP connection. Other backends (console, locmem) get an ordinary
+    message from message().
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.streamed_attachments = []
+
+    def attach_stream(self, filename, fileobj, mimetype):
+        """Attach an open binary file; it's read when the message is sent"""
+        self.streamed_attachments.append((filename, fileobj, mimetype))
+
+    def message(self):
+        if not self.streamed_attachments:
+            return super().message()
+        attachments = []
+        for filename, fileobj, mimetype in self.streamed_attachments:
+            _rewind(fileobj)
+            attachments.append((filename, fileobj.read(), mimetype))
+        return self._message_with(attachments)
+
+    def _message_with(self, extra_attachments):
+        saved = self.attachments
+        self.attachments = list(saved) + extra_attachments
+        try:
+            return super().message()
+        finally:
+            self.attachments = saved
+
+    def stream(self, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        Yield the message as dot-stuffed CRLF bytes for SMTP DATA.
+
+        Every streamed attachment is built with a small random placeholder
+        payload, so Django writes all the headers and boundaries; the
+        placeholder's base64 line is then swapped for the encoded file.
+        """
+        placeholders = []
+        attachments = []
+        for filename, fileobj, mimetype in self.streamed_attachments:
+            token = uuid.uuid4().hex.encode()
+            placeholders.append((base64.encodebytes(token).rstrip(b'\n') + b'\r\n', fileobj))
+            attachments.append((filename, token, mimetype))
+
+        rest = self._message_with(attachments).as_bytes(linesep='\r\n')
+        for placeholder, fileobj in placeholders:
+            head, rest = rest.split(placeholder, 1)
+            yield _quote_periods(head)
+            yield from _base64_chunks(fileobj, chunk_size)
+        yield _quote_periods(rest)
+
+
+class StreamingSMTPBackend(EmailBackend):
+    """
+    SMTP backend that sends StreamingEmailMessage attachments without holding
+    them in memory. Everything else goes through Django's normal sendmail().
+    """
+
+    def _send(self, email_message):
+        if not getattr(email_message, 'streamed_attachments', None):
+            return super()._send(email_message)
+        if not email_message.recipients():
+            return False
+        encoding = email_message.encoding or settings.DEFAULT_CHARSET
+        from_email = sanitize_address(email_message.from_email, encoding)
+        recipients = [
+            sanitize_address(addr, encoding) for addr in email_message.recipients()
+        ]
+        try:
+            self._stream_mail(from_email, recipients, email_message)
+        except smtplib.SMTPException:
+            if not self.fail_silently:
+                raise
+            return False
+        return True
+
+    def _stream_mail(self, from_email, recipients, email_message):
+        # smtplib.SMTP.sendmail() without the single in-memory message
+        connection = self.connection
+        connection.ehlo_or_helo_if_needed()
+
+        code, response = connection.mail(from_email)
+        if code != 250:
+            connection.rset()
+            raise smtplib.SMTPSenderRefused(code, response, from_email)
+
+        refused = {}
+        for recipient in recipients:
+            code, response = connection.rcpt(recipient)
+            if code not in (250, 251):
+                refused[recipient] = (code, response)
+        if len(refused) == len(recipients):
+            connection.rset()
+            raise smtplib.SMTPRecipientsRefused(refused)
+
+        code, response = connection.docmd('data')
+        if code != 354:
+            connection.rset()
+            raise smtplib.SMTPDataError(code, response)
+
+        last = b''
+        for chunk in email_message.stream():
+            if chunk:
+                connection.send(chunk)
+                last = chunk
+        if not last.endswith(b'\r\n'):
+            connection.send(b'\r\n')
+        connection.send(b'.\r\n')
+
+        code, response = connection.getreply()
+        if code != 250:
+            raise smtplib.SMTPDataError(code, response)
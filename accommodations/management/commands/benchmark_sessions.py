@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+SESSION_TABLE = 'django_session'
+
+# The settings this repo used before LowWriteSessionMiddleware
+LEGACY_SESSIONS = {
+    'SESSION_ENGINE': 'django.contrib.sessions.backends.db',
+    'SESSION_SAVE_EVERY_REQUEST': True,
+    'MIDDLEWARE': [
+        'django.contrib.sessions.middleware.SessionMiddleware'
+        if name == 'accommodations.middleware.LowWriteSessionMiddleware' else name
+        for name in settings.MIDDLEWARE
+    ],
+}
+
+
+class Command(BaseCommand):
+    help = "Compare django_session reads/writes per page view: legacy save-every-request vs current settings"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--user', help="Username to browse as (default: anonymous visitor with a session)")
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+            if user is None:
+                raise CommandError(f"No user {options['user']}")
+
+        urls = [reverse('home'), reverse('accommodation_list'), reverse('about_us')]
+        results = []
+        with override_settings(**LEGACY_SESSIONS, ALLOWED_HOSTS=['*']):
+            results.append(('legacy (db, save every request)', self._run(urls, user, options['requests'])))
+        with override_settings(ALLOWED_HOSTS=['*']):
+            results.append((f'current ({settings.SESSION_ENGINE.rsplit(".", 1)[-1]})', self._run(urls, user, options['requests'])))
+
+        self.stdout.write(f"{options['requests']} page views {'as ' + user.username if user else 'anonymously'}:")
+        for label, (reads, writes) in results:
+            self.stdout.write(f"  {label:<36} {reads:>5} session reads  {writes:>5} session writes")
+
+    def _run(self, urls, user, requests):
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        else:
+            # Give the visitor a real session, e.g. from a flash message
+            session = client.session
+            session['visited'] = True
+            session.save()
+            client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+
+        reads = writes = 0
+        for i in range(requests):
+            with CaptureQueriesContext(connection) as ctx:
+                client.get(urls[i % len(urls)])
+            for query in ctx.captured_queries:
+                sql = query['sql']
+                if SESSION_TABLE not in sql:
+                    continue
+                if sql.lstrip().upper().startswith('SELECT'):
+                    reads += 1
+                elif not sql.lstrip().upper().startswith(('BEGIN', 'COMMIT', 'SAVEPOINT', 'RELEASE')):
+                    writes += 1
+        return reads, writes
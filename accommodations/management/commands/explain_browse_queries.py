@@ -0,0 +1,42 @@
+from itertools import product
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from accommodations.models import Accommodation, Location, BROWSE_SORTS
+
+
+class Command(BaseCommand):
+    help = 'Print the query plan for every browse filter/sort combination'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--analyze', action='store_true',
+                            help='Run EXPLAIN ANALYZE (PostgreSQL only)')
+        parser.add_argument('--sort', choices=list(BROWSE_SORTS),
+                            help='Only explain this sort order')
+
+    def handle(self, *args, **options):
+        location = Location.objects.order_by('id').first()
+        room_types = ['', Accommodation.ROOM_TYPES[0][0]]
+        location_ids = ['', location.id if location else '']
+        price_ranges = ['', '300-500']
+        sorts = [options['sort']] if options['sort'] else list(BROWSE_SORTS)
+
+        explain_options = {}
+        if options['analyze'] and connection.vendor == 'postgresql':
+            explain_options = {'analyze': True, 'buffers': True}
+
+        for room_type, location_id, price_range, sort in product(room_types, location_ids, price_ranges, sorts):
+            queryset = (
+                Accommodation.objects.public()
+                .browse(room_type, location_id, price_range)
+                .order_by(*BROWSE_SORTS[sort][1])
+            )[:13]
+
+            filters = ', '.join(
+                f'{name}={value}' for name, value in
+                [('room_type', room_type), ('location', location_id), ('price_range', price_range)]
+                if value
+            ) or 'no filters'
+            self.stdout.write(self.style.SUCCESS(f'--- {filters} / sort={sort}'))
+            self.stdout.write(queryset.explain(**explain_options))
+            self.stdout.write('')
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from accommodations.models import AccommodationImage
+from accommodations.services.image_service import ImageRenditionService
+
+
+class Command(BaseCommand):
+    help = 'Generate WebP/AVIF renditions for accommodation images that have none'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Regenerate renditions for every image')
+
+    def handle(self, *args, **options):
+        images = AccommodationImage.objects.order_by('id')
+        if not options['force']:
+            images = images.filter(renditions={})
+
+        done = failed = 0
+        for image in images.iterator():
+            try:
+                ImageRenditionService.generate(image)
+                done += 1
+            except Exception as e:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f'Image {image.pk}: {e}'))
+
+        self.stdout.write(self.style.SUCCESS(f'Generated renditions for {done} images ({failed} failed)'))
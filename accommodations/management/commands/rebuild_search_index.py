@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from accommodations.models import Accommodation
+from accommodations.services.search_service import SearchService, get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the search document and index for every accommodation'
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        self.stdout.write(f'Using {backend.__class__.__name__}')
+
+        SearchService.index_queryset(Accommodation.objects.all())
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {Accommodation.objects.count()} accommodations'
+        ))
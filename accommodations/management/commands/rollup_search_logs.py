@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from accommodations.services.search_analytics_service import SearchAnalyticsService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the daily search analytics from the raw search log'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=2, help='Days to rebuild, counting back from today')
+
+    def handle(self, *args, **options):
+        SearchAnalyticsService.rollup(days=options['days'])
+        self.stdout.write(self.style.SUCCESS(f"Rolled up {options['days']} days of searches"))
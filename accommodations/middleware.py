@@ -0,0 +1,194 @@
+import hashlib
+import time
+from functools import partial
+from urllib.parse import parse_qsl, urlencode
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.functional import SimpleLazyObject
+from django.utils.http import parse_http_date_safe
+
+from .services.cache_service import local_tag_versions, tag_versions
+from .services.listing_stats_service import counter
+from .services.search_analytics_service import search_log
+from .services.role_service import RoleService
+
+
+def is_anonymous_visitor(request):
+    """No session and no pending messages, so pages look the same as for everyone else"""
+    return (
+        settings.SESSION_COOKIE_NAME not in request.COOKIES
+        and CookieStorage.cookie_name not in request.COOKIES
+    )
+
+
+class RoleMiddleware:
+    """
+    Sets request.user_role to 'landlord', 'student' or None. Resolved lazily,
+    so requests that never look at it don't pay for it. Goes after
+    AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.user_role = SimpleLazyObject(partial(RoleService.get_role, request))
+        return self.get_response(request)
+
+
+class LowWriteSessionMiddleware(SessionMiddleware):
+    """
+    Sliding session expiry without a write on every request.
+
+    SESSION_SAVE_EVERY_REQUEST re-saved each session on every page view just
+    to push its expiry back. Here a session is saved when its data changed,
+    or when less than SESSION_REFRESH_THRESHOLD seconds of its
+    SESSION_COOKIE_AGE are left. The time of the last save is kept in the
+    session itself, so checking it is a cache read with the cached_db engine.
+    An idle session therefore expires between SESSION_REFRESH_THRESHOLD and
+    SESSION_COOKIE_AGE seconds after the last request.
+    """
+
+    REFRESHED_KEY = '_session_refreshed_at'
+
+    def process_response(self, request, response):
+        session = getattr(request, 'session', None)
+        if session is not None and settings.SESSION_COOKIE_NAME in request.COOKIES:
+            self._refresh_if_needed(session)
+        elif session is not None and session.modified and not session.is_empty():
+            # New session: start the clock
+            session[self.REFRESHED_KEY] = int(time.time())
+        return super().process_response(request, response)
+
+    def _refresh_if_needed(self, session):
+        # Don't let our own bookkeeping mark the session as used (Vary: Cookie)
+        accessed = session.accessed
+        if session.is_empty() or not session.keys():
+            # Expired, flushed or never used: nothing to keep alive
+            session.accessed = accessed
+            return
+        now = int(time.time())
+        refreshed_at = session.get(self.REFRESHED_KEY, 0)
+        remaining = refreshed_at + settings.SESSION_COOKIE_AGE - now
+        threshold = getattr(settings, 'SESSION_REFRESH_THRESHOLD', settings.SESSION_COOKIE_AGE)
+        if session.modified or remaining < threshold:
+            session[self.REFRESHED_KEY] = now
+        else:
+            session.accessed = accessed
+
+
+class AnonymousPageCacheMiddleware:
+    """
+    Full-page cache for anonymous GETs, placed before the session middleware.
+
+    Only responses a view passed through cache_public_page() are stored, keyed
+    by path plus normalized query string, along with the versions of the tags
+    the view named. A hit is two cache reads (the page and those tag versions)
+    and never runs the view or touches the session. Logged-in visitors and
+    anyone with pending messages always get the view.
+    """
+
+    KEY_PREFIX = 'page:'
+    # Ad/campaign parameters that don't change the page
+    TRACKING_PARAMS = ('fbclid', 'gclid')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method not in ('GET', 'HEAD') or not is_anonymous_visitor(request):
+            return self.get_response(request)
+
+        key = self.cache_key(request)
+        entry = cache.get(key)
+        if entry is not None:
+            versions, response = entry
+            if tag_versions(list(versions)) == versions:
+                response.page_cache_hit = True
+                return self.conditional(request, response)
+
+        response = self.get_response(request)
+        tags = getattr(response, 'page_cache_tags', None)
+        if tags and request.method == 'GET' and self.is_cacheable(response):
+            # Stamped with the versions cached_query() used, which can lag the shared
+            # ones by CACHE_L1_TIMEOUT; a page built from such data then misses on its
+            # next hit instead of living on. An edit that lands mid-render can still
+            # be missed; PAGE_CACHE_TIMEOUT bounds how long that lasts
+            cache.set(key, (local_tag_versions(tags), response), settings.PAGE_CACHE_TIMEOUT)
+        return response
+
+    @staticmethod
+    def conditional(request, response):
+        # The view's @condition never runs on a hit, so answer If-None-Match here
+        etag = response.get('ETag')
+        last_modified = parse_http_date_safe(response.get('Last-Modified', ''))
+        if etag or last_modified:
+            return get_conditional_response(request, etag=etag, last_modified=last_modified, response=response)
+        return response
+
+    def cache_key(self, request):
+        params = sorted(
+            (name, value)
+            for name, value in parse_qsl(request.META.get('QUERY_STRING', ''))
+            if not name.startswith('utm_') and name not in self.TRACKING_PARAMS
+        )
+        url = f'{request.path}?{urlencode(params)}'
+        return self.KEY_PREFIX + hashlib.md5(url.encode()).hexdigest()
+
+    @staticmethod
+    def is_cacheable(response):
+        cache_control = response.get('Cache-Control', '')
+        return (
+            response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            and not any(word in cache_control for word in ('private', 'no-store', 'no-cache'))
+        )
+
+
+class ListingCounterMiddleware:
+    """
+    Counts the listing views/impressions a response was marked with
+    (ListingStatsService.count), into the in-process buffer. Goes before
+    AnonymousPageCacheMiddleware so cached pages are counted too; 304s
+    aren't, the visitor already had the page.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        counts = getattr(response, 'listing_counts', None)
+        if counts and request.method == 'GET' and response.status_code == 200:
+            for field, accommodation_ids in counts.items():
+                if accommodation_ids:
+                    counter.add(field, accommodation_ids)
+        return response
+
+
+class SearchLogMiddleware:
+    """
+    Records the browse search a response was marked with
+    (SearchAnalyticsService.mark) in the in-process search log; no database
+    work happens during the request. Goes before AnonymousPageCacheMiddleware
+    so cached result pages count as searches too, without a latency.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        event = getattr(response, 'search_event', None)
+        if event and request.method == 'GET' and response.status_code == 200:
+            cached = getattr(response, 'page_cache_hit', False)
+            search_log.record(
+                event['query'], event['filters'], event['result_count'],
+                None if cached else event['latency_ms'],
+            )
+        return response
@@ -0,0 +1,81 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.utils import OperationalError
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute(
+            "ALTER TABLE accommodations_searchdocument ADD COLUMN search_vector tsvector "
+            "GENERATED ALWAYS AS (to_tsvector('english', body)) STORED"
+        )
+        schema_editor.execute(
+            "CREATE INDEX accommodations_searchdocument_vector_gin "
+            "ON accommodations_searchdocument USING GIN (search_vector)"
+        )
+    elif connection.vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                "CREATE VIRTUAL TABLE accommodations_searchindex "
+                "USING fts5(body, tokenize='porter unicode61')"
+            )
+        except OperationalError:
+            # SQLite built without FTS5, search falls back to icontains
+            pass
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS accommodations_searchindex")
+
+
+def populate_search_documents(apps, schema_editor):
+    Accommodation = apps.get_model('accommodations', 'Accommodation')
+    SearchDocument = apps.get_model('accommodations', 'SearchDocument')
+    LandlordProfile = apps.get_model('accommodations', 'LandlordProfile')
+    connection = schema_editor.connection
+    has_fts = (
+        connection.vendor == 'sqlite'
+        and 'accommodations_searchindex' in connection.introspection.table_names()
+    )
+
+    company_names = dict(LandlordProfile.objects.values_list('user_id', 'company_name'))
+    room_types = dict(Accommodation._meta.get_field('room_type').choices)
+    for accommodation in Accommodation.objects.select_related('location'):
+        parts = [
+            accommodation.description,
+            accommodation.location.name,
+            company_names.get(accommodation.landlord_id, ''),
+            accommodation.room_type,
+            room_types.get(accommodation.room_type, ''),
+        ]
+        body = "\n".join(part for part in parts if part)
+        SearchDocument.objects.create(accommodation_id=accommodation.pk, body=body)
+        if has_fts:
+            schema_editor.execute(
+                "INSERT INTO accommodations_searchindex (rowid, body) VALUES (%s, %s)",
+                [accommodation.pk, body],
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accommodations', '0008_submissionhistory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('accommodation', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='accommodations.accommodation')),
+                ('body', models.TextField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(populate_search_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accommodations', '0009_searchdocument'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='accommodation',
+            index=models.Index(condition=models.Q(('available_rooms__gt', 0), ('is_approved', True)), fields=['location', 'room_type', 'price'], name='accom_pub_loc_type_price'),
+        ),
+        migrations.AddIndex(
+            model_name='accommodation',
+            index=models.Index(condition=models.Q(('available_rooms__gt', 0), ('is_approved', True)), fields=['room_type', 'price'], name='accom_pub_type_price'),
+        ),
+        migrations.AddIndex(
+            model_name='accommodation',
+            index=models.Index(condition=models.Q(('available_rooms__gt', 0), ('is_approved', True)), fields=['-is_featured', '-created_at', '-id'], name='accom_pub_featured'),
+        ),
+        migrations.AddIndex(
+            model_name='accommodation',
+            index=models.Index(condition=models.Q(('available_rooms__gt', 0), ('is_approved', True)), fields=['-created_at', '-id'], name='accom_pub_newest'),
+        ),
+        migrations.AddIndex(
+            model_name='accommodation',
+            index=models.Index(condition=models.Q(('available_rooms__gt', 0), ('is_approved', True)), fields=['price', 'id'], name='accom_pub_price'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accommodations', '0010_browse_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='accommodationimage',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accommodations', '0011_accommodationimage_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='accommodationimage',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Processing'), ('ready', 'Ready')], default='ready', max_length=10),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:18
+
+import accommodations.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accommodations', '0012_accommodationimage_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='submissionhistory',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='submissionhistory',
+            name='file',
+            field=models.FileField(blank=True, upload_to=accommodations.models.submission_upload_path),
+        ),
+        migrations.AddField(
+            model_name='submissionhistory',
+            name='last_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='submissionhistory',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='submissionhistory',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accommodations', '0013_submission_outbox'),
+        ('seo', '0007_region_subregion_slugs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='location',
+            name='subregion',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='locations', to='seo.subregion'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accommodations', '0014_location_subregion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListingDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('impressions', models.PositiveIntegerField(default=0)),
+                ('accommodation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='accommodations.accommodation')),
+            ],
+            options={
+                'verbose_name_plural': 'Listing daily stats',
+                'constraints': [models.UniqueConstraint(fields=('accommodation', 'date'), name='listing_daily_stats_day')],
+            },
+        ),
+    ]
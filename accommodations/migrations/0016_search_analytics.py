@@ -0,0 +1,54 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accommodations', '0015_listing_daily_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchLogEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(db_index=True)),
+                ('query', models.CharField(blank=True, max_length=200)),
+                ('filters', models.CharField(blank=True, max_length=200)),
+                ('result_count', models.PositiveIntegerField()),
+                ('latency_ms', models.PositiveIntegerField(blank=True, null=True)),
+                ('weight', models.FloatField(default=1)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SearchFilterDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('filters', models.CharField(blank=True, max_length=200)),
+                ('searches', models.PositiveIntegerField(default=0)),
+                ('zero_result_searches', models.PositiveIntegerField(default=0)),
+                ('p95_latency_ms', models.PositiveIntegerField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Search filters (daily)',
+                'constraints': [models.UniqueConstraint(fields=('date', 'filters'), name='search_filter_daily_day')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchQueryDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('query', models.CharField(blank=True, max_length=200)),
+                ('searches', models.PositiveIntegerField(default=0)),
+                ('zero_result_searches', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Search queries (daily)',
+                'constraints': [models.UniqueConstraint(fields=('date', 'query'), name='search_query_daily_day')],
+            },
+        ),
+    ]
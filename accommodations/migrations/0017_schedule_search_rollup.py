@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:43
+
+from django.db import migrations
+
+ROLLUP_TASK = 'accommodations.tasks.rollup_search_logs'
+
+
+def schedule_rollup(apps, schema_editor):
+    Schedule = apps.get_model('django_q', 'Schedule')
+    Schedule.objects.get_or_create(
+        func=ROLLUP_TASK,
+        defaults={'name': 'Search analytics rollup', 'schedule_type': 'H', 'repeats': -1},
+    )
+
+
+def unschedule_rollup(apps, schema_editor):
+    Schedule = apps.get_model('django_q', 'Schedule')
+    Schedule.objects.filter(func=ROLLUP_TASK).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accommodations', '0016_search_analytics'),
+        ('django_q', '0019_alter_task_options_alter_ormq_key_alter_ormq_lock_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(schedule_rollup, unschedule_rollup),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:10
+
+from django.db import migrations
+
+RETRY_TASK = 'accommodations.tasks.retry_submissions'
+
+
+def schedule_retries(apps, schema_editor):
+    Schedule = apps.get_model('django_q', 'Schedule')
+    Schedule.objects.get_or_create(
+        func=RETRY_TASK,
+        defaults={'name': 'Proof of payment email retries', 'schedule_type': 'I', 'minutes': 1, 'repeats': -1},
+    )
+
+
+def unschedule_retries(apps, schema_editor):
+    Schedule = apps.get_model('django_q', 'Schedule')
+    Schedule.objects.filter(func=RETRY_TASK).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accommodations', '0017_schedule_search_rollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(schedule_retries, unschedule_retries),
+    ]
@@ -1,12 +1,18 @@
 from django.db import models
-from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.contrib.auth.models import Group, User
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
 from django.dispatch import receiver
 import os
+import uuid
 import magic
 from django.db import models
 from django.core.exceptions import ValidationError
 from django.utils import timezone
+from django.db import transaction
+from django_q.tasks import async_task
+
+from .services.cache_service import invalidate_on_commit, landlord_tags, listing_tags
+from .services.role_service import ROLES_TAG, RoleService
 
 
 class SiteContent(models.Model):
@@ -32,6 +38,10 @@ class SiteContent(models.Model):
 
 class Location(models.Model):
     name = models.CharField(max_length=100)
+    # Area page (seo app) whose listings include this location
+    subregion = models.ForeignKey(
+        'seo.Subregion', null=True, blank=True, on_delete=models.SET_NULL, related_name='locations'
+    )
 
     def __str__(self):
         return self.name
@@ -72,6 +82,58 @@ class LandlordProfile(models.Model):
     def __str__(self):
         return f"{self.user.username} - Landlord"
 
+# What every public query filters on; the browse indexes below are partial on it
+PUBLIC_LISTINGS = models.Q(is_approved=True, available_rooms__gt=0)
+
+# price_range value -> (label, filter)
+PRICE_RANGES = {
+    '0-300': ('R0 - R300', models.Q(price__lte=300)),
+    '300-500': ('R300 - R500', models.Q(price__range=(300, 500))),
+    '500-700': ('R500 - R700', models.Q(price__range=(500, 700))),
+    '700+': ('R700+', models.Q(price__gte=700)),
+}
+
+# sort key -> (label, ordering). Each ordering ends in id so keyset cursors are unique
+BROWSE_SORTS = {
+    'featured': ('Featured first', ('-is_featured', '-created_at', '-id')),
+    'newest': ('Newest', ('-created_at', '-id')),
+    'price_asc': ('Price: low to high', ('price', 'id')),
+    'price_desc': ('Price: high to low', ('-price', '-id')),
+}
+DEFAULT_SORT = 'featured'
+
+
+class AccommodationQuerySet(models.QuerySet):
+    def public(self):
+        """Listings students are allowed to see"""
+        return self.filter(PUBLIC_LISTINGS)
+
+    def browse(self, room_type='', location_id='', price_range=''):
+        """Apply the browse page filters, ignoring empty/unknown values"""
+        queryset = self
+        if room_type:
+            queryset = queryset.filter(room_type=room_type)
+        if location_id and str(location_id).isdigit():
+            queryset = queryset.filter(location_id=location_id)
+        if price_range in PRICE_RANGES:
+            queryset = queryset.filter(PRICE_RANGES[price_range][1])
+        return queryset
+
+    def with_details(self):
+        """Landlord profile and location joined in, images prefetched in one extra query"""
+        return self.select_related('location', 'landlord__landlordprofile').prefetch_related(
+            models.Prefetch(
+                'images',
+                queryset=AccommodationImage.objects.order_by('-is_primary', 'id'),
+                to_attr='card_images',
+            )
+        )
+
+    def for_cards(self):
+        """Card-ready rows for list/landing pages, without the long description"""
+        return self.with_details().defer('description')
+
+
 class Accommodation(models.Model):
     ROOM_TYPES = [
         ('single', 'Single Room'),
@@ -92,10 +154,67 @@ class Accommodation(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_featured = models.BooleanField(default=False)
 
+    objects = AccommodationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Filters: location / room type / price on public listings
+            models.Index(
+                fields=['location', 'room_type', 'price'],
+                condition=PUBLIC_LISTINGS,
+                name='accom_pub_loc_type_price',
+            ),
+            models.Index(
+                fields=['room_type', 'price'],
+                condition=PUBLIC_LISTINGS,
+                name='accom_pub_type_price',
+            ),
+            # Sorts (BROWSE_SORTS); price covers both directions
+            models.Index(
+                fields=['-is_featured', '-created_at', '-id'],
+                condition=PUBLIC_LISTINGS,
+                name='accom_pub_featured',
+            ),
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=PUBLIC_LISTINGS,
+                name='accom_pub_newest',
+            ),
+            models.Index(
+                fields=['price', 'id'],
+                condition=PUBLIC_LISTINGS,
+                name='accom_pub_price',
+            ),
+        ]
+
     @property
     def is_available(self):
         return self.available_rooms > 0 and self.is_approved
 
+    @property
+    def company_name(self):
+        profile = getattr(self.landlord, 'landlordprofile', None)
+        return profile.company_name if profile else ''
+
+    def _all_images(self):
+        if hasattr(self, 'card_images'):
+            return self.card_images
+        return list(self.images.order_by('-is_primary', 'id'))
+
+    @property
+    def gallery_images(self):
+        """Processed images, primary first. Uses the prefetch when there is one"""
+        return [image for image in self._all_images() if image.status == AccommodationImage.READY]
+
+    @property
+    def primary_image(self):
+        images = self.gallery_images
+        return images[0] if images else None
+
+    @property
+    def photos_processing(self):
+        return any(image.status == AccommodationImage.PENDING for image in self._all_images())
+
     def __str__(self):
         return f"{self.landlord.landlordprofile.company_name} - {self.location}"
     
@@ -104,13 +223,258 @@ class Accommodation(models.Model):
         return reverse("accommodation_detail", kwargs={"pk": self.pk})
 
 class AccommodationImage(models.Model):
+    PENDING = 'pending'
+    READY = 'ready'
+    STATUS_CHOICES = [
+        (PENDING, 'Processing'),
+        (READY, 'Ready'),
+    ]
+
     accommodation = models.ForeignKey(Accommodation, related_name='images', on_delete=models.CASCADE)
     image = models.ImageField(upload_to='accommodations/')
     is_primary = models.BooleanField(default=False)
+    # Uploads from the landlord dashboard start as pending until tasks.process_image has run
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=READY)
+    # Resized WebP/AVIF copies, see services/image_service.py
+    renditions = models.JSONField(default=dict, blank=True)
 
     def __str__(self):
         return f"Image for {self.accommodation.title}"
 
+    def srcset(self, fmt):
+        """'<url> 480w, <url> 1200w, ...' for one rendition format"""
+        from django.core.files.storage import default_storage
+        entries = sorted(
+            (entry['width'], entry[fmt]) for entry in self.renditions.values() if fmt in entry
+        )
+        return ', '.join(f"{default_storage.url(path)} {width}w" for width, path in entries)
+
+
+class ListingDailyStats(models.Model):
+    """
+    How often one listing was seen on one day. Written in bulk from the
+    in-process counters in services/listing_stats_service.py, never per request.
+    """
+    accommodation = models.ForeignKey(Accommodation, related_name='daily_stats', on_delete=models.CASCADE)
+    date = models.DateField()
+    # Detail page opens
+    views = models.PositiveIntegerField(default=0)
+    # Appearances as a card on the browse list and home page
+    impressions = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Listing daily stats"
+        constraints = [
+            models.UniqueConstraint(fields=['accommodation', 'date'], name='listing_daily_stats_day'),
+        ]
+
+    def __str__(self):
+        return f"Accommodation {self.accommodation_id} on {self.date}: {self.views} views"
+
+
+class SearchLogEntry(models.Model):
+    """
+    One browse search, appended in batches by services/search_analytics_service.py.
+    Raw material for the daily rollups below; pruned after SEARCH_LOG_RETENTION_DAYS.
+    """
+    created_at = models.DateTimeField(db_index=True)
+    # Lower-cased, whitespace-collapsed search box text ('' for filter-only searches)
+    query = models.CharField(max_length=200, blank=True)
+    # Canonical filter combination, e.g. 'location=3&room_type=single'
+    filters = models.CharField(max_length=200, blank=True)
+    result_count = models.PositiveIntegerField()
+    # None when the page came from the page cache
+    latency_ms = models.PositiveIntegerField(null=True, blank=True)
+    # Searches this entry stands for; above 1 when logging was sampled under load
+    weight = models.FloatField(default=1)
+
+    def __str__(self):
+        return f"{self.query or '(no text)'} [{self.filters}]: {self.result_count} results"
+
+
+class SearchQueryDaily(models.Model):
+    """Searches per normalized query and day, see SearchAnalyticsService.rollup"""
+    date = models.DateField()
+    query = models.CharField(max_length=200, blank=True)
+    searches = models.PositiveIntegerField(default=0)
+    zero_result_searches = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Search queries (daily)"
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'query'], name='search_query_daily_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.query or '(no text)'} on {self.date}"
+
+
+class SearchFilterDaily(models.Model):
+    """Searches and latency per filter combination and day, see SearchAnalyticsService.rollup"""
+    date = models.DateField()
+    filters = models.CharField(max_length=200, blank=True)
+    searches = models.PositiveIntegerField(default=0)
+    zero_result_searches = models.PositiveIntegerField(default=0)
+    # Over searches that ran (page cache hits have no latency)
+    p95_latency_ms = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = "Search filters (daily)"
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'filters'], name='search_filter_daily_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.filters or '(no filters)'} on {self.date}"
+
+
+class SearchDocument(models.Model):
+    """
+    Denormalised search text for one listing (description, location, company
+    name, room type). The database-specific index is built from `body`, see
+    services/search_service.py.
+    """
+    accommodation = models.OneToOneField(
+        Accommodation, on_delete=models.CASCADE, primary_key=True, related_name='search_document'
+    )
+    body = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Search document for accommodation {self.accommodation_id}"
+
+
+# Keep the search index in step with the data it is built from
+@receiver(post_save, sender=Accommodation)
+def index_accommodation(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    from .services.search_service import SearchService
+    SearchService.index_accommodation(instance)
+
+@receiver(post_delete, sender=Accommodation)
+def unindex_accommodation(sender, instance, **kwargs):
+    from .services.search_service import SearchService
+    SearchService.remove_accommodation(instance.pk)
+
+@receiver(post_init, sender=Location)
+def remember_location_name(sender, instance, **kwargs):
+    instance._indexed_name = instance.name
+
+@receiver(post_save, sender=Location)
+def reindex_location(sender, instance, created, raw=False, **kwargs):
+    if raw or created or instance.name == instance._indexed_name:
+        return
+    from .services.search_service import SearchService
+    SearchService.index_queryset(Accommodation.objects.filter(location=instance))
+    instance._indexed_name = instance.name
+
+@receiver(post_init, sender=LandlordProfile)
+def remember_landlord_details(sender, instance, **kwargs):
+    instance._saved_details = (instance.company_name, instance.phone_number)
+
+@receiver(post_save, sender=LandlordProfile)
+def landlord_details_changed(sender, instance, raw=False, **kwargs):
+    # LandlordProfile is re-saved on every User save (see save_user_profile),
+    # so only act when something shown on listings actually changed
+    if raw:
+        return
+    company_name, phone_number = instance._saved_details
+    if instance.company_name != company_name:
+        from .services.search_service import SearchService
+        SearchService.index_queryset(Accommodation.objects.filter(landlord_id=instance.user_id))
+    if (instance.company_name, instance.phone_number) != (company_name, phone_number):
+        invalidate_on_commit(*landlord_tags(instance.user_id))
+    instance._saved_details = (instance.company_name, instance.phone_number)
+
+
+@receiver(post_init, sender=AccommodationImage)
+def remember_image_file(sender, instance, **kwargs):
+    # Raw name from the DB, read before the file descriptor wraps it
+    instance._saved_image_name = str(instance.__dict__.get('image') or '')
+
+@receiver(post_save, sender=AccommodationImage)
+def process_uploaded_image(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Saves with update_fields come from the processing task itself
+    if raw or update_fields:
+        return
+    if not created and instance.renditions and instance.image.name == instance._saved_image_name:
+        return
+    instance._saved_image_name = instance.image.name
+    image_id = instance.pk
+    transaction.on_commit(lambda: async_task('accommodations.tasks.process_image', image_id))
+
+@receiver(post_delete, sender=AccommodationImage)
+def delete_image_renditions(sender, instance, **kwargs):
+    from .services.image_service import ImageRenditionService
+    ImageRenditionService.delete(instance)
+
+
+# Cache invalidation: bump the tags cached pages and queries depend on
+@receiver(post_save, sender=Accommodation)
+@receiver(post_delete, sender=Accommodation)
+def invalidate_accommodation(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    invalidate_on_commit(*listing_tags(instance.pk, instance.location_id, instance.landlord_id))
+
+@receiver(post_save, sender=AccommodationImage)
+@receiver(post_delete, sender=AccommodationImage)
+def invalidate_accommodation_image(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    invalidate_on_commit(*listing_tags(instance.accommodation_id))
+
+# Photos are part of the listing page, so they count as an update of the
+# listing (Last-Modified on the detail page, lastmod in the sitemap)
+@receiver(post_save, sender=AccommodationImage)
+@receiver(post_delete, sender=AccommodationImage)
+def touch_accommodation(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    Accommodation.objects.filter(pk=instance.accommodation_id).update(updated_at=timezone.now())
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def invalidate_location(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    invalidate_on_commit(f'location:{instance.pk}', 'locations', 'browse', 'featured')
+
+@receiver(post_save, sender=SiteContent)
+@receiver(post_delete, sender=SiteContent)
+def invalidate_site_content(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    invalidate_on_commit(f'sitecontent:{instance.content_type}')
+
+
+# Search box suggestions: journal changed names for every process's index
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def suggest_location_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    from .services.suggest_service import LOCATION, SuggestService
+    name = None if kwargs.get('signal') is post_delete else instance.name
+    SuggestService.publish(('location', instance.pk), LOCATION, name)
+
+@receiver(post_init, sender=LandlordProfile)
+def remember_landlord_suggestion(sender, instance, **kwargs):
+    instance._saved_suggestion = (instance.company_name, instance.is_verified)
+
+@receiver(post_save, sender=LandlordProfile)
+@receiver(post_delete, sender=LandlordProfile)
+def suggest_landlord_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    from .services.suggest_service import SuggestService
+    if kwargs.get('signal') is post_delete:
+        SuggestService.landlord_changed(instance.user_id, None, False)
+    elif (instance.company_name, instance.is_verified) != instance._saved_suggestion:
+        SuggestService.landlord_changed(instance.user_id, instance.company_name, instance.is_verified)
+    instance._saved_suggestion = (instance.company_name, instance.is_verified)
+
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
@@ -126,7 +490,15 @@ def save_user_profile(sender, instance, **kwargs):
         instance.landlordprofile.save()
 
 # submission history model
+def submission_upload_path(instance, filename):
+    # Random folder so proofs of payment can't be guessed from the filename
+    return f'submissions/{uuid.uuid4().hex}/{filename}'
+
 class SubmissionHistory(models.Model):
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+
     landlord = models.ForeignKey(User, on_delete=models.CASCADE, related_name='pdf_submissions')
     filename = models.CharField(max_length=255)
     file_size = models.IntegerField(help_text="Size in bytes")
@@ -134,9 +506,14 @@ class SubmissionHistory(models.Model):
     submitted_at = models.DateTimeField(auto_now_add=True)
     status = models.CharField(
         max_length=20, 
-        choices=[('sent', 'Sent'), ('failed', 'Failed')],
-        default='sent'
+        choices=[(PENDING, 'Pending'), (SENT, 'Sent'), (FAILED, 'Failed')],
+        default=PENDING
     )
+    # Outbox: the upload is kept until the email has gone out (tasks.deliver_submission)
+    file = models.FileField(upload_to=submission_upload_path, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
     
     class Meta:
         ordering = ['-submitted_at']
@@ -149,4 +526,29 @@ class SubmissionHistory(models.Model):
         """Human readable file size"""
         if self.file_size < 1024 * 1024:  # Less than 1MB
             return f"{self.file_size / 1024:.1f} KB"
-        return f"{self.file_size / (1024 * 1024):.1f} MB"
\ No newline at end of file
+        return f"{self.file_size / (1024 * 1024):.1f} MB"
+
+@receiver(post_delete, sender=SubmissionHistory)
+def delete_submission_file(sender, instance, **kwargs):
+    if instance.file:
+        instance.file.delete(save=False)
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def forget_group_ids(sender, **kwargs):
+    # Renamed/recreated groups get looked up again, and every role re-resolved
+    RoleService.clear_group_cache()
+    invalidate_on_commit(ROLES_TAG)
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # Roles kept in sessions (RoleService.get_role) are checked against these tags
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        invalidate_on_commit(f'role:{instance.pk}')
+    elif pk_set:
+        invalidate_on_commit(*(f'role:{user_id}' for user_id in pk_set))
+    else:
+        # group.user_set.clear(): the removed users aren't known
+        invalidate_on_commit(ROLES_TAG)
@@ -0,0 +1,155 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core import signing
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q
+
+
+CURSOR_SALT = 'accommodations.pagination'
+
+
+class CountedPaginator(Paginator):
+    """
+    Page-number pagination for a list whose size is already known (e.g. from
+    an aggregate run anyway), saving Paginator's COUNT(*) query.
+    """
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self._count = count
+
+    @property
+    def count(self):
+        return self._count
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Cursor pagination over a fixed ordering, e.g. ('-is_featured', '-created_at', '-id').
+
+    Each page is fetched with a WHERE on the last seen sort key instead of an
+    OFFSET, so page 50 costs the same as page 1. The last field must be unique
+    (normally the primary key) so every row has a distinct position. Cursors are
+    signed, so they are opaque to clients and can't be tampered with.
+    """
+
+    def __init__(self, queryset, ordering, per_page=12):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.fields = [
+            (name.lstrip('-'), name.startswith('-')) for name in self.ordering
+        ]
+
+    def page(self, cursor=None):
+        position = self._decode(cursor) if cursor else None
+
+        if position is None:
+            rows = list(self.queryset.order_by(*self.ordering)[:self.per_page + 1])
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            return KeysetPage(
+                rows,
+                next_cursor=self._encode(rows[-1], 'next') if has_more else None,
+            )
+
+        direction, values = position
+        backwards = direction == 'previous'
+        ordering = [self._flip(name) for name in self.ordering] if backwards else self.ordering
+        queryset = self.queryset.filter(self._after(values, backwards)).order_by(*ordering)
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if backwards:
+            rows.reverse()
+            next_cursor = self._encode(rows[-1], 'next') if rows else None
+            previous_cursor = self._encode(rows[0], 'previous') if has_more else None
+        else:
+            next_cursor = self._encode(rows[-1], 'next') if has_more else None
+            previous_cursor = self._encode(rows[0], 'previous') if rows else None
+
+        return KeysetPage(rows, next_cursor=next_cursor, previous_cursor=previous_cursor)
+
+    def _after(self, values, backwards=False):
+        # (a, b, c) after (x, y, z)  ==  a > x  OR  (a = x AND b > y)  OR  ...
+        condition = Q()
+        for i, (name, descending) in enumerate(self.fields):
+            lookup = 'lt' if descending != backwards else 'gt'
+            term = Q(**{f'{name}__{lookup}': values[i]})
+            for j, (prev_name, _) in enumerate(self.fields[:i]):
+                term &= Q(**{prev_name: values[j]})
+            condition |= term
+        return condition
+
+    @staticmethod
+    def _flip(name):
+        return name[1:] if name.startswith('-') else f'-{name}'
+
+    def _value(self, row, name):
+        if isinstance(row, dict):
+            return row[name]
+        return getattr(row, name)
+
+    def _encode(self, row, direction):
+        values = []
+        for name, _ in self.fields:
+            value = self._value(row, name)
+            if isinstance(value, (datetime, date)):
+                value = value.isoformat()
+            elif isinstance(value, Decimal):
+                value = str(value)
+            values.append(value)
+        return signing.dumps(
+            {'o': list(self.ordering), 'd': direction, 'v': values},
+            salt=CURSOR_SALT,
+        )
+
+    def _decode(self, cursor):
+        """Returns (direction, values) or None for a bad/stale cursor"""
+        try:
+            payload = signing.loads(cursor, salt=CURSOR_SALT)
+        except signing.BadSignature:
+            return None
+        if payload.get('o') != list(self.ordering) or payload.get('d') not in ('next', 'previous'):
+            return None
+
+        raw_values = payload.get('v') or []
+        if len(raw_values) != len(self.fields):
+            return None
+
+        values = []
+        opts = self.queryset.model._meta
+        annotations = self.queryset.query.annotations
+        for (name, _), raw in zip(self.fields, raw_values):
+            if name in annotations:
+                values.append(raw)
+                continue
+            try:
+                values.append(opts.get_field(name).to_python(raw))
+            except ValidationError:
+                return None
+        return payload['d'], values
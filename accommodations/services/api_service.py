@@ -0,0 +1,92 @@
+import json
+
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+
+from ..models import AccommodationImage
+from .image_service import ImageRenditionService
+
+try:
+    import orjson
+except ImportError:  # plain json is slower but gives the same output
+    orjson = None
+
+_encoder = DjangoJSONEncoder()
+
+
+def dumps(data):
+    """JSON bytes; dates and decimals come out as DjangoJSONEncoder writes them"""
+    if orjson is not None:
+        return orjson.dumps(data, default=_encoder.default, option=orjson.OPT_PASSTHROUGH_DATETIME)
+    return json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'), ensure_ascii=False).encode()
+
+
+def json_response(data, status=200):
+    response = HttpResponse(dumps(data), status=status, content_type='application/json')
+    # Public, read-only data: partner sites may fetch it from the browser
+    response['Access-Control-Allow-Origin'] = '*'
+    return response
+
+
+def error_response(message, status=400):
+    return json_response({'error': message}, status=status)
+
+
+class Projection:
+    """
+    Named API fields mapped to ORM lookups, read with values() so rows stay
+    plain dicts. Computed fields (filled in by the view) map to None.
+    """
+
+    def __init__(self, fields, default=None):
+        self.fields = fields
+        self.default = tuple(default or fields)
+
+    def select(self, requested):
+        """Field names from a `fields=a,b` parameter; ValueError for unknown ones"""
+        if not requested:
+            return self.default
+        names = tuple(dict.fromkeys(name.strip() for name in requested.split(',') if name.strip()))
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        return names or self.default
+
+    def lookups(self, names, extra=()):
+        """values() arguments for names, plus extra lookups the view needs (e.g. sort keys)"""
+        lookups = [self.fields[name] for name in names if self.fields[name]]
+        return list(dict.fromkeys([*lookups, *extra]))
+
+    def render(self, row, names):
+        return {name: row[self.fields[name]] for name in names if self.fields[name]}
+
+
+class ApiService:
+
+    @staticmethod
+    def listing_images(accommodation_ids):
+        """{accommodation_id: [image, ...]} of processed images, primary first"""
+        rows = (
+            AccommodationImage.objects
+            .filter(accommodation_id__in=accommodation_ids, status=AccommodationImage.READY)
+            .order_by('-is_primary', 'id')
+            .values('accommodation_id', 'image', 'renditions')
+        )
+        images = {}
+        for row in rows:
+            images.setdefault(row['accommodation_id'], []).append(ApiService.image(row))
+        return images
+
+    @staticmethod
+    def image(row):
+        # Same URLs as AccommodationImage.srcset, without building the model
+        entries = sorted(row['renditions'].values(), key=lambda entry: entry['width'])
+        srcset = {
+            fmt: ', '.join(f"{default_storage.url(entry[fmt])} {entry['width']}w" for entry in entries if fmt in entry)
+            for fmt in ImageRenditionService.FORMATS
+        }
+        return {
+            'url': default_storage.url(row['image']),
+            'srcset': {fmt: value for fmt, value in srcset.items() if value},
+        }
@@ -0,0 +1,252 @@
+import hashlib
+import logging
+import threading
+import time
+
+from cachetools import TTLCache
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.dispatch import Signal
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+# Sent with tags={...} after invalidate_tags(), for things built from cached
+# data that aren't cached_query() entries themselves (seo's pre-rendered pages)
+tags_invalidated = Signal()
+
+TAG_PREFIX = 'cachetag:'
+LOCK_TIMEOUT = 30      # seconds a recompute lock is held at most
+LOCK_WAIT = 2.0        # seconds to wait for another worker's recompute
+LOCK_POLL = 0.05
+
+
+class CacheStats:
+    """Per-process hit/miss counters for cached_query()"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {'l1_hits': 0, 'l2_hits': 0, 'misses': 0, 'waits': 0}
+
+    def reset(self):
+        with self._lock:
+            for name in self.counters:
+                self.counters[name] = 0
+
+    def incr(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self.counters)
+        lookups = counters['l1_hits'] + counters['l2_hits'] + counters['misses']
+        counters['hit_ratio'] = (
+            (counters['l1_hits'] + counters['l2_hits']) / lookups if lookups else 0.0
+        )
+        return counters
+
+
+stats = CacheStats()
+
+# L1: small per-process LRU in front of the shared cache. Entries are keyed by
+# the tag-versioned key, and the tag versions themselves are kept here for the
+# same few seconds, so an L1 hit never goes to the shared cache. The price: a
+# tag bumped by another process can take up to CACHE_L1_TIMEOUT seconds to show
+# here (bumps made by this process show straight away).
+_l1 = TTLCache(
+    maxsize=getattr(settings, 'CACHE_L1_MAX_ENTRIES', 512),
+    ttl=getattr(settings, 'CACHE_L1_TIMEOUT', 5),
+)
+_l1_versions = TTLCache(
+    maxsize=getattr(settings, 'CACHE_L1_MAX_ENTRIES', 512),
+    ttl=getattr(settings, 'CACHE_L1_TIMEOUT', 5),
+)
+_l1_lock = threading.Lock()
+
+# One lock per key being recomputed in this process (single-flight)
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def _tag_key(tag):
+    return f'{TAG_PREFIX}{tag}'
+
+
+def tag_versions(tags):
+    """Current version of each tag, creating missing ones"""
+    if not tags:
+        return {}
+    keys = {_tag_key(tag): tag for tag in tags}
+    found = cache.get_many(list(keys))
+    versions = {}
+    for key, tag in keys.items():
+        version = found.get(key)
+        if version is None:
+            # Start from the clock so a flushed cache never reuses old versions
+            cache.add(key, time.time_ns(), None)
+            version = cache.get(key)
+        versions[tag] = version
+    return versions
+
+
+def invalidate_tags(*tags):
+    """Bump tags so every cached_query() entry that used them misses"""
+    with _l1_lock:
+        for tag in tags:
+            _l1_versions.pop(tag, None)
+    for tag in set(tags):
+        key = _tag_key(tag)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+    tags_invalidated.send(sender=None, tags=set(tags))
+
+
+def invalidate_on_commit(*tags):
+    """invalidate_tags() once the current transaction commits (immediately outside one)"""
+    transaction.on_commit(lambda: invalidate_tags(*tags))
+
+
+def listing_tags(accommodation_id, location_id=None, landlord_id=None):
+    """Tags covering everything that shows a listing"""
+    tags = [f'listing:{accommodation_id}', 'browse', 'featured', 'sitemap:accommodations']
+    if location_id is not None:
+        tags.append(f'location:{location_id}')
+    if landlord_id is not None:
+        tags.append(f'landlord:{landlord_id}')
+    return tags
+
+
+def landlord_tags(landlord_id):
+    """Tags covering pages that show a landlord's profile details"""
+    return [f'landlord:{landlord_id}', 'browse', 'featured']
+
+
+def cache_public_page(response, *tags):
+    """
+    Let AnonymousPageCacheMiddleware serve response to anonymous visitors
+    until one of tags is invalidated. Returns the response.
+    """
+    response.page_cache_tags = tags
+    return response
+
+
+def local_tag_versions(tags):
+    """
+    tag_versions() through the L1, so only tags not read lately cost a cache
+    round trip. These are the versions cached_query() entries are built from.
+    """
+    with _l1_lock:
+        versions = {tag: _l1_versions.get(tag) for tag in tags}
+    missing = [tag for tag, version in versions.items() if version is None]
+    if missing:
+        fetched = tag_versions(missing)
+        with _l1_lock:
+            _l1_versions.update(fetched)
+        versions.update(fetched)
+    return versions
+
+
+def _versioned_key(key, tags):
+    versions = local_tag_versions(sorted(set(tags)))
+    if not versions:
+        return f'cq:{key}'
+    signature = ','.join(f'{tag}={version}' for tag, version in sorted(versions.items()))
+    return f'cq:{key}:' + hashlib.md5(signature.encode()).hexdigest()
+
+
+def _l1_get(key):
+    with _l1_lock:
+        return _l1.get(key, _MISSING)
+
+
+def _l1_set(key, value):
+    with _l1_lock:
+        _l1[key] = value
+
+
+def _flight_lock(key):
+    with _flights_lock:
+        lock = _flights.get(key)
+        if lock is None:
+            lock = _flights[key] = threading.Lock()
+        return lock
+
+
+def _release_flight(key):
+    with _flights_lock:
+        _flights.pop(key, None)
+
+
+def cached_query(key, ttl, loader, tags=()):
+    """
+    Return the cached result of `loader()`, computing it at most once per key.
+
+    Lookups go process L1 -> shared cache (Redis in production) -> loader.
+    A recompute is guarded twice against stampedes: a thread lock inside the
+    process and a cache.add() lock across processes, so when a hot key expires
+    only one worker runs the query while the others wait briefly for it.
+
+    `tags` ties the entry to invalidate_tags(), e.g. tags=['browse']. Other
+    processes see an invalidation within CACHE_L1_TIMEOUT seconds.
+    """
+    full_key = _versioned_key(key, tags)
+
+    value = _l1_get(full_key)
+    if value is not _MISSING:
+        stats.incr('l1_hits')
+        return value
+
+    value = cache.get(full_key, _MISSING)
+    if value is not _MISSING:
+        stats.incr('l2_hits')
+        _l1_set(full_key, value)
+        return value
+
+    with _flight_lock(full_key):
+        try:
+            # Another thread may have filled it while we waited for the lock
+            value = _l1_get(full_key)
+            if value is _MISSING:
+                value = _load(full_key, ttl, loader)
+                _l1_set(full_key, value)
+            else:
+                stats.incr('l1_hits')
+        finally:
+            _release_flight(full_key)
+    return value
+
+
+def _load(full_key, ttl, loader):
+    lock_key = f'{full_key}:lock'
+    owns_lock = cache.add(lock_key, 1, LOCK_TIMEOUT)
+    if not owns_lock:
+        # Someone else is computing it; give them a moment before doing it ourselves
+        stats.incr('waits')
+        deadline = time.monotonic() + LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL)
+            value = cache.get(full_key, _MISSING)
+            if value is not _MISSING:
+                stats.incr('l2_hits')
+                return value
+        logger.warning(f"Gave up waiting for cache recompute of {full_key}")
+
+    stats.incr('misses')
+    try:
+        value = loader()
+        cache.set(full_key, value, ttl)
+    finally:
+        if owns_lock:
+            cache.delete(lock_key)
+    return value
+
+
+def clear_local_cache():
+    with _l1_lock:
+        _l1.clear()
+        _l1_versions.clear()
@@ -1,75 +1,79 @@
-from django.core.mail import EmailMessage
 from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 import logging
 
+from ..mail import StreamingEmailMessage
+
 logger = logging.getLogger(__name__)
 
 class EmailSubmissionService:
     @staticmethod
-    def send_pdf_submission(user, pdf_file, message=None):
+    def build_pdf_submission(user, pdf_file, message=None, filename=None):
         """
-        Send PDF submission via email
-
-        
+        Build the proof of payment email for the admin inbox.
+        `filename` overrides pdf_file.name (stored files carry their upload path)
         """
-         # Check if email is configured
-        if not settings.EMAIL_HOST_USER or not settings.EMAIL_HOST_PASSWORD:
-            logger.error("Email configuration is missing.")
-            return False
+        filename = filename or pdf_file.name
+        subject = f"📄 Proof of Payment - {user.username}"
 
-        try:
-            subject = f"📄 Proof of Payment - {user.username}"
-            
-            # Build email body step by step
-            body_parts = [
-                "New Proof of Payment Submission Received!",
-                "",
-                "Landlord Details:",
-                f"- Username: {user.username}",
-                f"- Full Name: {user.get_full_name() or 'Not provided'}",
-                f"- Email: {user.email}",
-                f"- Company: {getattr(user.landlordprofile, 'company_name', 'Not provided')}",
-                f"- Phone: {getattr(user.landlordprofile, 'phone_number', 'Not provided')}",
-                ""
-            ]
-            
-            # Add message if provided
-            if message:
-                body_parts.extend([
-                    "Additional Message:",
-                    message,
-                    ""
-                ])
-            
-            # Add file details
+        # Build email body step by step
+        body_parts = [
+            "New Proof of Payment Submission Received!",
+            "",
+            "Landlord Details:",
+            f"- Username: {user.username}",
+            f"- Full Name: {user.get_full_name() or 'Not provided'}",
+            f"- Email: {user.email}",
+            f"- Company: {getattr(user.landlordprofile, 'company_name', 'Not provided')}",
+            f"- Phone: {getattr(user.landlordprofile, 'phone_number', 'Not provided')}",
+            ""
+        ]
+
+        # Add message if provided
+        if message:
             body_parts.extend([
-                f"File: {pdf_file.name}",
-                f"Size: {pdf_file.size / (1024*1024):.2f} MB",
-                "",
-                "---",
-                "This submission was sent from StudentPA Landlord Dashboard."
+                "Additional Message:",
+                message,
+                ""
             ])
-            
-            # Join all parts
-            body = "\n".join(body_parts)
-            
-            # Create email
-            email = EmailMessage(
-                subject=subject,
-                body=body,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                to=[settings.ADMIN_EMAIL],
+
+        # Add file details
+        body_parts.extend([
+            f"File: {filename}",
+            f"Size: {pdf_file.size / (1024*1024):.2f} MB",
+            "",
+            "---",
+            "This submission was sent from StudentPA Landlord Dashboard."
+        ])
+
+        # Create email
+        email = StreamingEmailMessage(
+            subject=subject,
+            body="\n".join(body_parts),
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[settings.ADMIN_EMAIL],
+        )
+
+        # Attach the PDF file; it's base64-encoded in chunks while sending,
+        # so pdf_file has to stay open until send() returns
+        email.attach_stream(filename, pdf_file, 'application/pdf')
+        return email
+
+    @staticmethod
+    def deliver_submission(submission):
+        """
+        Email a stored SubmissionHistory. Raises on any failure so the
+        caller (tasks.deliver_submission) can record it and retry.
+        """
+        if not settings.EMAIL_HOST_USER or not settings.EMAIL_HOST_PASSWORD:
+            raise ImproperlyConfigured("Email configuration is missing.")
+
+        with submission.file.open('rb') as pdf_file:
+            email = EmailSubmissionService.build_pdf_submission(
+                user=submission.landlord,
+                pdf_file=pdf_file,
+                message=submission.message,
+                filename=submission.filename,
             )
-            
-            # Attach the PDF file
-            email.attach(pdf_file.name, pdf_file.read(), 'application/pdf')
-            
-            # Send email
             email.send(fail_silently=False)
-            
-            logger.info(f"PDF submission sent successfully for user {user.username}")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Failed to send PDF submission: {e}")
-            return False
\ No newline at end of file
+        logger.info(f"PDF submission {submission.pk} sent successfully for user {submission.landlord.username}")
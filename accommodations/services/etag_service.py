@@ -0,0 +1,78 @@
+"""
+Validators (@condition etag/last-modified functions) and ordering shared by
+the HTML views and the JSON API, so both answer conditional requests for
+the same data the same way.
+"""
+from django.contrib import messages
+from django.db.models import Max
+
+from ..models import Accommodation, BROWSE_SORTS, DEFAULT_SORT
+from .cache_service import local_tag_versions, tag_versions
+from .search_service import SearchService
+
+
+def viewer(request):
+    """Who a page is rendered for, as part of its ETag; None while messages are pending"""
+    if len(messages.get_messages(request)):
+        return None
+    return f'user-{request.user.pk}' if request.user.is_authenticated else 'public'
+
+
+def browse_etag(request):
+    who = viewer(request)
+    if who is None:
+        return None
+    # The tag versions are the version counter for every filtered browse result;
+    # read through the L1 like the cached facets and locations the page shows
+    versions = local_tag_versions(['browse', 'locations'])
+    return f'browse-{versions["browse"]}-{versions["locations"]}-{who}'
+
+
+def browse_ordering(sort, search_query):
+    # Relevance is the default order for searches, featured-first otherwise
+    if sort in BROWSE_SORTS:
+        return BROWSE_SORTS[sort][1]
+    if search_query:
+        return SearchService.ORDERING
+    return BROWSE_SORTS[DEFAULT_SORT][1]
+
+
+def listing_state(request, pk, **filters):
+    """What a listing page's validators come from; one indexed query, kept on the request"""
+    if not hasattr(request, '_listing_state'):
+        request._listing_state = (
+            Accommodation.objects.filter(pk=pk, **filters)
+            .values('updated_at', 'landlord_id', 'location_id')
+            .annotate(last_image=Max('images__id'))
+            .order_by('pk')
+            .first()
+        )
+    return request._listing_state
+
+
+def listing_etag(request, pk, **filters):
+    state = listing_state(request, pk, **filters)
+    who = viewer(request)
+    if state is None or who is None:
+        return None
+    # The page also shows landlord and location details, which change on their own
+    versions = tag_versions([f'landlord:{state["landlord_id"]}', f'location:{state["location_id"]}'])
+    return '-'.join([
+        f'listing-{pk}', f'{state["updated_at"].timestamp():.6f}', str(state['last_image']),
+        *(str(version) for version in versions.values()), who,
+    ])
+
+
+def detail_etag(request, pk):
+    return listing_etag(request, pk, is_approved=True)
+
+
+def detail_last_modified(request, pk):
+    state = listing_state(request, pk, is_approved=True)
+    if state is None or viewer(request) != 'public':
+        return None
+    return state['updated_at']
+
+
+def preview_etag(request, pk):
+    return listing_etag(request, pk, landlord=request.user)
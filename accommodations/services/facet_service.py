@@ -0,0 +1,59 @@
+import hashlib
+import json
+
+from django.db.models import Count, Q
+
+from ..models import Accommodation, PRICE_RANGES
+from .cache_service import cached_query
+
+
+class FacetService:
+    CACHE_TIMEOUT = 60  # seconds
+
+    @staticmethod
+    def browse_facets(queryset, location_ids, search_query='', room_type='', location_id='', price_range=''):
+        """
+        Option counts for the browse sidebar. Each facet respects the other
+        active filters but not its own, so picking "Single Room" still shows
+        how many double rooms there are. Everything comes from one aggregate
+        query and is cached per filter combination.
+
+        `queryset` is the public (and searched) queryset before the sidebar
+        filters are applied. Returns::
+
+            {'total': n, 'room_type': {code: n}, 'location': {id: n}, 'price_range': {key: n}}
+        """
+        # JSON keeps the values apart even when the free-text query contains separators
+        signature = json.dumps([search_query, room_type, str(location_id), price_range])
+        cache_key = 'browse_facets:' + hashlib.md5(signature.encode()).hexdigest()
+        return cached_query(
+            cache_key,
+            FacetService.CACHE_TIMEOUT,
+            lambda: FacetService._compute(queryset, location_ids, room_type, location_id, price_range),
+            tags=['browse', 'locations'],
+        )
+
+    @staticmethod
+    def _compute(queryset, location_ids, room_type, location_id, price_range):
+        room_q = Q(room_type=room_type) if room_type else Q()
+        location_q = Q(location_id=location_id) if location_id and str(location_id).isdigit() else Q()
+        price_q = PRICE_RANGES[price_range][1] if price_range in PRICE_RANGES else Q()
+
+        aggregates = {'total': Count('id', filter=room_q & location_q & price_q)}
+        for code, _ in Accommodation.ROOM_TYPES:
+            aggregates[f'room_type__{code}'] = Count('id', filter=Q(room_type=code) & location_q & price_q)
+        for pk in location_ids:
+            aggregates[f'location__{pk}'] = Count('id', filter=Q(location_id=pk) & room_q & price_q)
+        # Price keys like '700+' aren't valid aggregate aliases, so number them
+        price_aliases = {key: f'price_range__{i}' for i, key in enumerate(PRICE_RANGES)}
+        for key, (_, bucket_q) in PRICE_RANGES.items():
+            aggregates[price_aliases[key]] = Count('id', filter=bucket_q & room_q & location_q)
+
+        counts = queryset.aggregate(**aggregates)
+
+        return {
+            'total': counts['total'],
+            'room_type': {code: counts[f'room_type__{code}'] for code, _ in Accommodation.ROOM_TYPES},
+            'location': {pk: counts[f'location__{pk}'] for pk in location_ids},
+            'price_range': {key: counts[alias] for key, alias in price_aliases.items()},
+        }
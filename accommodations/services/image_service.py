@@ -0,0 +1,78 @@
+import logging
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+
+class ImageRenditionService:
+    # name -> longest edge in px. Cards are ~400px wide, the detail hero ~800px
+    SIZES = {
+        'card': 480,
+        'detail': 1200,
+        'full': 1920,
+    }
+    FORMATS = {
+        'webp': {'format': 'WEBP', 'quality': 80, 'method': 6},
+        'avif': {'format': 'AVIF', 'quality': 55},
+    }
+
+    @staticmethod
+    def available_formats():
+        formats = ['webp']
+        if features.check('avif'):
+            formats.append('avif')
+        return formats
+
+    @staticmethod
+    def generate(image):
+        """
+        Build every rendition for an AccommodationImage and record them in
+        `image.renditions` as {size: {'width', 'height', <format>: path}}.
+        Orientation comes from EXIF; no metadata is written to the output.
+        """
+        ImageRenditionService.delete(image)
+
+        with image.image.open('rb') as source:
+            original = Image.open(source)
+            original = ImageOps.exif_transpose(original)
+            if original.mode not in ('RGB', 'RGBA'):
+                original = original.convert('RGBA' if 'A' in original.getbands() else 'RGB')
+
+            renditions = {}
+            previous_size = None
+            for size, edge in ImageRenditionService.SIZES.items():
+                rendition = original.copy()
+                rendition.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+                if rendition.size == previous_size:
+                    # Small upload: thumbnail() doesn't upscale, so larger sizes would be duplicates
+                    break
+                previous_size = rendition.size
+                entry = {'width': rendition.width, 'height': rendition.height}
+
+                for fmt in ImageRenditionService.available_formats():
+                    options = dict(ImageRenditionService.FORMATS[fmt])
+                    buffer = BytesIO()
+                    rendition.save(buffer, **options)
+                    path = f'accommodations/renditions/{image.pk}/{size}.{fmt}'
+                    entry[fmt] = default_storage.save(path, ContentFile(buffer.getvalue()))
+
+                renditions[size] = entry
+
+        image.renditions = renditions
+        image.save(update_fields=['renditions'])
+        return renditions
+
+    @staticmethod
+    def delete(image):
+        for entry in (image.renditions or {}).values():
+            for fmt in ImageRenditionService.FORMATS:
+                path = entry.get(fmt)
+                if path:
+                    try:
+                        default_storage.delete(path)
+                    except OSError as e:
+                        logger.warning(f"Could not delete rendition {path}: {e}")
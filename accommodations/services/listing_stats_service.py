@@ -0,0 +1,136 @@
+import logging
+import threading
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Case, F, Sum, Value, When
+from django.utils import timezone
+
+from ..models import Accommodation, ListingDailyStats
+
+logger = logging.getLogger(__name__)
+
+VIEWS = 'views'
+IMPRESSIONS = 'impressions'
+
+# Window the landlord dashboard reports on
+RECENT_DAYS = 30
+
+
+class ListingCounter:
+    """
+    Per-process buffer of listing views/impressions. Requests only bump a
+    Counter in memory; a background thread adds the totals to the
+    ListingDailyStats rows every LISTING_COUNTER_FLUSH_INTERVAL seconds, so
+    the database sees a couple of statements per interval instead of an
+    UPDATE per page view. close() (registered at exit by AccommodationsConfig)
+    stops the thread and saves the rest; counts still buffered when a process
+    is killed are lost.
+
+    With LISTING_COUNTER_FLUSH_INTERVAL = 0 (tests) no thread is started and
+    counts stay buffered until flush() is called.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = Counter()  # (date, accommodation_id, VIEWS/IMPRESSIONS) -> count
+        self._thread = None
+        self._stopped = threading.Event()
+
+    def add(self, field, accommodation_ids):
+        today = timezone.localdate()
+        with self._lock:
+            for accommodation_id in accommodation_ids:
+                self._pending[(today, accommodation_id, field)] += 1
+            if (
+                settings.LISTING_COUNTER_FLUSH_INTERVAL
+                and not self._stopped.is_set()
+                and (self._thread is None or not self._thread.is_alive())
+            ):
+                # Started lazily so each (forked) worker process gets its own
+                self._thread = threading.Thread(target=self._run, name='listing-counter', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopped.wait(settings.LISTING_COUNTER_FLUSH_INTERVAL):
+            close_old_connections()
+            self.flush()
+
+    def close(self):
+        """Stop the flush thread and save what is left"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+        if not pending:
+            return
+        try:
+            ListingStatsService.save(pending)
+        except Exception:
+            logger.exception(f"Could not save {sum(pending.values())} listing counts, keeping them for the next flush")
+            with self._lock:
+                self._pending.update(pending)
+
+
+counter = ListingCounter()
+
+
+class ListingStatsService:
+
+    @staticmethod
+    def count(response, views=(), impressions=()):
+        """
+        Mark response as showing these listings. ListingCounterMiddleware
+        counts it, also when it is served again from the page cache.
+        Returns the response.
+        """
+        response.listing_counts = {VIEWS: list(views), IMPRESSIONS: list(impressions)}
+        return response
+
+    @staticmethod
+    def save(pending):
+        """Add buffered {(date, accommodation_id, field): count} totals to the daily rows"""
+        by_day = defaultdict(lambda: defaultdict(dict))
+        for (day, accommodation_id, field), count in pending.items():
+            by_day[day][field][accommodation_id] = count
+
+        for day, fields in by_day.items():
+            ids = set().union(*fields.values())
+            # Skip listings deleted since they were seen
+            ids = set(Accommodation.objects.filter(pk__in=ids).values_list('pk', flat=True))
+            if not ids:
+                continue
+            with transaction.atomic():
+                ListingDailyStats.objects.bulk_create(
+                    [ListingDailyStats(accommodation_id=pk, date=day) for pk in ids],
+                    ignore_conflicts=True,
+                )
+                ListingDailyStats.objects.filter(date=day, accommodation_id__in=ids).update(**{
+                    field: F(field) + Case(
+                        *(When(accommodation_id=pk, then=Value(count)) for pk, count in counts.items() if pk in ids),
+                        default=Value(0),
+                    )
+                    for field, counts in fields.items()
+                })
+
+    @staticmethod
+    def recent(accommodations, days=RECENT_DAYS):
+        """Daily rows of the last `days` days (today included); accommodations is a queryset or ids"""
+        since = timezone.localdate() - timedelta(days=days - 1)
+        return ListingDailyStats.objects.filter(accommodation__in=accommodations, date__gte=since)
+
+    @staticmethod
+    def recent_totals(accommodations, days=RECENT_DAYS):
+        """{accommodation_id: {'views': n, 'impressions': n}} over the last `days` days"""
+        rows = (
+            ListingStatsService.recent(accommodations, days)
+            .values('accommodation_id')
+            .annotate(views=Sum(VIEWS), impressions=Sum(IMPRESSIONS))
+        )
+        return {row.pop('accommodation_id'): row for row in rows}
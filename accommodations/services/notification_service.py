@@ -0,0 +1,151 @@
+import logging
+import smtplib
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django_q.tasks import async_task
+
+logger = logging.getLogger(__name__)
+
+ACCOMMODATION_APPROVED = 'accommodation_approved'
+LANDLORD_VERIFIED = 'landlord_verified'
+
+
+class NotificationDispatcher:
+    """
+    Collects notifications for many users and sends them in one go:
+    every recipient gets a single digest email, all digests share one SMTP
+    connection (reopened every `batch_size` messages) and sending is throttled
+    to `rate` emails per second.
+
+    Each digest counts as delivered as soon as it has been handed to the
+    server; the objects behind the ones that couldn't be sent are left in
+    `unsent`, so a later run can retry just those.
+
+    Backend, rate and batch size default to the NOTIFICATION_* settings; pass
+    backend='django.core.mail.backends.locmem.EmailBackend' in tests.
+    """
+
+    def __init__(self, backend=None, rate=None, batch_size=None):
+        self.backend = backend or getattr(settings, 'NOTIFICATION_EMAIL_BACKEND', None)
+        self.rate = rate if rate is not None else getattr(settings, 'NOTIFICATION_RATE_LIMIT', 5)
+        self.batch_size = batch_size or getattr(settings, 'NOTIFICATION_BATCH_SIZE', 100)
+        self._events = OrderedDict()  # email -> (name, [lines], [object ids])
+        self.unsent = []
+
+    def add(self, user, line, object_id=None):
+        if not user.email:
+            logger.warning(f"Not notifying {user.username}: no email address")
+            return
+        name, lines, object_ids = self._events.setdefault(
+            user.email, (user.get_full_name() or user.username, [], [])
+        )
+        lines.append(line)
+        if object_id is not None:
+            object_ids.append(object_id)
+
+    def __len__(self):
+        return len(self._events)
+
+    def build_messages(self):
+        """(digest, ids of the objects it reports on) for every recipient"""
+        messages = []
+        for email, (name, lines, object_ids) in self._events.items():
+            if len(lines) == 1:
+                subject = "StudentPA: an update on your account"
+            else:
+                subject = f"StudentPA: {len(lines)} updates on your account"
+            body = "\n".join(
+                [f"Hi {name},", ""]
+                + [f"- {line}" for line in lines]
+                + ["", "---", "You can manage your listings from the StudentPA Landlord Dashboard."]
+            )
+            messages.append((EmailMessage(
+                subject=subject,
+                body=body,
+                from_email=settings.DEFAULT_FROM_EMAIL,
+                to=[email],
+            ), object_ids))
+        return messages
+
+    def send(self):
+        """Send every digest; returns how many went out"""
+        messages = self.build_messages()
+        self._events.clear()
+        self.unsent = []
+        sent = 0
+        for start in range(0, len(messages), self.batch_size):
+            sent += self._send_batch(messages[start:start + self.batch_size])
+        return sent
+
+    def _send_batch(self, messages):
+        # One connection (one TLS handshake) for the whole batch
+        connection = get_connection(self.backend, fail_silently=False)
+        step = max(int(self.rate), 1) if self.rate else len(messages)
+        done = 0  # messages dealt with, sent or not
+        sent = 0
+        try:
+            connection.open()
+            while done < len(messages):
+                started = time.monotonic()
+                for message, object_ids in messages[done:done + step]:
+                    done += 1
+                    try:
+                        connection.send_messages([message])
+                    except (smtplib.SMTPException, OSError) as e:
+                        logger.error(f"Failed to send a notification to {message.to[0]}: {e}")
+                        self.unsent.extend(object_ids)
+                        # The connection may be gone; start a fresh one for the rest
+                        connection.close()
+                        connection.open()
+                    else:
+                        sent += 1
+                if self.rate and done < len(messages):
+                    time.sleep(max(0.0, 1.0 - (time.monotonic() - started)))
+        except (smtplib.SMTPException, OSError) as e:
+            # Couldn't (re)connect: the rest wait for the next run
+            logger.error(f"Mail server unavailable, {len(messages) - done} notifications left for later: {e}")
+            for message, object_ids in messages[done:]:
+                self.unsent.extend(object_ids)
+        finally:
+            connection.close()
+        return sent
+
+
+class NotificationService:
+    @staticmethod
+    def notify(event, object_ids):
+        """Queue a notification run for the worker once the current transaction commits"""
+        object_ids = list(object_ids)
+        if object_ids:
+            transaction.on_commit(
+                lambda: async_task('accommodations.tasks.send_notifications', event, object_ids)
+            )
+
+    @staticmethod
+    def dispatch(event, object_ids, dispatcher=None):
+        """Build and send the digests for one admin action"""
+        from django.contrib.auth.models import User
+        from ..models import Accommodation
+
+        if dispatcher is None:
+            dispatcher = NotificationDispatcher()
+        if event == ACCOMMODATION_APPROVED:
+            accommodations = Accommodation.objects.filter(pk__in=object_ids).select_related('landlord', 'location')
+            for accommodation in accommodations:
+                dispatcher.add(
+                    accommodation.landlord,
+                    f"Your {accommodation.get_room_type_display().lower()} listing in "
+                    f"{accommodation.location.name} (R{accommodation.price}/month) has been "
+                    f"approved and is now visible to students.",
+                    accommodation.pk,
+                )
+        elif event == LANDLORD_VERIFIED:
+            for user in User.objects.filter(pk__in=object_ids):
+                dispatcher.add(user, "Your landlord account has been verified.", user.pk)
+        else:
+            raise ValueError(f"Unknown notification event {event}")
+        return dispatcher.send()
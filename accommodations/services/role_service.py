@@ -0,0 +1,98 @@
+import time
+
+from django.contrib.auth.models import Group
+
+from .cache_service import local_tag_versions
+
+LANDLORD = 'landlord'
+STUDENT = 'student'
+
+GROUP_NAMES = {
+    LANDLORD: 'Landlords',
+    STUDENT: 'Students',
+}
+
+SESSION_KEY = '_user_role'
+# Sessions re-check the role this often even without an invalidation
+SESSION_TTL = 300
+# Invalidated when anyone's groups change (e.g. Landlords renamed), and per user
+ROLES_TAG = 'roles'
+
+
+def role_tags(user_id):
+    return [ROLES_TAG, f'role:{user_id}']
+
+
+class RoleService:
+    """
+    Works out whether a user is a landlord or a student.
+
+    Group ids are looked up once per process. A user's role costs at most one
+    query per request (memoised on the user object) and is kept in the session
+    for SESSION_TTL seconds, so most requests don't query groups at all.
+    Changing a user's groups invalidates their role tag, which the session
+    copy is checked against.
+    """
+
+    _group_ids = {}
+
+    @staticmethod
+    def group_id(role):
+        group_id = RoleService._group_ids.get(role)
+        if group_id is None:
+            # Two threads may both look it up the first time; harmless
+            group, _ = Group.objects.get_or_create(name=GROUP_NAMES[role])
+            group_id = RoleService._group_ids[role] = group.pk
+        return group_id
+
+    @staticmethod
+    def clear_group_cache():
+        RoleService._group_ids.clear()
+
+    @staticmethod
+    def add_to_role(user, role):
+        """Put a (new) user in the role's group"""
+        user.groups.add(RoleService.group_id(role))
+        user._user_role = role
+
+    @staticmethod
+    def resolve(user):
+        """Role of a user ('landlord', 'student' or None), one query at most"""
+        if not user.is_authenticated:
+            return None
+        if not hasattr(user, '_user_role'):
+            group_ids = set(user.groups.values_list('id', flat=True))
+            role = None
+            # Landlords win if someone is somehow in both groups
+            for candidate in (LANDLORD, STUDENT):
+                if RoleService.group_id(candidate) in group_ids:
+                    role = candidate
+                    break
+            user._user_role = role
+        return user._user_role
+
+    @staticmethod
+    def get_role(request):
+        """resolve() for the request's user, cached in the session"""
+        user = request.user
+        if not user.is_authenticated:
+            return None
+        if hasattr(user, '_user_role'):
+            return user._user_role
+
+        versions = list(local_tag_versions(role_tags(user.pk)).values())
+        cached = request.session.get(SESSION_KEY)
+        if (
+            cached and cached.get('user') == user.pk and cached.get('versions') == versions
+            and time.time() - cached.get('at', 0) < SESSION_TTL
+        ):
+            user._user_role = cached.get('role')
+            return user._user_role
+
+        role = RoleService.resolve(user)
+        request.session[SESSION_KEY] = {'user': user.pk, 'role': role, 'versions': versions, 'at': int(time.time())}
+        return role
+
+    @staticmethod
+    def is_landlord(user):
+        return RoleService.resolve(user) == LANDLORD or user.is_superuser
@@ -0,0 +1,196 @@
+import logging
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime, time as day_start, timedelta
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from ..models import SearchFilterDaily, SearchLogEntry, SearchQueryDaily
+
+logger = logging.getLogger(__name__)
+
+# Browse filters that make up a filter combination
+SEARCH_FILTERS = ('room_type', 'location', 'price_range', 'sort')
+# Events a process holds at most while waiting for the writer thread
+MAX_BUFFERED = 10000
+
+
+def normalize_query(text):
+    return ' '.join(text.lower().split())[:200]
+
+
+def filter_key(filters):
+    """'location=3&room_type=single' for the non-empty filters, in a fixed order"""
+    return urlencode(sorted((name, value) for name, value in filters.items() if value))[:200]
+
+
+class SearchLog:
+    """
+    Append-only, per-process buffer of browse searches. record() never waits
+    on the database: it adds to a bounded deque (the oldest events drop off
+    if the writer falls behind) and a background thread bulk-inserts the
+    events into SearchLogEntry every SEARCH_LOG_FLUSH_INTERVAL seconds.
+
+    Under load at most SEARCH_LOG_MAX_PER_SECOND events a second are kept:
+    each second's searches go through a reservoir sample, so every search in
+    that second is equally likely to be kept. When the second is over, each
+    kept event weighs searches/kept for that second, so the weights add up to
+    the real number of searches.
+    """
+
+    def __init__(self):
+        self._events = deque(maxlen=MAX_BUFFERED)
+        # The second being sampled: its number, searches seen, events kept
+        self._lock = threading.Lock()
+        self._second = 0
+        self._seen = 0
+        self._sample = []
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def record(self, query, filters, result_count, latency_ms):
+        entry = SearchLogEntry(
+            created_at=timezone.now(),
+            query=query,
+            filters=filters,
+            result_count=result_count,
+            latency_ms=latency_ms,
+        )
+        second = int(time.time())
+        limit = settings.SEARCH_LOG_MAX_PER_SECOND
+        with self._lock:
+            if second != self._second:
+                self._close_second()
+                self._second = second
+            self._seen += 1
+            if len(self._sample) < limit:
+                self._sample.append(entry)
+            else:
+                slot = random.randrange(self._seen)
+                if slot < limit:
+                    self._sample[slot] = entry
+        if self._thread is None or not self._thread.is_alive():
+            self._start_writer()
+
+    def _close_second(self):
+        # Called with self._lock held
+        if self._sample:
+            weight = self._seen / len(self._sample)
+            for entry in self._sample:
+                entry.weight = weight
+            self._events.extend(self._sample)
+        self._seen = 0
+        self._sample = []
+
+    def _start_writer(self):
+        with self._thread_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='search-log', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(settings.SEARCH_LOG_FLUSH_INTERVAL)
+            close_old_connections()
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            if self._second != int(time.time()):
+                self._close_second()
+        entries = []
+        while True:
+            try:
+                entries.append(self._events.popleft())
+            except IndexError:
+                break
+        if not entries:
+            return
+        try:
+            SearchLogEntry.objects.bulk_create(entries, batch_size=500)
+        except Exception:
+            # Analytics only: drop the batch rather than pile up retries
+            logger.exception(f"Could not write {len(entries)} search log entries")
+
+
+search_log = SearchLog()
+
+
+class SearchAnalyticsService:
+
+    @staticmethod
+    def mark(response, query, filters, result_count, latency_ms):
+        """
+        Attach a search to response. SearchLogMiddleware records it, also when
+        the page is served again from the page cache. Returns the response.
+        """
+        response.search_event = {
+            'query': normalize_query(query),
+            'filters': filter_key(filters),
+            'result_count': result_count,
+            'latency_ms': latency_ms,
+        }
+        return response
+
+    @staticmethod
+    def rollup(days=2):
+        """Rebuild the rollups of the last `days` days from the raw log, then prune it"""
+        today = timezone.localdate()
+        for offset in range(days):
+            SearchAnalyticsService.rollup_day(today - timedelta(days=offset))
+        cutoff = timezone.now() - timedelta(days=settings.SEARCH_LOG_RETENTION_DAYS)
+        SearchLogEntry.objects.filter(created_at__lt=cutoff).delete()
+
+    @staticmethod
+    def rollup_day(day):
+        start = timezone.make_aware(datetime.combine(day, day_start.min))
+        entries = SearchLogEntry.objects.filter(created_at__gte=start, created_at__lt=start + timedelta(days=1))
+        totals = {
+            'searches': Sum('weight'),
+            'zero_result_searches': Coalesce(Sum('weight', filter=Q(result_count=0)), Value(0.0)),
+        }
+        queries = entries.values('query').annotate(**totals)
+        filters = entries.values('filters').annotate(**totals)
+        p95 = SearchAnalyticsService.p95_latency(entries)
+
+        with transaction.atomic():
+            SearchQueryDaily.objects.filter(date=day).delete()
+            SearchQueryDaily.objects.bulk_create([
+                SearchQueryDaily(
+                    date=day, query=row['query'],
+                    searches=round(row['searches']), zero_result_searches=round(row['zero_result_searches']),
+                )
+                for row in queries
+            ])
+            SearchFilterDaily.objects.filter(date=day).delete()
+            SearchFilterDaily.objects.bulk_create([
+                SearchFilterDaily(
+                    date=day, filters=row['filters'],
+                    searches=round(row['searches']), zero_result_searches=round(row['zero_result_searches']),
+                    p95_latency_ms=p95.get(row['filters']),
+                )
+                for row in filters
+            ])
+
+    @staticmethod
+    def p95_latency(entries):
+        """{filters: weighted 95th percentile latency}, streamed in latency order per combination"""
+        timed = entries.filter(latency_ms__isnull=False)
+        totals = dict(timed.values_list('filters').annotate(Sum('weight')))
+        seen = defaultdict(float)
+        p95 = {}
+        rows = timed.order_by('filters', 'latency_ms').values_list('filters', 'latency_ms', 'weight')
+        for filters, latency_ms, weight in rows.iterator():
+            if filters in p95:
+                continue
+            seen[filters] += weight
+            if seen[filters] >= 0.95 * totals[filters]:
+                p95[filters] = latency_ms
+        return p95
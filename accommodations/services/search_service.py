@@ -0,0 +1,157 @@
+import logging
+import re
+
+from django.db import OperationalError, connection
+from django.db.models import BooleanField, FloatField, OuterRef, Subquery, Value
+from django.db.models.expressions import RawSQL
+
+logger = logging.getLogger(__name__)
+
+# Created by migration 0009 on SQLite only
+FTS_TABLE = 'accommodations_searchindex'
+
+
+class PostgresSearchBackend:
+    """
+    tsvector + GIN. The vector is a generated column on the search document
+    table (see migration 0009), so saving the document body keeps it current.
+    """
+
+    def index(self, document):
+        pass
+
+    def remove(self, accommodation_id):
+        pass
+
+    def filter(self, queryset, query):
+        from ..models import SearchDocument
+
+        rank = (
+            SearchDocument.objects.filter(accommodation=OuterRef('pk'))
+            .annotate(rank=RawSQL(
+                "ts_rank(search_vector, websearch_to_tsquery('english', %s))::float8",
+                [query],
+                output_field=FloatField(),
+            ))
+            .values('rank')[:1]
+        )
+        matches = SearchDocument.objects.filter(RawSQL(
+            "search_vector @@ websearch_to_tsquery('english', %s)",
+            [query],
+            output_field=BooleanField(),
+        ))
+        return queryset.filter(
+            pk__in=matches.values('accommodation_id')
+        ).annotate(search_rank=Subquery(rank, output_field=FloatField()))
+
+
+class SQLiteSearchBackend:
+    """FTS5 table keyed by accommodation id, for local runs"""
+
+    def index(self, document):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [document.accommodation_id])
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, body) VALUES (%s, %s)",
+                [document.accommodation_id, document.body],
+            )
+
+    def remove(self, accommodation_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [accommodation_id])
+
+    def filter(self, queryset, query):
+        # Quote every word so user input can't break the FTS5 query syntax,
+        # and allow prefixes so "camp" finds "campus"
+        terms = re.findall(r'\w+', query.lower())
+        if not terms:
+            return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+        match = ' '.join(f'"{term}"*' for term in terms)
+
+        table = queryset.model._meta.db_table
+        return queryset.filter(pk__in=RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+            [match],
+        )).annotate(search_rank=RawSQL(
+            f"SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s AND rowid = {table}.id",
+            [match],
+            output_field=FloatField(),
+        ))
+
+
+class BasicSearchBackend:
+    """Unranked substring match on the search document, when no index is available"""
+
+    def index(self, document):
+        pass
+
+    def remove(self, accommodation_id):
+        pass
+
+    def filter(self, queryset, query):
+        return queryset.filter(search_document__body__icontains=query).annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        )
+
+
+_backend = None
+
+
+def get_search_backend():
+    global _backend
+    if _backend is None:
+        if connection.vendor == 'postgresql':
+            _backend = PostgresSearchBackend()
+        elif connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names():
+            _backend = SQLiteSearchBackend()
+        else:
+            _backend = BasicSearchBackend()
+    return _backend
+
+
+class SearchService:
+    # Order search results by relevance; id keeps keyset cursors stable on ties
+    ORDERING = ('-search_rank', '-id')
+
+    @staticmethod
+    def build_document(accommodation):
+        """Text a student might search a listing by"""
+        parts = [
+            accommodation.description,
+            accommodation.location.name,
+            accommodation.company_name,
+            accommodation.room_type,
+            accommodation.get_room_type_display(),
+        ]
+        return "\n".join(part for part in parts if part)
+
+    @staticmethod
+    def index_accommodation(accommodation):
+        from ..models import SearchDocument
+
+        document, _ = SearchDocument.objects.update_or_create(
+            accommodation=accommodation,
+            defaults={'body': SearchService.build_document(accommodation)},
+        )
+        try:
+            get_search_backend().index(document)
+        except OperationalError as e:
+            logger.error(f"Failed to index accommodation {accommodation.pk}: {e}")
+
+    @staticmethod
+    def index_queryset(queryset):
+        for accommodation in queryset.select_related('location', 'landlord__landlordprofile'):
+            SearchService.index_accommodation(accommodation)
+
+    @staticmethod
+    def remove_accommodation(accommodation_id):
+        try:
+            get_search_backend().remove(accommodation_id)
+        except OperationalError as e:
+            logger.error(f"Failed to remove accommodation {accommodation_id} from index: {e}")
+
+    @staticmethod
+    def search(queryset, query):
+        """Filter to matches and annotate `search_rank` (higher is better)"""
+        return get_search_backend().filter(queryset, query)
@@ -0,0 +1,52 @@
+from django.contrib.sitemaps import views as sitemap_views
+from django.http import Http404
+
+from .cache_service import cached_query
+
+# Sections are invalidated through their cache_tags; this is only a backstop
+SITEMAP_TIMEOUT = 60 * 60 * 24
+
+
+class SitemapService:
+    """
+    Renders sitemap XML with Django's sitemap views and keeps the result in
+    cached_query(), one entry for the index and one per section page. A
+    Sitemap class lists the tags its content depends on in `cache_tags`, so a
+    listing change only re-renders the listing section (and the index) on the
+    next crawler hit.
+    """
+
+    @staticmethod
+    def _tags(sitemaps):
+        return sorted({tag for site in sitemaps.values() for tag in getattr(site, 'cache_tags', ())})
+
+    @staticmethod
+    def _render(response):
+        response.render()
+        return {'content': response.content, 'last_modified': response.get('Last-Modified')}
+
+    @staticmethod
+    def render_index(request, sitemaps, sitemap_url_name):
+        return cached_query(
+            f'sitemap:index:{request.scheme}', SITEMAP_TIMEOUT,
+            lambda: SitemapService._render(
+                sitemap_views.index(request, sitemaps, sitemap_url_name=sitemap_url_name)
+            ),
+            tags=SitemapService._tags(sitemaps),
+        )
+
+    @staticmethod
+    def render_section(request, sitemaps, section):
+        if section not in sitemaps:
+            raise Http404(f"No sitemap available for section: {section!r}")
+        page = request.GET.get('p', '1')
+        if not page.isdigit():
+            raise Http404("No page")
+        sitemaps = {section: sitemaps[section]}
+        return cached_query(
+            f'sitemap:{section}:{page}:{request.scheme}', SITEMAP_TIMEOUT,
+            lambda: SitemapService._render(
+                sitemap_views.sitemap(request, sitemaps, section=section)
+            ),
+            tags=SitemapService._tags(sitemaps),
+        )
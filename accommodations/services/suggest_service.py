@@ -0,0 +1,185 @@
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+
+from django.core.cache import cache
+from django.db import transaction
+
+from ..models import LandlordProfile, Location
+
+# Suggestion kinds
+LOCATION = 'location'
+AREA = 'area'
+LANDLORD = 'landlord'
+
+SUGGEST_LIMIT = 8
+# How often a process looks for changes made elsewhere (one cache read)
+SYNC_INTERVAL = 2.0
+# Changes are kept this long; a process that is further behind rebuilds instead
+JOURNAL_TIMEOUT = 3600
+MAX_REPLAY = 500
+# Sequence numbers a publish tries before making every process rebuild instead
+PUBLISH_ATTEMPTS = 5
+
+SEQ_KEY = 'suggest:seq'
+CHANGE_KEY = 'suggest:change:{}'
+
+_WORD_START = re.compile(r'(?<=[\s\-/(])\w')
+
+
+def normalize(text):
+    """Lower-case, accents stripped, whitespace collapsed"""
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.lower().split())
+
+
+class PrefixIndex:
+    """
+    Sorted (key, label, kind, source) entries, searched with bisect. Every
+    label is keyed from its start and from the start of each later word, so
+    'view' finds 'River View'. Treated as immutable once published: changes
+    go to a copy that replaces it.
+    """
+
+    def __init__(self):
+        self._entries = []
+        self._by_source = {}
+
+    def copy(self):
+        index = PrefixIndex()
+        index._entries = list(self._entries)
+        index._by_source = dict(self._by_source)
+        return index
+
+    def put(self, source, kind, label):
+        """Set the label of one source (a (type, pk) pair); None removes it"""
+        self.remove(source)
+        if not label or not label.strip():
+            return
+        name = normalize(label)
+        keys = [name] + [name[match.start():] for match in _WORD_START.finditer(name)]
+        entries = [(key, label.strip(), kind, source) for key in dict.fromkeys(keys)]
+        for entry in entries:
+            insort(self._entries, entry)
+        self._by_source[source] = entries
+
+    def remove(self, source):
+        for entry in self._by_source.pop(source, ()):
+            position = bisect_left(self._entries, entry)
+            if position < len(self._entries) and self._entries[position] == entry:
+                del self._entries[position]
+
+    def search(self, text, limit=SUGGEST_LIMIT):
+        prefix = normalize(text)
+        if not prefix:
+            return []
+        suggestions, seen = [], set()
+        position = bisect_left(self._entries, (prefix,))
+        while position < len(self._entries) and len(suggestions) < limit:
+            key, label, kind, _ = self._entries[position]
+            if not key.startswith(prefix):
+                break
+            if label.lower() not in seen:
+                seen.add(label.lower())
+                suggestions.append({'label': label, 'kind': kind})
+            position += 1
+        return suggestions
+
+    def __len__(self):
+        return len(self._by_source)
+
+
+class SuggestService:
+    """
+    Search box suggestions from an in-memory PrefixIndex of location, area
+    and verified landlord names; answering never touches the database.
+
+    Model changes are published as (source, kind, label) entries in a small
+    journal in the shared cache (SEQ_KEY counts them). Each process checks
+    the sequence at most every SYNC_INTERVAL seconds and replays what it
+    missed onto a copy of its index. It reloads everything from the
+    database only on first use, or when it has fallen too far behind.
+    """
+
+    _index = PrefixIndex()
+    _seq = None
+    _checked_at = 0.0
+    _lock = threading.Lock()
+
+    @staticmethod
+    def suggest(text, limit=SUGGEST_LIMIT):
+        SuggestService.sync()
+        return SuggestService._index.search(text, limit)
+
+    @staticmethod
+    def sources():
+        from seo.models import Region, Subregion
+        for pk, name in Location.objects.values_list('pk', 'name'):
+            yield ('location', pk), LOCATION, name
+        for pk, name in Region.objects.values_list('pk', 'name'):
+            yield ('region', pk), AREA, name
+        for pk, name in Subregion.objects.values_list('pk', 'name'):
+            yield ('subregion', pk), AREA, name
+        # "Approved" landlords: LandlordProfile has no is_approved like listings do;
+        # is_verified is how admins approve a landlord (verify_landlords action)
+        landlords = LandlordProfile.objects.filter(is_verified=True).exclude(company_name='')
+        for user_id, company_name in landlords.values_list('user_id', 'company_name'):
+            yield ('landlord', user_id), LANDLORD, company_name
+
+    @staticmethod
+    def sync(force=False):
+        now = time.monotonic()
+        if not force and SuggestService._seq is not None and now - SuggestService._checked_at < SYNC_INTERVAL:
+            return
+        with SuggestService._lock:
+            SuggestService._checked_at = now
+            seq = cache.get(SEQ_KEY, 0)
+            applied = SuggestService._seq
+            if applied is not None and seq == applied:
+                return
+            if applied is None or seq < applied or seq - applied > MAX_REPLAY:
+                # First use, cache flushed or too far behind; seq was read first,
+                # so changes made while we load get replayed next time
+                SuggestService._rebuild(seq)
+                return
+            changes = cache.get_many([CHANGE_KEY.format(number) for number in range(applied + 1, seq + 1)])
+            if len(changes) != seq - applied:
+                SuggestService._rebuild(seq)
+                return
+            index = SuggestService._index.copy()
+            for number in range(applied + 1, seq + 1):
+                index.put(*changes[CHANGE_KEY.format(number)])
+            SuggestService._index, SuggestService._seq = index, seq
+
+    @staticmethod
+    def _rebuild(seq):
+        index = PrefixIndex()
+        for source, kind, label in SuggestService.sources():
+            index.put(source, kind, label)
+        SuggestService._index, SuggestService._seq = index, seq
+
+    @staticmethod
+    def publish(source, kind, label):
+        """Journal one changed name (label None: gone) for every process, once committed"""
+        def journal():
+            for _ in range(PUBLISH_ATTEMPTS):
+                try:
+                    seq = cache.incr(SEQ_KEY)
+                except ValueError:
+                    cache.add(SEQ_KEY, 0, None)
+                    seq = cache.incr(SEQ_KEY)
+                # Some backends (the database cache) incr with a read and a write, so two
+                # processes can draw the same number; add() lets only one of them have it
+                if cache.add(CHANGE_KEY.format(seq), (source, kind, label), JOURNAL_TIMEOUT):
+                    return
+            # No free slot: skip far enough ahead that every process reloads from the database
+            cache.set(SEQ_KEY, seq + MAX_REPLAY + 1, None)
+
+        transaction.on_commit(journal)
+
+    @staticmethod
+    def landlord_changed(user_id, company_name, is_verified):
+        SuggestService.publish(('landlord', user_id), LANDLORD, company_name if is_verified else None)
@@ -1,7 +1,7 @@
 from django.contrib.sitemaps import Sitemap
+from django.db.models import Max
 from django.urls import reverse
-from django.contrib.sitemaps import Sitemap
-from .models import Accommodation 
+from .models import Accommodation
 
 
 
@@ -12,15 +12,13 @@ class StaticViewSitemap(Sitemap):
 
     def items(self):
         # List all named URLs that should appear in the sitemap
+        # (landlord dashboard pages need a login, so crawlers can't use them)
         return [
-            
+
             # Accommodation
             "home",
             "accommodation_list",
-            "landlord_dashboard",
-            "landlord_profile_update",
-            "accommodation_create",
-            
+
             # Content pages
             "terms_and_conditions",
             "privacy_policy",
@@ -35,9 +33,20 @@ class StaticViewSitemap(Sitemap):
 class AccommodationSitemap(Sitemap):
     changefreq = "weekly"
     priority = 0.9
+    limit = 50000  # URLs per sitemap file, the protocol maximum
+    # listing_tags() includes this, so any listing change re-renders the section
+    cache_tags = ['sitemap:accommodations']
 
     def items(self):
-        return Accommodation.objects.all()  
+        # Same rule as accommodation_detail, which 404s for unapproved listings
+        return Accommodation.objects.filter(is_approved=True).only('pk', 'updated_at').order_by('pk')
 
     def location(self, obj):
-        return obj.get_absolute_url()  
+        return obj.get_absolute_url()
+
+    def lastmod(self, obj):
+        return obj.updated_at
+
+    def get_latest_lastmod(self):
+        # The default walks every item; one MAX() will do
+        return self.items().aggregate(latest=Max('updated_at'))['latest']
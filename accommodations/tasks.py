@@ -0,0 +1,181 @@
+"""
+Background jobs, run by the django-q cluster (`python manage.py qcluster`).
+"""
+import logging
+from datetime import timedelta
+from io import BytesIO
+
+import magic
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from django.utils import timezone
+from django_q.models import Schedule
+from django_q.tasks import async_task, schedule
+from PIL import Image
+
+from .models import AccommodationImage, SubmissionHistory
+from .services.email_service import EmailSubmissionService
+from .services.image_service import ImageRenditionService
+from .services.notification_service import NotificationDispatcher, NotificationService
+from .services.search_analytics_service import SearchAnalyticsService
+
+logger = logging.getLogger(__name__)
+
+# Proof of payment emails: retry after 1, 2, 4, 8, ... minutes, then give up
+SUBMISSION_MAX_ATTEMPTS = 6
+SUBMISSION_RETRY_DELAY = 60
+# How long one attempt may take before the submission is due again (a worker
+# that died mid-send); longer than the cluster's task timeout
+SUBMISSION_LEASE = 300
+
+# Notifications the mail server didn't take are tried again this much later,
+# in this many runs at most
+NOTIFICATION_RETRY_DELAY = 300
+NOTIFICATION_MAX_RUNS = 4
+
+# Formats Pillow decodes out of the box (HEIC would need pillow-heif)
+ALLOWED_IMAGE_TYPES = {'image/jpeg', 'image/png', 'image/webp', 'image/gif'}
+
+
+def validate_image_file(image):
+    """Raise ValidationError unless the stored upload is an image Pillow can decode"""
+    # Read it all first, so storage errors surface as themselves and not as a bad image
+    with image.image.open('rb') as f:
+        data = f.read()
+    mime = magic.from_buffer(data[:2048], mime=True)
+    if mime not in ALLOWED_IMAGE_TYPES:
+        raise ValidationError(f"Unsupported file type {mime}")
+    try:
+        Image.open(BytesIO(data)).verify()
+        # verify() only checks the structure; decode the pixels to catch truncated files
+        Image.open(BytesIO(data)).load()
+    except MemoryError:
+        raise
+    except Exception as e:
+        raise ValidationError(f"Unreadable image: {e}")
+
+
+def process_image(image_id):
+    """
+    Validate one uploaded listing photo, build its renditions and mark it ready.
+    Uploads that aren't valid images are removed. Anything else (storage, memory,
+    timeouts) propagates, so django-q retries the task and the image stays
+    pending. Finally make sure the listing has a primary image.
+    """
+    image = AccommodationImage.objects.filter(pk=image_id).first()
+    if image is None:
+        return
+    accommodation_id = image.accommodation_id
+
+    try:
+        validate_image_file(image)
+    except ValidationError as e:
+        logger.error(f"Rejected image {image_id} for accommodation {accommodation_id}: {e.message}")
+        image.image.delete(save=False)
+        image.delete()
+    else:
+        ImageRenditionService.generate(image)
+        image.status = AccommodationImage.READY
+        image.save(update_fields=['status'])
+
+    select_primary_image(accommodation_id)
+
+
+def select_primary_image(accommodation_id):
+    """Promote the first ready image if the listing has no ready primary"""
+    images = AccommodationImage.objects.filter(
+        accommodation_id=accommodation_id, status=AccommodationImage.READY
+    ).order_by('id')
+    if images.filter(is_primary=True).exists():
+        return
+    first = images.first()
+    if first is not None:
+        first.is_primary = True
+        first.save(update_fields=['is_primary'])
+
+
+def deliver_submission(submission_id):
+    """
+    Email one pending proof of payment. Failures are retried with exponential
+    backoff by retry_submissions; the stored file is removed once the email
+    has gone out.
+    """
+    now = timezone.now()
+    # Claim the attempt: a submission is due when next_attempt_at is unset or past,
+    # and pushing it out by the lease keeps a second task (a sweep, a redelivered
+    # task) from sending it again while this one is at it
+    claimed = (
+        SubmissionHistory.objects
+        .filter(pk=submission_id, status=SubmissionHistory.PENDING)
+        .filter(Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now))
+        .update(attempts=F('attempts') + 1, next_attempt_at=now + timedelta(seconds=SUBMISSION_LEASE))
+    )
+    if not claimed:
+        return
+    submission = SubmissionHistory.objects.select_related('landlord__landlordprofile').get(pk=submission_id)
+
+    try:
+        EmailSubmissionService.deliver_submission(submission)
+    except Exception as e:
+        submission.last_error = str(e)
+        if submission.attempts >= SUBMISSION_MAX_ATTEMPTS:
+            logger.error(f"Giving up on submission {submission_id} after {submission.attempts} attempts: {e}")
+            submission.status = SubmissionHistory.FAILED
+            submission.next_attempt_at = None
+        else:
+            delay = SUBMISSION_RETRY_DELAY * 2 ** (submission.attempts - 1)
+            logger.warning(f"Submission {submission_id} failed (attempt {submission.attempts}), retrying in {delay}s: {e}")
+            submission.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+        submission.save(update_fields=['last_error', 'status', 'next_attempt_at'])
+        return
+
+    submission.file.delete(save=False)
+    submission.status = SubmissionHistory.SENT
+    submission.last_error = ''
+    submission.next_attempt_at = None
+    submission.save(update_fields=['last_error', 'status', 'next_attempt_at', 'file'])
+
+
+def retry_submissions():
+    """
+    Every minute (see migration 0018): queue the pending submissions that are
+    due. Picks up retries, and submissions whose first task was never queued
+    or got lost; deliver_submission's claim makes a duplicate task harmless.
+    """
+    now = timezone.now()
+    due = SubmissionHistory.objects.filter(status=SubmissionHistory.PENDING).filter(
+        # New submissions queue their own task on commit; give it a moment first
+        Q(next_attempt_at__isnull=True, submitted_at__lte=now - timedelta(seconds=SUBMISSION_RETRY_DELAY))
+        | Q(next_attempt_at__lte=now)
+    )
+    for submission_id in due.values_list('pk', flat=True):
+        async_task('accommodations.tasks.deliver_submission', submission_id)
+
+
+def send_notifications(event, object_ids, run=1):
+    """
+    Email the landlords affected by one admin action (see NotificationService).
+    Digests that couldn't be sent get a later run of their own; the ones that
+    went out are never sent again.
+    """
+    dispatcher = NotificationDispatcher()
+    sent = NotificationService.dispatch(event, object_ids, dispatcher)
+    logger.info(f"Sent {sent} {event} notifications")
+    if not dispatcher.unsent:
+        return
+    if run >= NOTIFICATION_MAX_RUNS:
+        logger.error(f"Giving up on {event} notifications for {dispatcher.unsent}")
+        return
+    schedule(
+        'accommodations.tasks.send_notifications',
+        event,
+        dispatcher.unsent,
+        run + 1,
+        schedule_type=Schedule.ONCE,
+        next_run=timezone.now() + timedelta(seconds=NOTIFICATION_RETRY_DELAY),
+    )
+
+
+def rollup_search_logs():
+    """Hourly (see migration 0017): refresh today's and yesterday's search analytics"""
+    SearchAnalyticsService.rollup()
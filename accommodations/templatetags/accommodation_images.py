@@ -0,0 +1,34 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+# Best compression first; the browser takes the first <source> it supports
+SOURCE_TYPES = [('avif', 'image/avif'), ('webp', 'image/webp')]
+
+
+@register.simple_tag
+def responsive_image(image, sizes='100vw', alt='', css='', lazy=True):
+    """
+    <picture> with AVIF/WebP srcsets from the image's renditions, falling back
+    to the original upload for browsers (or images) without them.
+
+    {% responsive_image accommodation.primary_image sizes="33vw" alt="..." css="w-full h-48" %}
+    """
+    sources = format_html_join(
+        '',
+        '<source type="{}" srcset="{}" sizes="{}">',
+        (
+            (mime, image.srcset(fmt), sizes)
+            for fmt, mime in SOURCE_TYPES
+            if image.renditions and image.srcset(fmt)
+        ),
+    )
+    return format_html(
+        '<picture>{}<img src="{}" alt="{}" class="{}"{}></picture>',
+        sources,
+        image.image.url,
+        alt,
+        css,
+        format_html(' loading="lazy" decoding="async"') if lazy else '',
+    )
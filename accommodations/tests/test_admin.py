@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.contrib.admin.sites import site
+from django.test import TestCase
+from django.utils import timezone
+from django.utils.http import http_date
+
+from ..admin import AccommodationAdmin, LandlordProfileAdmin
+from ..models import Accommodation, LandlordProfile
+from .utils import make_landlord, make_listing, make_location
+
+
+class BulkActionTests(TestCase):
+
+    def setUp(self):
+        self.landlord = make_landlord()
+        self.listing = make_listing(self.landlord, make_location(), is_approved=False)
+        self.earlier = timezone.now() - timedelta(days=2)
+        Accommodation.objects.filter(pk=self.listing.pk).update(updated_at=self.earlier)
+
+    def updated_at(self):
+        return Accommodation.objects.get(pk=self.listing.pk).updated_at
+
+    def test_approving_counts_as_an_update(self):
+        admin = AccommodationAdmin(Accommodation, site)
+        admin.approve_accommodations(None, Accommodation.objects.filter(pk=self.listing.pk))
+        self.assertGreater(self.updated_at(), self.earlier)
+        # A client holding the pre-approval page doesn't get a 304
+        response = self.client.get(
+            self.listing.get_absolute_url(), HTTP_IF_MODIFIED_SINCE=http_date(self.earlier.timestamp()),
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_verifying_a_landlord_updates_their_listings(self):
+        admin = LandlordProfileAdmin(LandlordProfile, site)
+        admin.verify_landlords(None, LandlordProfile.objects.filter(user=self.landlord))
+        self.assertGreater(self.updated_at(), self.earlier)
@@ -0,0 +1,135 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from seo.models import Region, Subregion
+from ..api import LISTING, LISTING_DETAIL
+from ..services.cache_service import TAG_PREFIX, clear_local_cache
+from .utils import make_landlord, make_listing, make_location
+
+
+class ApiTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        self.landlord = make_landlord(company_name='Acme Rentals', is_verified=True)
+        self.location = make_location()
+        self.listings = [
+            make_listing(self.landlord, self.location, price=price) for price in (1200, 1500, 1800)
+        ]
+
+    def get_json(self, url, status=200, **headers):
+        response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, status)
+        return response.json()
+
+
+class ListingsApiTests(ApiTestCase):
+
+    def test_lists_approved_listings_with_the_default_fields(self):
+        make_listing(self.landlord, self.location, is_approved=False)
+        response = self.client.get('/api/v1/listings/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Access-Control-Allow-Origin'], '*')
+
+        results = response.json()['results']
+        self.assertEqual({row['id'] for row in results}, {listing.pk for listing in self.listings})
+        self.assertCountEqual(results[0], LISTING.default)
+        self.assertEqual(results[0]['landlord'], 'Acme Rentals')
+        self.assertEqual(results[0]['url'], f'/accommodations/{results[0]["id"]}/')
+
+    def test_fields_limits_the_response(self):
+        data = self.get_json('/api/v1/listings/?fields=price,id,price&sort=price_asc')
+        self.assertEqual(data['results'], [
+            {'price': '1200.00', 'id': self.listings[0].pk},
+            {'price': '1500.00', 'id': self.listings[1].pk},
+            {'price': '1800.00', 'id': self.listings[2].pk},
+        ])
+
+    def test_bad_parameters_are_400s(self):
+        data = self.get_json('/api/v1/listings/?fields=id,secret', status=400)
+        self.assertEqual(data, {'error': 'Unknown fields: secret'})
+        for limit in ('0', '51', 'ten'):
+            self.get_json(f'/api/v1/listings/?limit={limit}', status=400)
+
+    def test_cursor_links_walk_through_every_listing(self):
+        data = self.get_json('/api/v1/listings/?sort=price_asc&fields=id&limit=2')
+        self.assertIsNone(data['previous'])
+        self.assertIn('sort=price_asc', data['next'])
+        ids = [row['id'] for row in data['results']]
+
+        data = self.get_json(data['next'])
+        ids += [row['id'] for row in data['results']]
+        self.assertIsNone(data['next'])
+        self.assertEqual(ids, [listing.pk for listing in self.listings])
+
+        data = self.get_json(data['previous'])
+        self.assertEqual([row['id'] for row in data['results']], ids[:2])
+
+    def test_tampered_cursor_gives_the_first_page(self):
+        data = self.get_json('/api/v1/listings/?sort=price_asc&fields=id&limit=2&cursor=garbage')
+        self.assertEqual([row['id'] for row in data['results']], [listing.pk for listing in self.listings[:2]])
+
+    def test_unchanged_results_are_304(self):
+        response = self.client.get('/api/v1/listings/')
+        self.assertEqual(self.client.get('/api/v1/listings/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_etag_follows_the_versions_this_process_serves(self):
+        etag = self.client.get('/api/v1/listings/')['ETag']
+        # Another process's invalidate_tags(), not seen here until the L1 expires
+        cache.incr(TAG_PREFIX + 'browse')
+        self.assertEqual(self.client.get('/api/v1/listings/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        clear_local_cache()
+        response = self.client.get('/api/v1/listings/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_only_safe_methods(self):
+        self.assertEqual(self.client.post('/api/v1/listings/').status_code, 405)
+        self.assertEqual(self.client.head('/api/v1/listings/').status_code, 200)
+
+
+class ListingDetailApiTests(ApiTestCase):
+
+    def test_detail(self):
+        listing = self.listings[0]
+        data = self.get_json(f'/api/v1/listings/{listing.pk}/')
+        self.assertCountEqual(data, LISTING_DETAIL.default)
+        self.assertEqual(data['description'], listing.description)
+        self.assertEqual(data['images'], [])
+
+        data = self.get_json(f'/api/v1/listings/{listing.pk}/?fields=location,price')
+        self.assertEqual(data, {'location': 'Campus', 'price': '1200.00'})
+
+    def test_missing_and_unapproved_listings_are_404s(self):
+        hidden = make_listing(self.landlord, self.location, is_approved=False)
+        for pk in (hidden.pk, 9999):
+            self.assertEqual(self.get_json(f'/api/v1/listings/{pk}/', status=404), {'error': 'Listing not found'})
+
+    def test_unchanged_listing_is_304(self):
+        url = f'/api/v1/listings/{self.listings[0].pk}/'
+        response = self.client.get(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+    def test_bad_fields_are_400s(self):
+        self.get_json(f'/api/v1/listings/{self.listings[0].pk}/?fields=nope', status=400)
+
+
+class LocationAndAreaApiTests(ApiTestCase):
+
+    def test_locations(self):
+        self.assertEqual(self.get_json('/api/v1/locations/?fields=name'), {'results': [{'name': 'Campus'}]})
+
+    def test_areas(self):
+        region = Region.objects.create(name='Empangeni')
+        Subregion.objects.create(region=region, name='Richem')
+
+        data = self.get_json('/api/v1/areas/?fields=name,url,subregions')
+        self.assertEqual(data['results'], [{
+            'name': 'Empangeni',
+            'url': '/area/empangeni/',
+            'subregions': [{'name': 'Richem', 'url': '/area/empangeni/richem/'}],
+        }])
+        self.get_json('/api/v1/areas/?fields=region', status=400)
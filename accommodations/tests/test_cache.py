@@ -0,0 +1,111 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from ..services import cache_service
+from ..services.cache_service import (
+    TAG_PREFIX, cached_query, clear_local_cache, invalidate_on_commit, invalidate_tags, stats,
+    tag_versions, tags_invalidated,
+)
+
+
+class CachedQueryTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        stats.reset()
+        self.loads = 0
+
+    def loader(self):
+        self.loads += 1
+        return f'result {self.loads}'
+
+    def lookup(self, key='rooms', tags=('browse',)):
+        return cached_query(key, 60, self.loader, tags=tags)
+
+    def test_loads_once_then_serves_from_l1_without_cache_round_trips(self):
+        self.assertEqual(self.lookup(), 'result 1')
+        with mock.patch.object(cache_service, 'cache', wraps=cache) as shared:
+            self.assertEqual(self.lookup(), 'result 1')
+        self.assertEqual(shared.mock_calls, [])
+        self.assertEqual(self.loads, 1)
+        self.assertEqual(stats.snapshot()['l1_hits'], 1)
+
+    def test_other_processes_are_served_from_the_shared_cache(self):
+        self.lookup()
+        clear_local_cache()  # as if in a fresh process
+        self.assertEqual(self.lookup(), 'result 1')
+        self.assertEqual(self.loads, 1)
+        self.assertEqual(stats.snapshot()['l2_hits'], 1)
+
+    def test_invalidating_a_tag_reloads_its_entries_only(self):
+        self.lookup('rooms', tags=['browse'])
+        cached_query('terms', 60, lambda: 'terms', tags=['sitecontent:terms'])
+        invalidate_tags('browse')
+        self.assertEqual(self.lookup('rooms', tags=['browse']), 'result 2')
+        self.assertEqual(cached_query('terms', 60, self.loader, tags=['sitecontent:terms']), 'terms')
+
+    def test_invalidation_elsewhere_shows_once_the_l1_expires(self):
+        self.lookup()
+        cache.incr(TAG_PREFIX + 'browse')  # another process's invalidate_tags()
+        self.assertEqual(self.lookup(), 'result 1')
+        clear_local_cache()
+        self.assertEqual(self.lookup(), 'result 2')
+
+    def test_invalidate_on_commit_waits_for_the_transaction(self):
+        self.lookup()
+        with self.captureOnCommitCallbacks(execute=True):
+            invalidate_on_commit('browse')
+            self.assertEqual(self.lookup(), 'result 1')
+        self.assertEqual(self.lookup(), 'result 2')
+
+    def test_waits_for_a_recompute_in_another_process(self):
+        key = cache_service._versioned_key('rooms', ['browse'])
+        cache.add(f'{key}:lock', 1)
+
+        def finish_elsewhere(seconds):
+            cache.set(key, 'computed elsewhere')
+
+        with mock.patch.object(cache_service.time, 'sleep', side_effect=finish_elsewhere):
+            self.assertEqual(self.lookup(), 'computed elsewhere')
+        self.assertEqual(self.loads, 0)
+        self.assertEqual(stats.snapshot()['waits'], 1)
+
+    def test_stops_waiting_for_a_stuck_recompute(self):
+        key = cache_service._versioned_key('rooms', ['browse'])
+        cache.add(f'{key}:lock', 1)
+        with mock.patch.object(cache_service, 'LOCK_WAIT', 0.01):
+            self.assertEqual(self.lookup(), 'result 1')
+
+
+class TagVersionTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+
+    def test_versions_are_stable_until_invalidated(self):
+        first = tag_versions(['browse', 'featured'])
+        self.assertEqual(tag_versions(['browse', 'featured']), first)
+        invalidate_tags('browse')
+        second = tag_versions(['browse', 'featured'])
+        self.assertNotEqual(second['browse'], first['browse'])
+        self.assertEqual(second['featured'], first['featured'])
+
+    def test_flushed_tags_never_reuse_an_old_version(self):
+        before = tag_versions(['browse'])['browse']
+        cache.clear()
+        self.assertGreater(tag_versions(['browse'])['browse'], before)
+
+    def test_invalidation_is_announced(self):
+        received = []
+
+        def receiver(sender, tags, **kwargs):
+            received.append(tags)
+
+        tags_invalidated.connect(receiver)
+        self.addCleanup(tags_invalidated.disconnect, receiver)
+        invalidate_tags('areas', 'browse', 'areas')
+        self.assertEqual(received, [{'areas', 'browse'}])
@@ -0,0 +1,39 @@
+from django.test import SimpleTestCase, override_settings
+
+from ..checks import check_shared_cache, check_shared_storage
+
+
+def cache_settings(backend):
+    return {'default': {'BACKEND': f'django.core.cache.backends.{backend}'}}
+
+
+class SharedCacheCheckTests(SimpleTestCase):
+
+    def errors(self, backend, debug):
+        with override_settings(DEBUG=debug, TESTING=False, CACHES=cache_settings(backend)):
+            return [error.id for error in check_shared_cache(None)]
+
+    def test_production_needs_a_shared_in_memory_cache(self):
+        for backend in ('locmem.LocMemCache', 'db.DatabaseCache', 'filebased.FileBasedCache'):
+            with self.subTest(backend=backend):
+                self.assertEqual(self.errors(backend, debug=False), ['accommodations.E001'])
+        self.assertEqual(self.errors('redis.RedisCache', debug=False), [])
+
+    def test_development_may_use_the_per_process_default(self):
+        self.assertEqual(self.errors('locmem.LocMemCache', debug=True), [])
+
+
+class SharedStorageCheckTests(SimpleTestCase):
+
+    def errors(self, backend, debug=False, sync=False):
+        storages = {'default': {'BACKEND': backend}}
+        with override_settings(DEBUG=debug, TESTING=False, STORAGES=storages, Q_CLUSTER={'sync': sync}):
+            return [error.id for error in check_shared_storage(None)]
+
+    def test_production_workers_need_shared_storage(self):
+        self.assertEqual(self.errors('django.core.files.storage.FileSystemStorage'), ['accommodations.E002'])
+        self.assertEqual(self.errors('django.core.files.storage.InMemoryStorage'), [])
+
+    def test_local_disk_is_fine_for_inline_tasks_and_development(self):
+        self.assertEqual(self.errors('django.core.files.storage.FileSystemStorage', sync=True), [])
+        self.assertEqual(self.errors('django.core.files.storage.FileSystemStorage', debug=True), [])
@@ -0,0 +1,87 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from ..models import AccommodationImage
+from ..pagination import CountedPaginator
+from ..services.cache_service import clear_local_cache
+from ..services.role_service import LANDLORD, RoleService
+from ..views import DASHBOARD_PAGE_SIZE
+from .utils import make_landlord, make_listing, make_location
+
+
+class LandlordDashboardTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        RoleService.clear_group_cache()
+        self.landlord = make_landlord()
+        RoleService.add_to_role(self.landlord, LANDLORD)
+        self.location = make_location()
+        self.client.force_login(self.landlord)
+
+    def add_listings(self, approved, unapproved):
+        for n in range(approved + unapproved):
+            make_listing(self.landlord, self.location, is_approved=n < approved, available_rooms=2)
+
+    def get(self, page=None):
+        response = self.client.get('/dashboard/', {'page': page} if page else {})
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_counts_mixed_approved_and_pending_listings(self):
+        self.add_listings(approved=DASHBOARD_PAGE_SIZE, unapproved=5)
+        # Someone else's listings don't count
+        make_listing(make_landlord('other'), self.location)
+
+        context = self.get().context
+        self.assertEqual(context['total_listings'], DASHBOARD_PAGE_SIZE + 5)
+        self.assertEqual(context['approved_listings'], DASHBOARD_PAGE_SIZE)
+        self.assertEqual(context['pending_listings'], 5)
+        self.assertEqual(context['available_rooms'], 2 * DASHBOARD_PAGE_SIZE)
+
+        page = context['page']
+        self.assertIsInstance(page.paginator, CountedPaginator)
+        self.assertEqual(page.paginator.num_pages, 2)
+        self.assertEqual(len(page), DASHBOARD_PAGE_SIZE)
+
+        last = self.get(page=2).context['page']
+        self.assertEqual(len(last), 5)
+        self.assertEqual((last.start_index(), last.end_index()), (DASHBOARD_PAGE_SIZE + 1, DASHBOARD_PAGE_SIZE + 5))
+        ids = {listing.pk for listing in page} | {listing.pk for listing in last}
+        self.assertEqual(len(ids), DASHBOARD_PAGE_SIZE + 5)
+
+    def test_pending_photos_are_counted_per_listing(self):
+        listing = make_listing(self.landlord, self.location)
+        AccommodationImage.objects.bulk_create([
+            AccommodationImage(accommodation=listing, image='a.png', status=AccommodationImage.PENDING),
+            AccommodationImage(accommodation=listing, image='b.png', status=AccommodationImage.READY),
+        ])
+        self.assertEqual([row.pending_photos for row in self.get().context['page']], [1])
+
+    def test_query_count_does_not_grow_with_listings(self):
+        self.add_listings(approved=2, unapproved=1)
+        self.get()
+        with CaptureQueriesContext(connection) as few:
+            self.get()
+
+        self.add_listings(approved=DASHBOARD_PAGE_SIZE, unapproved=DASHBOARD_PAGE_SIZE)
+        self.get()
+        with CaptureQueriesContext(connection) as many:
+            self.get()
+        self.assertEqual(len(many), len(few))
+        # The paginator takes its count from the stats aggregate
+        self.assertFalse([query for query in many if 'COUNT(*)' in query['sql']])
+
+    def test_out_of_range_page_shows_the_last_page(self):
+        self.add_listings(approved=3, unapproved=0)
+        page = self.get(page=9).context['page']
+        self.assertEqual(page.number, 1)
+        self.assertEqual(len(page), 3)
+
+    def test_empty_dashboard(self):
+        context = self.get().context
+        self.assertEqual(context['total_listings'], 0)
+        self.assertEqual(list(context['page']), [])
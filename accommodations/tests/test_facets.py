@@ -0,0 +1,65 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from ..models import Accommodation, PRICE_RANGES
+from ..services.cache_service import clear_local_cache
+from ..services.facet_service import FacetService
+from .utils import make_landlord, make_listing, make_location
+
+
+class FacetServiceTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        landlord = make_landlord()
+        cls.campus = make_location('Campus')
+        cls.town = make_location('Town')
+        for location, room_type, price in [
+            (cls.campus, 'single', 250), (cls.campus, 'single', 450), (cls.campus, 'double', 800),
+            (cls.town, 'single', 650), (cls.town, 'double', 450), (cls.town, 'triple', 900),
+        ]:
+            make_listing(landlord, location, room_type=room_type, price=Decimal(price))
+        # Not public, never counted
+        make_listing(landlord, cls.campus, is_approved=False)
+        make_listing(landlord, cls.town, available_rooms=0)
+
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        self.location_ids = [self.campus.pk, self.town.pk]
+
+    def facets(self, queryset=None, **filters):
+        queryset = Accommodation.objects.public() if queryset is None else queryset
+        return FacetService.browse_facets(queryset, self.location_ids, **filters)
+
+    def test_unfiltered_counts(self):
+        facets = self.facets()
+        self.assertEqual(facets['total'], 6)
+        self.assertEqual(facets['room_type'], {'single': 3, 'double': 2, 'triple': 1})
+        self.assertEqual(facets['location'], {self.campus.pk: 3, self.town.pk: 3})
+        self.assertEqual(facets['price_range'], {'0-300': 1, '300-500': 2, '500-700': 1, '700+': 2})
+
+    def test_each_facet_ignores_its_own_filter(self):
+        facets = self.facets(room_type='single', location_id=str(self.campus.pk))
+        self.assertEqual(facets['total'], 2)
+        # Room types within Campus, locations among single rooms
+        self.assertEqual(facets['room_type'], {'single': 2, 'double': 1, 'triple': 0})
+        self.assertEqual(facets['location'], {self.campus.pk: 2, self.town.pk: 1})
+        self.assertEqual(facets['price_range'], {'0-300': 1, '300-500': 1, '500-700': 0, '700+': 0})
+
+    def test_counts_match_filtered_querysets(self):
+        public = Accommodation.objects.public()
+        for price_range in PRICE_RANGES:
+            with self.subTest(price_range=price_range):
+                facets = self.facets(price_range=price_range)
+                self.assertEqual(facets['total'], public.browse(price_range=price_range).count())
+                for code, count in facets['room_type'].items():
+                    self.assertEqual(count, public.browse(room_type=code, price_range=price_range).count())
+
+    def test_search_text_cannot_collide_with_other_filters(self):
+        self.facets(Accommodation.objects.none(), search_query='room|single')
+        # Both used to join to 'room|single|||'
+        facets = self.facets(search_query='room', room_type='single', price_range='|')
+        self.assertEqual(facets['total'], 3)
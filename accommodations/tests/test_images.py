@@ -0,0 +1,131 @@
+from unittest import mock, skipUnless
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.template import Context, Template
+from django.test import TestCase
+from PIL import features
+
+from ..models import AccommodationImage
+from ..services.image_service import ImageRenditionService
+from .utils import MediaRootMixin, image_bytes, make_landlord, make_listing, make_location
+
+
+class ImageTestCase(MediaRootMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.listing = make_listing(make_landlord(), make_location())
+
+    def upload(self, size=(2400, 1600)):
+        image = AccommodationImage(accommodation=self.listing)
+        image.image.save('photo.png', ContentFile(image_bytes(size=size)))
+        return image
+
+    def paths(self, image):
+        return [path for entry in image.renditions.values() for key, path in entry.items() if key in ('webp', 'avif')]
+
+
+class ImageRenditionServiceTests(ImageTestCase):
+
+    def test_builds_every_size_in_every_format(self):
+        image = self.upload()
+        renditions = ImageRenditionService.generate(image)
+        self.assertEqual(list(renditions), ['card', 'detail', 'full'])
+        self.assertEqual((renditions['card']['width'], renditions['card']['height']), (480, 320))
+        self.assertEqual(renditions['full']['width'], 1920)
+        for entry in renditions.values():
+            self.assertEqual(set(entry) - {'width', 'height'}, set(ImageRenditionService.available_formats()))
+        for path in self.paths(image):
+            self.assertTrue(default_storage.exists(path))
+        image.refresh_from_db()
+        self.assertEqual(image.renditions, renditions)
+
+    def test_small_uploads_are_not_upscaled(self):
+        renditions = ImageRenditionService.generate(self.upload(size=(300, 200)))
+        self.assertEqual(list(renditions), ['card'])
+        self.assertEqual(renditions['card']['width'], 300)
+
+    def test_webp_only_without_avif_support(self):
+        with mock.patch('accommodations.services.image_service.features.check', return_value=False):
+            renditions = ImageRenditionService.generate(self.upload())
+        for entry in renditions.values():
+            self.assertIn('webp', entry)
+            self.assertNotIn('avif', entry)
+
+    def test_delete_removes_the_files(self):
+        image = self.upload()
+        ImageRenditionService.generate(image)
+        paths = self.paths(image)
+
+        ImageRenditionService.delete(image)
+        self.assertFalse(any(default_storage.exists(path) for path in paths))
+        # Already gone: nothing to do, no error
+        ImageRenditionService.delete(image)
+
+    def test_delete_carries_on_past_storage_errors(self):
+        image = self.upload()
+        ImageRenditionService.generate(image)
+        with mock.patch.object(default_storage, 'delete', side_effect=OSError('read-only')) as delete:
+            with self.assertLogs('accommodations.services.image_service', 'WARNING'):
+                ImageRenditionService.delete(image)
+        self.assertEqual(delete.call_count, len(self.paths(image)))
+
+    def test_regenerating_replaces_old_renditions(self):
+        image = self.upload()
+        ImageRenditionService.generate(image)
+        old = self.paths(image)
+        image.image.save('smaller.png', ContentFile(image_bytes(size=(300, 200))), save=False)
+        ImageRenditionService.generate(image)
+        self.assertEqual(list(image.renditions), ['card'])
+        self.assertFalse(any(default_storage.exists(path) for path in set(old) - set(self.paths(image))))
+
+    def test_deleting_the_image_deletes_its_renditions(self):
+        image = self.upload()
+        ImageRenditionService.generate(image)
+        paths = self.paths(image)
+        image.delete()
+        self.assertFalse(any(default_storage.exists(path) for path in paths))
+
+
+class ResponsiveImageTagTests(ImageTestCase):
+
+    def render(self, image, arguments='', **context):
+        template = Template('{% load accommodation_images %}{% responsive_image image ' + arguments + ' %}')
+        return template.render(Context({'image': image, **context}))
+
+    @skipUnless(features.check('avif'), "Pillow built without AVIF")
+    def test_picture_with_avif_then_webp_sources(self):
+        image = self.upload()
+        ImageRenditionService.generate(image)
+        html = self.render(image, 'sizes="33vw" alt=alt css="w-full"', alt='Room & view')
+
+        self.assertTrue(html.startswith('<picture><source type="image/avif" srcset="'))
+        self.assertLess(html.index('image/avif'), html.index('image/webp'))
+        self.assertIn(f'srcset="{image.srcset("webp")}" sizes="33vw"', html)
+        self.assertEqual(
+            image.srcset('webp'),
+            ', '.join(
+                f'{default_storage.url(image.renditions[size]["webp"])} {width}w'
+                for size, width in (('card', 480), ('detail', 1200), ('full', 1920))
+            ),
+        )
+        self.assertIn(
+            f'<img src="{image.image.url}" alt="Room &amp; view" class="w-full" loading="lazy" decoding="async">',
+            html,
+        )
+
+    def test_webp_source_only_without_avif_renditions(self):
+        image = self.upload()
+        with mock.patch('accommodations.services.image_service.features.check', return_value=False):
+            ImageRenditionService.generate(image)
+        html = self.render(image)
+        self.assertNotIn('image/avif', html)
+        self.assertIn('<source type="image/webp"', html)
+
+    def test_unprocessed_image_falls_back_to_the_upload(self):
+        image = self.upload()
+        self.assertEqual(
+            self.render(image, 'lazy=False'),
+            f'<picture><img src="{image.image.url}" alt="" class=""></picture>',
+        )
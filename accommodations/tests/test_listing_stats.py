@@ -0,0 +1,142 @@
+from collections import Counter
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..models import ListingDailyStats
+from ..services.listing_stats_service import IMPRESSIONS, VIEWS, ListingCounter, ListingStatsService, counter
+from .utils import make_landlord, make_listing, make_location
+
+
+class ListingStatsTestCase(TestCase):
+
+    def setUp(self):
+        landlord = make_landlord()
+        location = make_location()
+        self.first = make_listing(landlord, location)
+        self.second = make_listing(landlord, location)
+        self.today = timezone.localdate()
+
+    def rows(self):
+        return {
+            (row.accommodation_id, row.date): (row.views, row.impressions)
+            for row in ListingDailyStats.objects.all()
+        }
+
+
+class ListingCounterTests(ListingStatsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.counter = ListingCounter()
+
+    def test_no_writer_thread_in_tests(self):
+        with mock.patch('accommodations.services.listing_stats_service.threading.Thread') as thread:
+            self.counter.add(VIEWS, [self.first.pk])
+            counter.add(VIEWS, [self.first.pk])
+        thread.assert_not_called()
+        counter.flush()
+
+    def test_counts_are_buffered_until_flushed(self):
+        self.counter.add(VIEWS, [self.first.pk])
+        self.counter.add(IMPRESSIONS, [self.first.pk, self.second.pk])
+        self.counter.add(IMPRESSIONS, [self.first.pk])
+        self.assertFalse(ListingDailyStats.objects.exists())
+
+        with self.assertNumQueries(5):
+            # Existing listings, then insert the day's rows and add the counts in a savepoint
+            self.counter.flush()
+        self.assertEqual(self.rows(), {
+            (self.first.pk, self.today): (1, 2),
+            (self.second.pk, self.today): (0, 1),
+        })
+        with self.assertNumQueries(0):
+            self.counter.flush()
+
+    def test_failed_save_keeps_the_counts(self):
+        self.counter.add(VIEWS, [self.first.pk])
+        with mock.patch.object(ListingStatsService, 'save', side_effect=RuntimeError('database down')):
+            with self.assertLogs('accommodations.services.listing_stats_service', 'ERROR'):
+                self.counter.flush()
+        self.counter.add(VIEWS, [self.first.pk])
+        self.counter.flush()
+        self.assertEqual(self.rows(), {(self.first.pk, self.today): (2, 0)})
+
+    @override_settings(LISTING_COUNTER_FLUSH_INTERVAL=60)
+    def test_writer_thread_is_started_once_and_stopped_by_close(self):
+        with mock.patch('accommodations.services.listing_stats_service.threading.Thread') as thread:
+            thread.return_value.is_alive.return_value = True
+            self.counter.add(VIEWS, [self.first.pk])
+            self.counter.add(VIEWS, [self.first.pk])
+            thread.assert_called_once_with(target=self.counter._run, name='listing-counter', daemon=True)
+
+            self.counter.close()
+            thread.return_value.join.assert_called_once_with(timeout=5)
+            # The rest is saved, and no new thread starts after close()
+            self.assertEqual(self.rows(), {(self.first.pk, self.today): (2, 0)})
+            thread.return_value.is_alive.return_value = False
+            self.counter.add(VIEWS, [self.first.pk])
+            thread.assert_called_once()
+
+    @override_settings(LISTING_COUNTER_FLUSH_INTERVAL=60)
+    def test_writer_thread_flushes_each_interval_until_closed(self):
+        self.counter._stopped = mock.Mock()
+        self.counter._stopped.wait.side_effect = [False, True]
+        self.counter.add(VIEWS, [self.first.pk])
+        with mock.patch.object(self.counter, 'flush') as flush:
+            self.counter._run()
+        flush.assert_called_once_with()
+        self.counter._stopped.wait.assert_called_with(60)
+
+
+class ListingStatsSaveTests(ListingStatsTestCase):
+
+    def test_adds_to_an_existing_row(self):
+        ListingDailyStats.objects.create(accommodation=self.first, date=self.today, views=5, impressions=7)
+        ListingStatsService.save(Counter({
+            (self.today, self.first.pk, VIEWS): 2,
+            (self.today, self.first.pk, IMPRESSIONS): 3,
+            (self.today, self.second.pk, VIEWS): 1,
+        }))
+        self.assertEqual(self.rows(), {
+            (self.first.pk, self.today): (7, 10),
+            (self.second.pk, self.today): (1, 0),
+        })
+
+    def test_one_insert_and_one_update_per_day(self):
+        yesterday = self.today - timedelta(days=1)
+        pending = Counter({
+            (yesterday, self.first.pk, VIEWS): 4,
+            (self.today, self.first.pk, VIEWS): 1,
+            (self.today, self.second.pk, IMPRESSIONS): 6,
+        })
+        with self.assertNumQueries(2 * 5):
+            ListingStatsService.save(pending)
+        self.assertEqual(self.rows(), {
+            (self.first.pk, yesterday): (4, 0),
+            (self.first.pk, self.today): (1, 0),
+            (self.second.pk, self.today): (0, 6),
+        })
+
+    def test_deleted_listings_are_skipped(self):
+        pk = self.second.pk
+        self.second.delete()
+        ListingStatsService.save(Counter({
+            (self.today, self.first.pk, VIEWS): 1,
+            (self.today, pk, VIEWS): 1,
+        }))
+        self.assertEqual(self.rows(), {(self.first.pk, self.today): (1, 0)})
+
+    def test_recent_totals(self):
+        ListingDailyStats.objects.bulk_create([
+            ListingDailyStats(accommodation=self.first, date=self.today, views=2, impressions=5),
+            ListingDailyStats(accommodation=self.first, date=self.today - timedelta(days=29), views=1),
+            # Outside the 30-day window
+            ListingDailyStats(accommodation=self.first, date=self.today - timedelta(days=30), views=100),
+        ])
+        self.assertEqual(
+            ListingStatsService.recent_totals([self.first.pk, self.second.pk]),
+            {self.first.pk: {'views': 3, 'impressions': 5}},
+        )
@@ -0,0 +1,79 @@
+import os
+import re
+import tempfile
+from email import message_from_bytes
+from email.generator import Generator
+from unittest import mock
+
+from django.core.mail import EmailMessage
+from django.test import SimpleTestCase
+
+from ..mail import StreamingEmailMessage, StreamingSMTPBackend
+
+HEADERS = {'Message-ID': '<proof@example.com>', 'Date': 'Sun, 18 Oct 2026 12:00:00 -0000'}
+
+
+def unstuff(data):
+    # Undo SMTP dot-stuffing
+    return re.sub(br'(?m)^\.\.', b'.', data)
+
+
+class StreamingEmailMessageTests(SimpleTestCase):
+
+    def setUp(self):
+        # 3 MB plus a tail that doesn't fill a base64 line
+        self.payload = os.urandom(3 * 1024 * 1024 + 13)
+        self.file = tempfile.TemporaryFile()
+        self.addCleanup(self.file.close)
+        self.file.write(self.payload)
+        # Fixed MIME boundaries, so two renderings of a message can be compared byte for byte
+        patcher = mock.patch.object(Generator, '_make_boundary', classmethod(lambda cls, text=None: '==boundary=='))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def message(self, cls=StreamingEmailMessage):
+        return cls('Proof ünïcode', 'Hello\n.leading dot\nbye', 'a@example.com', ['b@example.com'], headers=HEADERS)
+
+    def expected(self):
+        email = self.message(EmailMessage)
+        email.attach('proof of payment.pdf', self.payload, 'application/pdf')
+        return email.message().as_bytes(linesep='\r\n')
+
+    def test_stream_matches_the_in_memory_message(self):
+        email = self.message()
+        email.attach_stream('proof of payment.pdf', self.file, 'application/pdf')
+        for chunk_size in (57, 57 * 3, 57 * 1024, 10 ** 7):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(unstuff(b''.join(email.stream(chunk_size))), self.expected())
+
+    def test_message_matches_for_other_backends(self):
+        email = self.message()
+        email.attach_stream('proof of payment.pdf', self.file, 'application/pdf')
+        self.assertEqual(email.message().as_bytes(linesep='\r\n'), self.expected())
+
+    def test_leading_dots_are_stuffed(self):
+        email = self.message()
+        email.attach_stream('proof of payment.pdf', self.file, 'application/pdf')
+        streamed = b''.join(email.stream())
+        self.assertIn(b'\r\n..leading dot', streamed)
+        self.assertIsNone(re.search(br'(?m)^\.[^.]', streamed))
+
+    def test_backend_sends_the_stream_over_smtp_data(self):
+        email = self.message()
+        email.attach_stream('proof of payment.pdf', self.file, 'application/pdf')
+        connection = mock.Mock()
+        connection.mail.return_value = (250, b'ok')
+        connection.rcpt.return_value = (250, b'ok')
+        connection.docmd.return_value = (354, b'go ahead')
+        connection.getreply.return_value = (250, b'queued')
+        backend = StreamingSMTPBackend(host='localhost', port=25)
+        backend.connection = connection
+
+        self.assertEqual(backend.send_messages([email]), 1)
+        connection.rcpt.assert_called_once_with('b@example.com')
+        sent = b''.join(call.args[0] for call in connection.send.call_args_list)
+        self.assertTrue(sent.endswith(b'\r\n.\r\n'))
+        received = message_from_bytes(unstuff(sent[:-len(b'.\r\n')]))
+        attachment = next(part for part in received.walk() if part.get_filename())
+        self.assertEqual(attachment.get_filename(), 'proof of payment.pdf')
+        self.assertEqual(attachment.get_payload(decode=True), self.payload)
@@ -0,0 +1,152 @@
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from ..middleware import AnonymousPageCacheMiddleware, LowWriteSessionMiddleware
+from ..services.cache_service import cache_public_page, clear_local_cache
+from .utils import make_landlord, make_listing, make_location
+
+REFRESHED_KEY = LowWriteSessionMiddleware.REFRESHED_KEY
+
+
+@override_settings(SESSION_COOKIE_AGE=1800, SESSION_REFRESH_THRESHOLD=1500, SESSION_EXPIRE_AT_BROWSER_CLOSE=False)
+class LowWriteSessionMiddlewareTests(TestCase):
+
+    def setUp(self):
+        self.SessionStore = import_module(settings.SESSION_ENGINE).SessionStore
+
+    def stored_session(self, **data):
+        session = self.SessionStore()
+        session.update(data)
+        session.save()
+        return self.SessionStore(session_key=session.session_key)
+
+    def respond(self, session, with_cookie=True, view=None):
+        request = RequestFactory().get('/')
+        if with_cookie:
+            request.COOKIES[settings.SESSION_COOKIE_NAME] = session.session_key
+        request.session = session
+        if view:
+            view(request)
+        return LowWriteSessionMiddleware(lambda request: HttpResponse()).process_response(request, HttpResponse())
+
+    def saved(self, response):
+        return settings.SESSION_COOKIE_NAME in response.cookies
+
+    def test_recently_refreshed_session_is_not_written(self):
+        session = self.stored_session(cart=1, **{REFRESHED_KEY: int(time.time()) - 200})
+        response = self.respond(session)
+        self.assertFalse(self.saved(response))
+        # Checking the timestamp doesn't count as using the session
+        self.assertFalse(response.has_header('Vary'))
+
+    def test_session_is_refreshed_past_the_threshold(self):
+        stale = int(time.time()) - 400  # less than 1500 of its 1800 seconds left
+        session = self.stored_session(cart=1, **{REFRESHED_KEY: stale})
+        response = self.respond(session)
+        self.assertTrue(self.saved(response))
+        reloaded = self.SessionStore(session_key=session.session_key)
+        self.assertGreater(reloaded[REFRESHED_KEY], stale)
+        self.assertEqual(reloaded['cart'], 1)
+
+    def test_changed_session_is_saved_with_a_new_timestamp(self):
+        session = self.stored_session(cart=1, **{REFRESHED_KEY: int(time.time()) - 10})
+
+        def view(request):
+            request.session['cart'] = 2
+
+        response = self.respond(session, view=view)
+        self.assertTrue(self.saved(response))
+        self.assertAlmostEqual(self.SessionStore(session_key=session.session_key)[REFRESHED_KEY], time.time(), delta=5)
+
+    def test_new_session_starts_the_clock(self):
+        session = self.SessionStore()
+
+        def view(request):
+            request.session['cart'] = 1
+
+        response = self.respond(session, with_cookie=False, view=view)
+        self.assertTrue(self.saved(response))
+        self.assertIn(REFRESHED_KEY, session)
+
+    def test_empty_session_is_left_alone(self):
+        session = self.SessionStore(session_key='missing-session-key')
+        response = self.respond(session)
+        # Django's usual cleanup: the stale cookie is deleted, nothing is stored
+        self.assertEqual(response.cookies[settings.SESSION_COOKIE_NAME].value, '')
+        self.assertFalse(session.exists('missing-session-key'))
+
+
+class AnonymousPageCacheMiddlewareTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        self.landlord = make_landlord()
+        self.location = make_location()
+        with self.captureOnCommitCallbacks(execute=True):
+            make_listing(self.landlord, self.location, description='Garden cottage')
+
+    def get(self, url='/accommodations/', **headers):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, **headers)
+        return response, [query['sql'] for query in queries]
+
+    def test_second_request_is_served_from_the_page_cache(self):
+        first, _ = self.get()
+        self.assertFalse(getattr(first, 'page_cache_hit', False))
+
+        second, queries = self.get()
+        self.assertTrue(second.page_cache_hit)
+        self.assertEqual(second.content, first.content)
+        # Only the cache was read: the view never ran and the database wasn't touched
+        self.assertEqual(queries, [])
+
+    def test_tracking_parameters_share_the_cached_page(self):
+        self.get('/accommodations/?room_type=single')
+        response, _ = self.get('/accommodations/?utm_source=mail&room_type=single&fbclid=x')
+        self.assertTrue(response.page_cache_hit)
+
+    def test_invalidated_tags_refresh_the_page(self):
+        self.get()
+        with self.captureOnCommitCallbacks(execute=True):
+            make_listing(self.landlord, self.location, description='Loft above the bakery')
+
+        response, _ = self.get()
+        self.assertFalse(getattr(response, 'page_cache_hit', False))
+        self.assertContains(response, 'Showing 2 of 2 accommodations')
+        self.assertTrue(self.get()[0].page_cache_hit)
+
+    def test_hit_answers_if_none_match_with_304(self):
+        first, _ = self.get()
+        self.assertTrue(first['ETag'])
+
+        # Answered from the stored page: the view (and its @condition) never runs
+        middleware = AnonymousPageCacheMiddleware(lambda request: self.fail('view ran'))
+        response = middleware(RequestFactory().get('/accommodations/', HTTP_IF_NONE_MATCH=first['ETag']))
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        response, _ = self.get(HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_visitors_with_a_session_or_messages_bypass_the_cache(self):
+        self.get()
+        for cookie in (settings.SESSION_COOKIE_NAME, CookieStorage.cookie_name):
+            self.client.cookies.clear()
+            self.client.cookies[cookie] = 'x'
+            response, _ = self.get()
+            self.assertFalse(getattr(response, 'page_cache_hit', False), cookie)
+
+    def test_post_is_never_cached(self):
+        request = RequestFactory().post('/accommodations/')
+        middleware = AnonymousPageCacheMiddleware(lambda request: cache_public_page(HttpResponse('ok'), 'browse'))
+        middleware(request)
+        self.assertIsNone(cache.get(middleware.cache_key(request)))
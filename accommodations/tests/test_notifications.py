@@ -0,0 +1,134 @@
+import smtplib
+from unittest import mock
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase, override_settings
+from django_q.models import Schedule
+
+from ..services.notification_service import ACCOMMODATION_APPROVED, NotificationDispatcher, NotificationService
+from ..tasks import NOTIFICATION_MAX_RUNS, send_notifications
+from .utils import make_landlord, make_listing, make_location
+
+FLAKY = 'accommodations.tests.test_notifications.FlakyBackend'
+TASK = 'accommodations.tasks.send_notifications'
+
+
+class FlakyBackend(EmailBackend):
+    """locmem, but refuses mail to `refused` and connections once `opens_left` runs out"""
+    refused = set()
+    opens_left = None
+    opened = 0
+
+    def open(self):
+        if FlakyBackend.opens_left is not None:
+            if FlakyBackend.opens_left == 0:
+                raise ConnectionRefusedError('connection refused')
+            FlakyBackend.opens_left -= 1
+        FlakyBackend.opened += 1
+        return True
+
+    def send_messages(self, messages):
+        for message in messages:
+            if set(message.to) & self.refused:
+                raise smtplib.SMTPRecipientsRefused({message.to[0]: (550, b'No such user')})
+        return super().send_messages(messages)
+
+
+class NotificationTestCase(TestCase):
+
+    def setUp(self):
+        self.addCleanup(self.reset_backend)
+        self.landlords = [make_landlord(f'landlord{n}') for n in range(5)]
+        location = make_location()
+        self.listings = [make_listing(landlord, location) for landlord in self.landlords]
+
+    def reset_backend(self):
+        FlakyBackend.refused = set()
+        FlakyBackend.opens_left = None
+        FlakyBackend.opened = 0
+
+    def recipients(self):
+        return [message.to[0] for message in mail.outbox]
+
+
+@mock.patch('accommodations.services.notification_service.time.sleep')
+class NotificationDispatcherTests(NotificationTestCase):
+
+    def dispatch(self, listings, **options):
+        dispatcher = NotificationDispatcher(backend=FLAKY, **options)
+        sent = NotificationService.dispatch(ACCOMMODATION_APPROVED, [listing.pk for listing in listings], dispatcher)
+        return sent, dispatcher
+
+    def test_one_digest_per_landlord(self, sleep):
+        second = make_listing(self.landlords[0], make_location('Town'))
+        sent, dispatcher = self.dispatch([self.listings[0], second, self.listings[1]], rate=0)
+        self.assertEqual(sent, 2)
+        self.assertEqual(dispatcher.unsent, [])
+        self.assertEqual(self.recipients(), ['landlord0@example.com', 'landlord1@example.com'])
+        self.assertEqual(mail.outbox[0].subject, 'StudentPA: 2 updates on your account')
+        self.assertIn('Town', mail.outbox[0].body)
+        self.assertEqual(mail.outbox[1].subject, 'StudentPA: an update on your account')
+
+    def test_batches_share_a_connection(self, sleep):
+        self.dispatch(self.listings, rate=0, batch_size=2)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(FlakyBackend.opened, 3)
+
+    def test_sending_is_throttled(self, sleep):
+        self.dispatch(self.listings, rate=2)
+        self.assertEqual(len(mail.outbox), 5)
+        # Five emails at two a second: a pause after the first two and after the next two
+        self.assertEqual(sleep.call_count, 2)
+
+    def test_refused_digest_is_left_for_later(self, sleep):
+        FlakyBackend.refused = {'landlord1@example.com'}
+        with self.assertLogs('accommodations.services.notification_service', 'ERROR'):
+            sent, dispatcher = self.dispatch(self.listings, rate=0)
+        self.assertEqual(sent, 4)
+        self.assertEqual(dispatcher.unsent, [self.listings[1].pk])
+        self.assertNotIn('landlord1@example.com', self.recipients())
+
+    def test_lost_connection_leaves_the_rest_unsent(self, sleep):
+        FlakyBackend.refused = {'landlord1@example.com'}
+        # The reconnect after the refusal fails
+        FlakyBackend.opens_left = 1
+        with self.assertLogs('accommodations.services.notification_service', 'ERROR'):
+            sent, dispatcher = self.dispatch(self.listings, rate=0)
+        self.assertEqual(sent, 1)
+        self.assertEqual(self.recipients(), ['landlord0@example.com'])
+        self.assertEqual(dispatcher.unsent, [listing.pk for listing in self.listings[1:]])
+
+    def test_no_connection_at_all(self, sleep):
+        FlakyBackend.opens_left = 0
+        with self.assertLogs('accommodations.services.notification_service', 'ERROR'):
+            sent, dispatcher = self.dispatch(self.listings, rate=0, batch_size=2)
+        self.assertEqual(sent, 0)
+        self.assertEqual(dispatcher.unsent, [listing.pk for listing in self.listings])
+
+
+@override_settings(NOTIFICATION_EMAIL_BACKEND=FLAKY, NOTIFICATION_RATE_LIMIT=0)
+class SendNotificationsTaskTests(NotificationTestCase):
+
+    def test_only_unsent_digests_get_another_run(self):
+        FlakyBackend.refused = {'landlord2@example.com'}
+        with self.assertLogs('accommodations.services.notification_service', 'ERROR'):
+            send_notifications(ACCOMMODATION_APPROVED, [listing.pk for listing in self.listings])
+        self.assertEqual(len(mail.outbox), 4)
+
+        retry = Schedule.objects.get(func=TASK)
+        self.assertEqual(retry.schedule_type, Schedule.ONCE)
+        self.assertEqual(retry.args, repr((ACCOMMODATION_APPROVED, [self.listings[2].pk], 2)))
+
+        # The next run delivers it without repeating the others
+        FlakyBackend.refused = set()
+        send_notifications(ACCOMMODATION_APPROVED, [self.listings[2].pk], 2)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(self.recipients()[-1], 'landlord2@example.com')
+        self.assertEqual(Schedule.objects.filter(func=TASK).count(), 1)
+
+    def test_gives_up_after_the_last_run(self):
+        FlakyBackend.refused = {'landlord2@example.com'}
+        with self.assertLogs('accommodations', 'ERROR'):
+            send_notifications(ACCOMMODATION_APPROVED, [self.listings[2].pk], NOTIFICATION_MAX_RUNS)
+        self.assertFalse(Schedule.objects.filter(func=TASK).exists())
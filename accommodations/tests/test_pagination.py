@@ -0,0 +1,90 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core import signing
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import Accommodation, BROWSE_SORTS
+from ..pagination import CURSOR_SALT, KeysetPaginator
+from .utils import make_landlord, make_listing, make_location
+
+
+class KeysetPaginatorTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        landlord = make_landlord()
+        location = make_location()
+        now = timezone.now()
+        # Plenty of ties on every sort key, so only the id tie-breaker tells rows apart
+        for i in range(23):
+            listing = make_listing(
+                landlord, location,
+                price=Decimal(1000 + 250 * (i % 4)),
+                is_featured=i % 5 == 0,
+            )
+            Accommodation.objects.filter(pk=listing.pk).update(created_at=now - timedelta(days=i % 3))
+
+    def walk(self, paginator):
+        pages, cursor = [], None
+        while True:
+            page = paginator.page(cursor)
+            pages.append([row.pk for row in page])
+            if not page.has_next:
+                return pages, page
+            cursor = page.next_cursor
+
+    def test_pages_cover_every_row_once_in_order(self):
+        for sort, (_, ordering) in BROWSE_SORTS.items():
+            with self.subTest(sort=sort):
+                queryset = Accommodation.objects.public()
+                expected = list(queryset.order_by(*ordering).values_list('pk', flat=True))
+                pages, _ = self.walk(KeysetPaginator(queryset, ordering, per_page=5))
+                self.assertEqual([pk for page in pages for pk in page], expected)
+                self.assertEqual([len(page) for page in pages], [5, 5, 5, 5, 3])
+
+    def test_previous_cursors_walk_back_through_the_same_pages(self):
+        for sort, (_, ordering) in BROWSE_SORTS.items():
+            with self.subTest(sort=sort):
+                paginator = KeysetPaginator(Accommodation.objects.public(), ordering, per_page=5)
+                pages, page = self.walk(paginator)
+                back = [[row.pk for row in page]]
+                while page.has_previous:
+                    page = paginator.page(page.previous_cursor)
+                    back.append([row.pk for row in page])
+                self.assertEqual(back[::-1], pages)
+
+    def test_values_rows(self):
+        ordering = BROWSE_SORTS['price_asc'][1]
+        queryset = Accommodation.objects.public().values('id', 'price')
+        paginator = KeysetPaginator(queryset, ordering, per_page=10)
+        second = paginator.page(paginator.page().next_cursor)
+        expected = list(Accommodation.objects.public().order_by(*ordering).values_list('pk', flat=True))
+        self.assertEqual([row['id'] for row in second], expected[10:20])
+
+    def test_tampered_cursor_falls_back_to_first_page(self):
+        ordering = BROWSE_SORTS['newest'][1]
+        paginator = KeysetPaginator(Accommodation.objects.public(), ordering, per_page=5)
+        first = [row.pk for row in paginator.page()]
+        cursor = paginator.page().next_cursor
+
+        forged = signing.dumps({'o': list(ordering), 'd': 'next', 'v': ['2000-01-01T00:00:00+00:00', 1]}, salt='other')
+        payload, signature = cursor.rsplit(':', 1)
+        for bad in [cursor[:-2] + 'xx', payload + ':' + signature[::-1], forged, 'garbage']:
+            with self.subTest(cursor=bad):
+                self.assertEqual([row.pk for row in paginator.page(bad)], first)
+
+    def test_cursor_from_another_sort_is_ignored(self):
+        newest = KeysetPaginator(Accommodation.objects.public(), BROWSE_SORTS['newest'][1], per_page=5)
+        by_price = KeysetPaginator(Accommodation.objects.public(), BROWSE_SORTS['price_asc'][1], per_page=5)
+        self.assertEqual(
+            [row.pk for row in by_price.page(newest.page().next_cursor)],
+            [row.pk for row in by_price.page()],
+        )
+
+    def test_bad_values_in_a_signed_cursor_are_ignored(self):
+        ordering = BROWSE_SORTS['price_asc'][1]
+        paginator = KeysetPaginator(Accommodation.objects.public(), ordering, per_page=5)
+        cursor = signing.dumps({'o': list(ordering), 'd': 'next', 'v': ['not a price', 1]}, salt=CURSOR_SALT)
+        self.assertEqual([row.pk for row in paginator.page(cursor)], [row.pk for row in paginator.page()])
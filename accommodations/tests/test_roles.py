@@ -0,0 +1,165 @@
+import time
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser, Group, User
+from django.contrib.sessions.backends.cache import SessionStore
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+
+from ..middleware import RoleMiddleware
+from ..services.cache_service import clear_local_cache
+from ..services.role_service import GROUP_NAMES, LANDLORD, SESSION_KEY, SESSION_TTL, STUDENT, RoleService
+
+
+class RoleTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        RoleService.clear_group_cache()
+        self.session = SessionStore()
+
+    def user(self, *roles, username='user'):
+        user = User.objects.create_user(username)
+        for role in roles:
+            user.groups.add(Group.objects.get_or_create(name=GROUP_NAMES[role])[0])
+        return user
+
+    def request(self, user):
+        request = RequestFactory().get('/')
+        # A fresh User object per request, like AuthenticationMiddleware gives
+        request.user = User.objects.get(pk=user.pk) if user.is_authenticated else user
+        request.session = self.session
+        return request
+
+    def role(self, user):
+        return RoleService.get_role(self.request(user))
+
+
+class RoleResolutionTests(RoleTestCase):
+
+    def test_roles_come_from_groups(self):
+        self.assertEqual(RoleService.resolve(self.user(LANDLORD, username='landlord')), LANDLORD)
+        self.assertEqual(RoleService.resolve(self.user(STUDENT, username='student')), STUDENT)
+        self.assertIsNone(RoleService.resolve(self.user(username='nobody')))
+        self.assertIsNone(RoleService.resolve(AnonymousUser()))
+        # Landlords win
+        self.assertEqual(RoleService.resolve(self.user(STUDENT, LANDLORD, username='both')), LANDLORD)
+
+    def test_one_query_memoised_on_the_user(self):
+        user = User.objects.get(pk=self.user(LANDLORD).pk)
+        # Creating the Students group clears the group id cache, so look it up first
+        RoleService.group_id(STUDENT), RoleService.group_id(LANDLORD)
+        with self.assertNumQueries(1):
+            RoleService.resolve(user)
+            RoleService.resolve(user)
+
+    def test_add_to_role(self):
+        user = self.user()
+        RoleService.add_to_role(user, STUDENT)
+        self.assertEqual(user._user_role, STUDENT)
+        self.assertEqual(RoleService.resolve(User.objects.get(pk=user.pk)), STUDENT)
+
+    def test_superusers_count_as_landlords(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.assertTrue(RoleService.is_landlord(admin))
+        self.assertFalse(RoleService.is_landlord(self.user(STUDENT)))
+
+    def test_group_ids_are_looked_up_again_after_group_changes(self):
+        old = RoleService.group_id(LANDLORD)
+        Group.objects.filter(pk=old).delete()
+        # QuerySet.delete() sends post_delete too
+        self.assertNotEqual(RoleService.group_id(LANDLORD), old)
+
+
+class SessionRoleTests(RoleTestCase):
+
+    def test_role_is_kept_in_the_session(self):
+        user = self.user(LANDLORD)
+        self.assertEqual(self.role(user), LANDLORD)
+        self.assertEqual(self.session[SESSION_KEY]['role'], LANDLORD)
+        request = self.request(user)
+        with self.assertNumQueries(0):
+            self.assertEqual(RoleService.get_role(request), LANDLORD)
+
+    def test_anonymous_users_have_no_role(self):
+        with self.assertNumQueries(0):
+            self.assertIsNone(self.role(AnonymousUser()))
+        self.assertNotIn(SESSION_KEY, self.session)
+
+    def test_session_copy_expires(self):
+        user = self.user(LANDLORD)
+        self.role(user)
+        request = self.request(user)
+        with mock.patch('accommodations.services.role_service.time.time', return_value=time.time() + SESSION_TTL):
+            with self.assertNumQueries(1):
+                RoleService.get_role(request)
+
+    def test_session_of_another_user_is_ignored(self):
+        self.role(self.user(LANDLORD, username='landlord'))
+        self.assertEqual(self.role(self.user(STUDENT, username='student')), STUDENT)
+
+    def test_group_membership_changes_reach_the_session(self):
+        user = self.user(STUDENT)
+        self.assertEqual(self.role(user), STUDENT)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user.groups.set([RoleService.group_id(LANDLORD)])
+        self.assertEqual(self.role(user), LANDLORD)
+
+        # From the group's side, as the admin's group page does
+        with self.captureOnCommitCallbacks(execute=True):
+            Group.objects.get(name=GROUP_NAMES[LANDLORD]).user_set.remove(user)
+        self.assertIsNone(self.role(user))
+
+    def test_other_users_changes_leave_the_session_alone(self):
+        user = self.user(STUDENT)
+        RoleService.group_id(LANDLORD)
+        self.role(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user(LANDLORD, username='other')
+        request = self.request(user)
+        with self.assertNumQueries(0):
+            self.assertEqual(RoleService.get_role(request), STUDENT)
+
+    def test_group_changes_re_resolve_every_role(self):
+        user = self.user(LANDLORD)
+        self.role(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            Group.objects.get(name=GROUP_NAMES[LANDLORD]).user_set.clear()
+        self.assertIsNone(self.role(user))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user.groups.add(RoleService.group_id(LANDLORD))
+        self.assertEqual(self.role(user), LANDLORD)
+        # Renaming the group takes its members' role away
+        group = Group.objects.get(name=GROUP_NAMES[LANDLORD])
+        group.name = 'Former landlords'
+        with self.captureOnCommitCallbacks(execute=True):
+            group.save()
+        self.assertIsNone(self.role(user))
+
+
+class RoleMiddlewareTests(RoleTestCase):
+
+    def test_role_is_resolved_lazily(self):
+        user = self.user(LANDLORD)
+        request = self.request(user)
+        seen = []
+        middleware = RoleMiddleware(lambda request: seen.append(request.user_role) or 'response')
+        with mock.patch.object(RoleService, 'get_role', wraps=RoleService.get_role) as get_role:
+            RoleMiddleware(lambda request: 'response')(request)
+            get_role.assert_not_called()
+            self.assertEqual(middleware(request), 'response')
+        self.assertEqual(seen, [LANDLORD])
+
+    def test_landlord_pages_use_the_role(self):
+        student = self.user(STUDENT)
+        self.client.force_login(student)
+        response = self.client.get('/dashboard/')
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response['Location'].startswith('/admin/login/'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            student.groups.set([RoleService.group_id(LANDLORD)])
+        self.assertEqual(self.client.get('/dashboard/').status_code, 200)
@@ -0,0 +1,109 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+
+from ..models import Accommodation, LandlordProfile, SearchDocument
+from ..services.search_service import (
+    FTS_TABLE, BasicSearchBackend, PostgresSearchBackend, SearchService, SQLiteSearchBackend, get_search_backend,
+)
+from .utils import make_landlord, make_listing, make_location
+
+
+def search(query):
+    ranked = SearchService.search(Accommodation.objects.all(), query).order_by(*SearchService.ORDERING)
+    return list(ranked.values_list('pk', flat=True))
+
+
+class SearchDocumentTests(TestCase):
+
+    def setUp(self):
+        self.landlord = make_landlord(company_name='Acme Rentals')
+        self.location = make_location('Campus')
+        self.listing = make_listing(self.landlord, self.location, description='Garden cottage', room_type='double')
+
+    def body(self):
+        return SearchDocument.objects.get(accommodation=self.listing).body
+
+    def test_saving_a_listing_writes_its_document(self):
+        self.assertEqual(self.body(), 'Garden cottage\nCampus\nAcme Rentals\ndouble\nDouble Room')
+
+        self.listing.description = 'Loft apartment'
+        self.listing.save()
+        self.assertTrue(self.body().startswith('Loft apartment\n'))
+
+    def test_location_and_company_renames_reindex_their_listings(self):
+        self.location.name = 'Richards Bay'
+        self.location.save()
+        profile = LandlordProfile.objects.get(user=self.landlord)
+        profile.company_name = 'Bay Homes'
+        profile.save()
+        self.assertEqual(self.body(), 'Garden cottage\nRichards Bay\nBay Homes\ndouble\nDouble Room')
+
+    def test_deleting_a_listing_drops_its_document(self):
+        pk = self.listing.pk
+        self.listing.delete()
+        self.assertFalse(SearchDocument.objects.filter(accommodation_id=pk).exists())
+
+
+@skipUnless(connection.vendor == 'sqlite', "SQLite FTS5 backend")
+class SQLiteSearchTests(TestCase):
+
+    def setUp(self):
+        if FTS_TABLE not in connection.introspection.table_names():
+            self.skipTest("SQLite built without FTS5")
+        landlord = make_landlord(company_name='Acme Rentals')
+        campus = make_location('Campus')
+        self.exact = make_listing(landlord, campus, description='Garden cottage')
+        self.loose = make_listing(landlord, campus, description=(
+            'Large family house with shared kitchen, lounge and laundry. Quiet street, '
+            'walking distance to shops and taxis. The cottage at the back has a small garden.'
+        ))
+        self.other = make_listing(landlord, make_location('Town'), description='Flat above the bakery')
+
+    def test_uses_the_fts5_backend(self):
+        self.assertIsInstance(get_search_backend(), SQLiteSearchBackend)
+
+    def test_closest_match_ranks_first(self):
+        self.assertEqual(search('garden cottage'), [self.exact.pk, self.loose.pk])
+
+    def test_matches_word_prefixes_and_stems(self):
+        self.assertEqual(search('bak'), [self.other.pk])
+        self.assertEqual(set(search('camp')), {self.exact.pk, self.loose.pk})
+        self.assertEqual(search('gardens'), search('garden'))
+
+    def test_search_follows_edits_and_deletes(self):
+        self.other.description = 'Garden flat'
+        self.other.save()
+        self.assertIn(self.other.pk, search('garden'))
+        self.assertEqual(search('bakery'), [])
+
+        self.exact.delete()
+        self.assertEqual(set(search('garden')), {self.loose.pk, self.other.pk})
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {FTS_TABLE} WHERE rowid = %s", [self.exact.pk])
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_query_syntax_in_user_input_is_harmless(self):
+        self.assertEqual(search('"garden" (cottage*'), [self.exact.pk, self.loose.pk])
+        # Operators are plain words too
+        self.assertEqual(search('garden NOT cottage'), [])
+        # Nothing searchable: every listing, unranked
+        self.assertEqual(set(search('"*')), {self.exact.pk, self.loose.pk, self.other.pk})
+
+
+class OtherSearchBackendTests(TestCase):
+
+    def test_basic_backend_matches_substrings(self):
+        landlord = make_landlord()
+        listing = make_listing(landlord, make_location('Campus'), description='Garden cottage')
+        make_listing(landlord, make_location('Town'), description='Flat')
+        matches = BasicSearchBackend().filter(Accommodation.objects.all(), 'cott')
+        self.assertEqual([(row.pk, row.search_rank) for row in matches], [(listing.pk, 0.0)])
+
+    def test_postgres_backend_query(self):
+        # Only compiled here; it runs against the generated tsvector column on PostgreSQL
+        queryset = PostgresSearchBackend().filter(Accommodation.objects.all(), 'garden cottage')
+        sql = str(queryset.query)
+        self.assertIn("search_vector @@ websearch_to_tsquery('english', garden cottage)", sql)
+        self.assertIn('ts_rank(search_vector', sql)
@@ -0,0 +1,92 @@
+import random
+import threading
+from unittest import mock
+
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+
+from ..models import SearchLogEntry
+from ..services import search_analytics_service
+from ..services.search_analytics_service import SearchLog
+
+
+@override_settings(SEARCH_LOG_MAX_PER_SECOND=20)
+class SearchLogTests(TestCase):
+
+    def setUp(self):
+        clock = mock.patch.object(search_analytics_service, 'time')
+        self.clock = clock.start().time
+        self.addCleanup(clock.stop)
+        self.clock.return_value = 1000.0
+        writer = mock.patch.object(SearchLog, '_start_writer')
+        writer.start()
+        self.addCleanup(writer.stop)
+        self.log = SearchLog()
+
+    def record(self, count, query='room'):
+        for _ in range(count):
+            self.log.record(query, '', 3, 12)
+
+    def flush(self):
+        self.clock.return_value += 1
+        self.log.flush()
+
+    def weights(self):
+        return list(SearchLogEntry.objects.values_list('weight', flat=True))
+
+    def test_quiet_seconds_keep_every_search_at_weight_one(self):
+        self.record(5)
+        self.flush()
+        self.assertEqual(self.weights(), [1.0] * 5)
+
+    def test_busy_second_keeps_the_limit_and_weights_add_up_to_the_searches(self):
+        self.record(100)
+        self.flush()
+        self.assertEqual(self.weights(), [5.0] * 20)
+
+    def test_each_second_is_weighted_by_its_own_count(self):
+        self.record(30, query='first')
+        self.clock.return_value += 1
+        self.record(10, query='second')
+        self.flush()
+
+        totals = dict(SearchLogEntry.objects.values_list('query').annotate(Sum('weight')))
+        self.assertAlmostEqual(totals['first'], 30)
+        self.assertAlmostEqual(totals['second'], 10)
+        self.assertEqual(SearchLogEntry.objects.filter(query='first').count(), 20)
+
+    def test_the_running_second_is_written_once_it_is_over(self):
+        self.record(3)
+        self.log.flush()
+        self.assertEqual(self.weights(), [])
+
+        self.record(1)
+        self.flush()
+        self.assertEqual(self.weights(), [1.0] * 4)
+
+    def test_concurrent_searches_are_all_counted(self):
+        def search():
+            self.record(500)
+
+        threads = [threading.Thread(target=search) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.flush()
+
+        self.assertEqual(len(self.weights()), 20)
+        self.assertAlmostEqual(sum(self.weights()), 4000)
+
+    def test_every_search_in_a_second_is_equally_likely_to_be_kept(self):
+        random.seed(7)
+        kept = [0] * 40
+        for _ in range(400):
+            log = SearchLog()
+            for position in range(40):
+                log.record(str(position), '', 0, 0)
+            for entry in log._sample:
+                kept[int(entry.query)] += 1
+        # Each search is kept with probability 20/40: about 200 of 400 times
+        for count in kept:
+            self.assertTrue(150 < count < 250, kept)
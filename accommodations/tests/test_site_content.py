@@ -0,0 +1,68 @@
+from django.contrib import messages
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+
+from ..models import SiteContent
+from ..services.cache_service import clear_local_cache
+from ..views import _site_content_etag, _site_content_last_modified
+
+
+class SiteContentPageTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        self.terms = SiteContent.objects.create(content_type='terms', title='Terms', content='<p>Be nice</p>')
+
+    def test_anonymous_page_has_validators(self):
+        response = self.client.get('/terms/')
+        self.assertContains(response, 'Be nice')
+        self.assertEqual(response['ETag'], f'"terms-{self.terms.last_updated.timestamp():.6f}-public"')
+        self.assertIn('public', response['Cache-Control'])
+
+        self.assertEqual(self.client.get('/terms/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.client.get('/terms/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+    def test_logged_in_page_is_validated_per_user(self):
+        user = User.objects.create_user('student', password='password')
+        self.client.force_login(user)
+        response = self.client.get('/terms/')
+        self.assertTrue(response['ETag'].endswith(f'-user-{user.pk}"'))
+        self.assertFalse(response.has_header('Last-Modified'))
+        self.assertIn('private', response['Cache-Control'])
+        self.assertEqual(self.client.get('/terms/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_pending_messages_get_no_validators(self):
+        request = RequestFactory().get('/terms/')
+        request.user = AnonymousUser()
+        request._messages = CookieStorage(request)
+        messages.info(request, 'Saved')
+        self.assertIsNone(_site_content_etag(request, 'terms'))
+        self.assertIsNone(_site_content_last_modified(request, 'terms'))
+
+    def test_inactive_or_missing_content_is_404(self):
+        self.assertEqual(self.client.get('/privacy/').status_code, 404)
+        self.terms.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.terms.save()
+        self.assertEqual(self.client.get('/terms/').status_code, 404)
+
+    def test_admin_save_shows_at_once(self):
+        etag = self.client.get('/terms/')['ETag']
+
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/admin/accommodations/sitecontent/{self.terms.pk}/change/', {
+                'content_type': 'terms', 'title': 'Terms', 'content': '<p>Be kind</p>', 'is_active': 'on',
+                '_save': 'Save',
+            })
+        self.assertEqual(response.status_code, 302)
+        self.client.logout()
+
+        response = self.client.get('/terms/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Be kind')
+        self.assertNotEqual(response['ETag'], etag)
@@ -0,0 +1,99 @@
+import re
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from seo.models import Region
+from ..services.cache_service import clear_local_cache
+from ..sitemaps import AccommodationSitemap
+from .utils import make_landlord, make_listing, make_location
+
+
+# The Sites framework's default site
+SITE = 'http://example.com'
+
+
+def locations(response):
+    return re.findall(r'<loc>(.*?)</loc>', response.content.decode())
+
+
+@mock.patch.object(AccommodationSitemap, 'limit', 2)
+class SitemapTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        self.landlord = make_landlord()
+        self.location = make_location()
+        self.listings = [make_listing(self.landlord, self.location) for _ in range(5)]
+        make_listing(self.landlord, self.location, is_approved=False)
+
+    def get(self, url, status=200):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status)
+        return response
+
+    def listing_urls(self, listings):
+        return [f'{SITE}{listing.get_absolute_url()}' for listing in listings]
+
+    def test_index_has_one_entry_per_shard(self):
+        response = self.get('/sitemap.xml')
+        self.assertEqual(response['Content-Type'], 'application/xml')
+        self.assertEqual(response['X-Robots-Tag'], 'noindex, noodp, noarchive')
+        self.assertEqual(locations(response), [
+            f'{SITE}/sitemap-static.xml',
+            f'{SITE}/sitemap-accommodations.xml',
+            f'{SITE}/sitemap-accommodations.xml?p=2',
+            f'{SITE}/sitemap-accommodations.xml?p=3',
+            f'{SITE}/sitemap-regions.xml',
+            f'{SITE}/sitemap-subregions.xml',
+        ])
+
+    def test_shards_split_the_approved_listings(self):
+        pages = [locations(self.get(f'/sitemap-accommodations.xml?p={page}')) for page in (1, 2, 3)]
+        self.assertEqual([len(urls) for urls in pages], [2, 2, 1])
+        self.assertEqual(sum(pages, []), self.listing_urls(self.listings))
+
+        response = self.get('/sitemap-accommodations.xml?p=3')
+        self.assertIn(f'<lastmod>{self.listings[4].updated_at.date().isoformat()}', response.content.decode())
+        self.assertTrue(response.has_header('Last-Modified'))
+
+    def test_static_and_area_sections(self):
+        self.assertEqual(len(locations(self.get('/sitemap-static.xml'))), 6)
+        Region.objects.create(name='Empangeni')
+        self.assertEqual(locations(self.get('/sitemap-regions.xml')), [f'{SITE}/area/empangeni/'])
+
+    def test_bad_sections_and_pages_are_404s(self):
+        for url in ('/sitemap-landlords.xml', '/sitemap-accommodations.xml?p=4', '/sitemap-accommodations.xml?p=two'):
+            with self.subTest(url=url):
+                self.get(url, status=404)
+
+    def test_sections_are_cached(self):
+        self.get('/sitemap.xml')
+        self.get('/sitemap-accommodations.xml?p=3')
+        with self.assertNumQueries(0):
+            self.get('/sitemap.xml')
+            self.get('/sitemap-accommodations.xml?p=3')
+
+    def test_listing_changes_invalidate_only_the_listing_sections(self):
+        self.get('/sitemap.xml')
+        self.get('/sitemap-accommodations.xml')
+        self.get('/sitemap-accommodations.xml?p=3')
+        self.get('/sitemap-regions.xml')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            added = [make_listing(self.landlord, self.location) for _ in range(2)]
+        self.assertIn(f'{SITE}/sitemap-accommodations.xml?p=4', locations(self.get('/sitemap.xml')))
+        self.assertEqual(
+            locations(self.get('/sitemap-accommodations.xml?p=3')), self.listing_urls([self.listings[4], added[0]]),
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.listings[0].is_approved = False
+            self.listings[0].save()
+        self.assertEqual(locations(self.get('/sitemap-accommodations.xml')), self.listing_urls(self.listings[1:3]))
+        self.assertNotIn(f'{SITE}/sitemap-accommodations.xml?p=4', locations(self.get('/sitemap.xml')))
+
+        with self.assertNumQueries(0):
+            self.get('/sitemap-regions.xml')
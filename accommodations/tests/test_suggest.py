@@ -0,0 +1,131 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from ..services.suggest_service import (
+    AREA, CHANGE_KEY, LANDLORD, LOCATION, MAX_REPLAY, SEQ_KEY, PrefixIndex, SuggestService,
+)
+from .utils import make_landlord, make_location
+
+
+class PrefixIndexTests(TestCase):
+
+    def setUp(self):
+        self.index = PrefixIndex()
+        self.index.put(('location', 1), LOCATION, 'River View')
+        self.index.put(('region', 1), AREA, 'Empangeni')
+        self.index.put(('location', 2), LOCATION, 'Vulindlela (Main Gate)')
+        self.index.put(('landlord', 7), LANDLORD, 'Ésikhawini Rentals')
+
+    def labels(self, text, **kwargs):
+        return [suggestion['label'] for suggestion in self.index.search(text, **kwargs)]
+
+    def test_matches_the_start_of_the_label_and_of_each_word(self):
+        self.assertEqual(self.labels('riv'), ['River View'])
+        self.assertEqual(self.labels('view'), ['River View'])
+        self.assertEqual(self.labels('main'), ['Vulindlela (Main Gate)'])
+        self.assertEqual(self.labels('gate'), ['Vulindlela (Main Gate)'])
+        self.assertEqual(self.labels('iver'), [])
+
+    def test_ignores_case_accents_and_extra_whitespace(self):
+        self.assertEqual(self.labels('  ESIKHA'), ['Ésikhawini Rentals'])
+        self.assertEqual(self.labels('river   v'), ['River View'])
+        self.assertEqual(self.index.search('Empa'), [{'label': 'Empangeni', 'kind': AREA}])
+
+    def test_blank_text_finds_nothing(self):
+        self.assertEqual(self.labels(''), [])
+        self.assertEqual(self.labels('   '), [])
+
+    def test_put_replaces_and_none_removes(self):
+        self.index.put(('location', 1), LOCATION, 'Riverside')
+        self.assertEqual(self.labels('riv'), ['Riverside'])
+        self.assertEqual(self.labels('view'), [])
+
+        self.index.put(('location', 1), LOCATION, None)
+        self.assertEqual(self.labels('riv'), [])
+        self.assertEqual(len(self.index), 3)
+        self.index.remove(('location', 404))
+        self.assertEqual(len(self.index), 3)
+
+    def test_same_label_from_several_sources_is_suggested_once(self):
+        self.index.put(('subregion', 3), AREA, 'river view')
+        self.assertEqual(self.labels('river'), ['River View'])
+        self.index.put(('location', 1), LOCATION, None)
+        self.assertEqual(self.labels('river'), ['river view'])
+
+    def test_limit(self):
+        for number in range(12):
+            self.index.put(('location', 100 + number), LOCATION, f'Block {number:02}')
+        self.assertEqual(self.labels('block', limit=3), ['Block 00', 'Block 01', 'Block 02'])
+        self.assertEqual(len(self.labels('block')), 8)
+
+    def test_copy_leaves_the_original_alone(self):
+        copy = self.index.copy()
+        copy.put(('location', 1), LOCATION, None)
+        copy.put(('location', 9), LOCATION, 'Richards Bay')
+        self.assertEqual(self.labels('ri'), ['River View'])
+        self.assertEqual([suggestion['label'] for suggestion in copy.search('ri')], ['Richards Bay'])
+
+
+class SuggestServiceTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        SuggestService._index = PrefixIndex()
+        SuggestService._seq = None
+        self.addCleanup(setattr, SuggestService, '_seq', None)
+        with self.captureOnCommitCallbacks(execute=True):
+            make_location('Riverside')
+
+    def labels(self, text):
+        SuggestService.sync(force=True)
+        return [suggestion['label'] for suggestion in SuggestService.suggest(text)]
+
+    def test_loads_from_the_database_then_replays_the_journal(self):
+        self.assertEqual(self.labels('riv'), ['Riverside'])
+        seq = SuggestService._seq
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_location('Riverbend')
+        with mock.patch.object(SuggestService, '_rebuild') as rebuild:
+            self.assertEqual(self.labels('riv'), ['Riverbend', 'Riverside'])
+        rebuild.assert_not_called()
+        self.assertEqual(SuggestService._seq, seq + 1)
+
+    def test_publish_skips_a_number_another_process_drew(self):
+        self.assertEqual(self.labels('riv'), ['Riverside'])
+        seq = cache.get(SEQ_KEY)
+        # Another process drew seq + 1 from a non-atomic incr and wrote its change there
+        cache.add(CHANGE_KEY.format(seq + 1), (('location', 999), LOCATION, 'River Lodge'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_location('Riverbend')
+        self.assertEqual(cache.get(SEQ_KEY), seq + 2)
+        self.assertEqual(self.labels('riv'), ['River Lodge', 'Riverbend', 'Riverside'])
+
+    def test_publish_without_a_free_number_makes_every_process_reload(self):
+        self.assertEqual(self.labels('riv'), ['Riverside'])
+        seq = cache.get(SEQ_KEY)
+
+        with mock.patch.object(cache, 'add', return_value=False):
+            with self.captureOnCommitCallbacks(execute=True):
+                make_location('Riverbend')
+        self.assertGreater(cache.get(SEQ_KEY) - seq, MAX_REPLAY)
+        self.assertEqual(self.labels('riv'), ['Riverbend', 'Riverside'])
+
+    def test_only_verified_landlords_are_suggested(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            landlord = make_landlord('river', company_name='River Rentals', is_verified=False)
+        self.assertEqual(self.labels('river r'), [])
+
+        profile = landlord.landlordprofile
+        profile.is_verified = True
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.save()
+        self.assertEqual(self.labels('river r'), ['River Rentals'])
+
+        profile.is_verified = False
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.save()
+        self.assertEqual(self.labels('river r'), [])
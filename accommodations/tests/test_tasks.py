@@ -0,0 +1,209 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..models import AccommodationImage, SubmissionHistory
+from ..services.email_service import EmailSubmissionService
+from ..services.image_service import ImageRenditionService
+from ..tasks import SUBMISSION_MAX_ATTEMPTS, SUBMISSION_RETRY_DELAY, deliver_submission, process_image, retry_submissions
+from .utils import MediaRootMixin, image_bytes, make_landlord, make_listing, make_location
+
+
+class ProcessImageTests(MediaRootMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.listing = make_listing(make_landlord(), make_location())
+
+    def upload(self, content, name='photo.png'):
+        image = AccommodationImage(accommodation=self.listing, status=AccommodationImage.PENDING)
+        image.image.save(name, ContentFile(content))
+        return image
+
+    def test_valid_upload_becomes_ready_primary_image(self):
+        image = self.upload(image_bytes())
+        process_image(image.pk)
+        image.refresh_from_db()
+        self.assertEqual(image.status, AccommodationImage.READY)
+        self.assertTrue(image.is_primary)
+        self.assertEqual(image.renditions['card']['width'], 480)
+
+    def test_invalid_uploads_are_removed(self):
+        truncated = image_bytes('JPEG', (1200, 900))
+        for name, content in [('notes.png', b'just some text'), ('cut.jpg', truncated[:len(truncated) // 2])]:
+            with self.subTest(name=name):
+                image = self.upload(content, name)
+                process_image(image.pk)
+                self.assertFalse(AccommodationImage.objects.filter(pk=image.pk).exists())
+                self.assertFalse(default_storage.exists(image.image.name))
+
+    def test_other_errors_propagate_and_keep_the_upload(self):
+        image = self.upload(image_bytes())
+        with mock.patch.object(ImageRenditionService, 'generate', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                process_image(image.pk)
+        image.refresh_from_db()
+        self.assertEqual(image.status, AccommodationImage.PENDING)
+        self.assertTrue(default_storage.exists(image.image.name))
+
+    def test_storage_errors_while_validating_propagate(self):
+        image = self.upload(image_bytes())
+        with mock.patch.object(default_storage, 'open', side_effect=OSError('storage unavailable')):
+            with self.assertRaises(OSError):
+                process_image(image.pk)
+        self.assertTrue(AccommodationImage.objects.filter(pk=image.pk).exists())
+
+
+@override_settings(EMAIL_HOST_USER='mailer', EMAIL_HOST_PASSWORD='secret', ADMIN_EMAIL='admin@example.com')
+class DeliverSubmissionTests(MediaRootMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.submission = SubmissionHistory(
+            landlord=make_landlord(company_name='Acme Rooms'), filename='proof.pdf', file_size=9, message='Paid',
+        )
+        self.submission.file.save('proof.pdf', ContentFile(b'%PDF-1.4\n'))
+
+    def refreshed(self):
+        self.submission.refresh_from_db()
+        return self.submission
+
+    def fail_delivery(self):
+        patcher = mock.patch.object(EmailSubmissionService, 'deliver_submission', side_effect=OSError('SMTP down'))
+        with patcher:
+            deliver_submission(self.submission.pk)
+        return self.refreshed()
+
+    def make_due(self):
+        SubmissionHistory.objects.filter(pk=self.submission.pk).update(next_attempt_at=timezone.now())
+
+    def test_sends_the_pdf_and_drops_the_stored_file(self):
+        path = self.submission.file.name
+        deliver_submission(self.submission.pk)
+        submission = self.refreshed()
+        self.assertEqual(submission.status, SubmissionHistory.SENT)
+        self.assertEqual(submission.attempts, 1)
+        self.assertIsNone(submission.next_attempt_at)
+        self.assertFalse(default_storage.exists(path))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['admin@example.com'])
+        self.assertEqual(mail.outbox[0].streamed_attachments[0][0], 'proof.pdf')
+
+    def test_failures_are_retried_with_backoff(self):
+        for attempt in (1, 2, 3):
+            before = timezone.now()
+            submission = self.fail_delivery()
+            self.assertEqual(submission.status, SubmissionHistory.PENDING)
+            self.assertEqual(submission.attempts, attempt)
+            self.assertEqual(submission.last_error, 'SMTP down')
+            delay = timedelta(seconds=SUBMISSION_RETRY_DELAY * 2 ** (attempt - 1))
+            self.assertAlmostEqual(submission.next_attempt_at, before + delay, delta=timedelta(seconds=5))
+
+            # Not due yet: a second task does nothing
+            deliver_submission(submission.pk)
+            self.assertEqual(self.refreshed().attempts, attempt)
+            self.make_due()
+        self.assertTrue(default_storage.exists(submission.file.name))
+
+    def test_gives_up_after_the_last_attempt(self):
+        SubmissionHistory.objects.filter(pk=self.submission.pk).update(attempts=SUBMISSION_MAX_ATTEMPTS - 1)
+        submission = self.fail_delivery()
+        self.assertEqual(submission.status, SubmissionHistory.FAILED)
+        self.assertIsNone(submission.next_attempt_at)
+        # Kept so an admin can still get at the proof of payment
+        self.assertTrue(default_storage.exists(submission.file.name))
+
+    def test_a_claimed_submission_is_not_sent_twice(self):
+        def deliver_again(submission):
+            # A duplicate task arriving while the first is still sending
+            deliver_submission(submission.pk)
+            return original(submission)
+
+        original = EmailSubmissionService.deliver_submission
+        with mock.patch.object(EmailSubmissionService, 'deliver_submission', side_effect=deliver_again):
+            deliver_submission(self.submission.pk)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(self.refreshed().attempts, 1)
+
+    def test_delivered_submissions_are_left_alone(self):
+        SubmissionHistory.objects.filter(pk=self.submission.pk).update(status=SubmissionHistory.SENT)
+        deliver_submission(self.submission.pk)
+        self.assertEqual(len(mail.outbox), 0)
+
+
+@mock.patch('accommodations.tasks.async_task')
+class RetrySubmissionsTests(MediaRootMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.landlord = make_landlord()
+        self.now = timezone.now()
+
+    def submission(self, submitted_ago=0, next_attempt_in=None, status=SubmissionHistory.PENDING):
+        submission = SubmissionHistory.objects.create(
+            landlord=self.landlord, filename='proof.pdf', file_size=9, status=status,
+            next_attempt_at=None if next_attempt_in is None else self.now + timedelta(seconds=next_attempt_in),
+        )
+        SubmissionHistory.objects.filter(pk=submission.pk).update(
+            submitted_at=self.now - timedelta(seconds=submitted_ago),
+        )
+        return submission.pk
+
+    def test_queues_the_submissions_that_are_due(self, async_task):
+        due = [
+            self.submission(next_attempt_in=-1),
+            # Its own task was never queued, or got lost
+            self.submission(submitted_ago=SUBMISSION_RETRY_DELAY + 1),
+        ]
+        self.submission(next_attempt_in=60)
+        self.submission()
+        self.submission(submitted_ago=3600, status=SubmissionHistory.SENT)
+        self.submission(submitted_ago=3600, status=SubmissionHistory.FAILED)
+
+        retry_submissions()
+        self.assertCountEqual(
+            [call.args for call in async_task.call_args_list],
+            [('accommodations.tasks.deliver_submission', pk) for pk in due],
+        )
+
+
+@mock.patch('accommodations.views.async_task')
+class PdfSubmissionViewTests(MediaRootMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(make_landlord())
+
+    def post(self):
+        upload = SimpleUploadedFile('proof.pdf', b'%PDF-1.4\n', content_type='application/pdf')
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/dashboard/submit-pdf/', {'pdf_file': upload, 'message': 'Paid'})
+
+    def test_stores_the_submission_and_queues_its_delivery(self, async_task):
+        response = self.post()
+        self.assertRedirects(response, '/dashboard/', fetch_redirect_response=False)
+        submission = SubmissionHistory.objects.get()
+        self.assertEqual(submission.status, SubmissionHistory.PENDING)
+        self.assertEqual(submission.message, 'Paid')
+        async_task.assert_called_once_with('accommodations.tasks.deliver_submission', submission.pk)
+
+    def test_queueing_failure_leaves_it_for_the_sweep(self, async_task):
+        async_task.side_effect = ConnectionError('broker down')
+        with self.assertLogs('django', 'ERROR'):
+            response = self.post()
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(SubmissionHistory.objects.get().status, SubmissionHistory.PENDING)
+
+    def test_storage_failure_is_reported(self, async_task):
+        with mock.patch.object(default_storage, 'save', side_effect=OSError('disk full')):
+            with self.assertLogs('accommodations.views', 'ERROR'):
+                response = self.post()
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(SubmissionHistory.objects.exists())
+        async_task.assert_not_called()
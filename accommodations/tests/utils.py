@@ -0,0 +1,48 @@
+import shutil
+import tempfile
+from decimal import Decimal
+from io import BytesIO
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+from PIL import Image
+
+from ..models import Accommodation, LandlordProfile, Location
+
+
+def make_landlord(username='landlord', **profile):
+    user = User.objects.create_user(username, f'{username}@example.com', 'password')
+    LandlordProfile.objects.create(user=user, **profile)
+    return user
+
+
+def make_location(name='Campus'):
+    return Location.objects.create(name=name)
+
+
+def make_listing(landlord, location, **fields):
+    fields = {
+        'description': 'Sunny room close to campus',
+        'room_type': 'single',
+        'price': Decimal('1500.00'),
+        'is_approved': True,
+        **fields,
+    }
+    return Accommodation.objects.create(landlord=landlord, location=location, **fields)
+
+
+def image_bytes(fmt='PNG', size=(640, 480)):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'teal').save(buffer, fmt)
+    return buffer.getvalue()
+
+
+class MediaRootMixin:
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        super().setUp()
@@ -1,9 +1,19 @@
+import logging
+import time
+from functools import wraps
+
 from django.shortcuts import render, get_object_or_404, redirect
-from django.contrib.auth.decorators import login_required, user_passes_test
+from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
 from django.contrib.auth import login
-from django.contrib.auth.models import Group
 from django.contrib import messages
-from django.db.models import Q, Sum
+from django.db import DatabaseError, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from django.http import Http404, HttpResponse, JsonResponse
+from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
 
 from studentpa import settings
 from .models import Accommodation, SiteContent, Location, LandlordProfile, StudentProfile, AccommodationImage
@@ -12,11 +22,40 @@ from .forms import (AccommodationForm, RoleSelectionForm,
                    AccommodationWithImagesForm)
 from accommodations import models
 from django.utils import timezone
-from .models import SubmissionHistory 
+from .models import SubmissionHistory, BROWSE_SORTS, PRICE_RANGES
+from .pagination import CountedPaginator, KeysetPaginator
+from .services.search_service import SearchService
+from .services.facet_service import FacetService
+from .services.listing_stats_service import ListingStatsService
+from .services.search_analytics_service import SearchAnalyticsService
+from .services.cache_service import cache_public_page, cached_query
+from .services.etag_service import browse_etag, browse_ordering, detail_etag, detail_last_modified, preview_etag, viewer
+from .services.role_service import LANDLORD, STUDENT, RoleService
+from .services.sitemap_service import SitemapService
+from .services.suggest_service import SuggestService
+from django_q.tasks import async_task
+
+logger = logging.getLogger(__name__)
+
+
+BROWSE_PAGE_SIZE = 12
+DASHBOARD_PAGE_SIZE = 25
 
 
 def is_landlord(user):
-    return user.groups.filter(name='Landlords').exists() or user.is_superuser
+    return RoleService.is_landlord(user)
+
+def landlord_required(view_func):
+    """
+    Like user_passes_test(is_landlord), but uses request.user_role
+    (RoleMiddleware) so a warm session needs no groups query at all
+    """
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        if request.user_role == LANDLORD or request.user.is_superuser:
+            return view_func(request, *args, **kwargs)
+        return redirect_to_login(request.get_full_path(), '/admin/login/')
+    return _wrapped_view
 
 def register_role_selection(request):
     if request.user.is_authenticated:
@@ -52,8 +91,7 @@ def register_student(request):
             )
 
             # Add to Students group
-            student_group, created = Group.objects.get_or_create(name='Students')
-            user.groups.add(student_group)
+            RoleService.add_to_role(user, STUDENT)
 
             # Auto-login and redirect
             login(request, user)
@@ -85,8 +123,7 @@ def register_landlord(request):
             )
 
             # Add to Landlords group
-            landlord_group, created = Group.objects.get_or_create(name='Landlords')
-            user.groups.add(landlord_group)
+            RoleService.add_to_role(user, LANDLORD)
 
             # Auto-login and redirect
             login(request, user)
@@ -108,75 +145,113 @@ def register(request):
     return redirect('register_role_selection')
 
 def landing_page(request):
-    featured_accommodations = Accommodation.objects.filter(
-        is_approved=True,
-        is_featured=True,
-        available_rooms__gt=0
-    )[:4]
+    featured_accommodations = cached_query(
+        'landing:featured', 300,
+        lambda: list(Accommodation.objects.public().filter(is_featured=True).for_cards()[:4]),
+        tags=['featured'],
+    )
 
-    return render(request, 'landing.html', {
+    response = render(request, 'landing.html', {
         'featured_accommodations': featured_accommodations
     })
+    ListingStatsService.count(response, impressions=[a.pk for a in featured_accommodations])
+    return cache_public_page(response, 'featured')
 
+@condition(etag_func=browse_etag)
 def accommodation_list(request):
-    accommodations = Accommodation.objects.filter(is_approved=True, available_rooms__gt=0)
+    started = time.perf_counter()
+    accommodations = Accommodation.objects.public()
 
     # Filters
     search_query = request.GET.get('search', '')
     room_type = request.GET.get('room_type', '')
     location_id = request.GET.get('location', '')
     price_range = request.GET.get('price_range', '')
+    sort = request.GET.get('sort', '')
 
     if search_query:
-        accommodations = accommodations.filter(
-            Q(title__icontains=search_query) |
-            Q(description__icontains=search_query)
-        )
-
-    if room_type:
-        accommodations = accommodations.filter(room_type=room_type)
-
-    if location_id:
-        accommodations = accommodations.filter(location_id=location_id)
-
-    if price_range:
-        if price_range == '0-300':
-            accommodations = accommodations.filter(price__lte=300)
-        elif price_range == '300-500':
-            accommodations = accommodations.filter(price__range=(300, 500))
-        elif price_range == '500-700':
-            accommodations = accommodations.filter(price__range=(500, 700))
-        elif price_range == '700+':
-            accommodations = accommodations.filter(price__gte=700)
-
-    locations = Location.objects.all()
-
-    return render(request, 'accommodations/list.html', {
-        'accommodations': accommodations,
-        'locations': locations,
+        accommodations = SearchService.search(accommodations, search_query)
+
+    # Sidebar counts are taken before the sidebar filters themselves are applied
+    locations = cached_query('locations:all', 3600, lambda: list(Location.objects.all()), tags=['locations'])
+    facets = FacetService.browse_facets(
+        accommodations, [location.id for location in locations],
+        search_query, room_type, location_id, price_range,
+    )
+
+    accommodations = accommodations.browse(room_type, location_id, price_range)
+
+    ordering = browse_ordering(sort, search_query)
+
+    # Keyset pagination: filters stay in the query string, the cursor marks the position
+    paginator = KeysetPaginator(accommodations.for_cards(), ordering, per_page=BROWSE_PAGE_SIZE)
+    page = paginator.page(request.GET.get('cursor'))
+    latency_ms = round((time.perf_counter() - started) * 1000)
+
+    response = render(request, 'accommodations/list.html', {
+        'accommodations': page.object_list,
+        'page': page,
+        'page_count': len(page),
+        'accommodation_count': facets['total'],
+        'room_type_options': [
+            (code, label, facets['room_type'][code]) for code, label in Accommodation.ROOM_TYPES
+        ],
+        'location_options': [
+            (location, facets['location'].get(location.id, 0)) for location in locations
+        ],
+        'price_range_options': [
+            (key, label, facets['price_range'][key]) for key, (label, _) in PRICE_RANGES.items()
+        ],
         'search_query': search_query,
         'selected_room_type': room_type,
         'selected_location': location_id,
         'selected_price_range': price_range,
+        'selected_sort': sort,
+        'sort_options': [(key, label) for key, (label, _) in BROWSE_SORTS.items()],
     })
-
+    ListingStatsService.count(response, impressions=[a.pk for a in page.object_list])
+    filters = {'room_type': room_type, 'location': location_id, 'price_range': price_range, 'sort': sort}
+    if (search_query or any(filters.values())) and not request.GET.get('cursor'):
+        # First page only: paging through results isn't another search
+        SearchAnalyticsService.mark(response, search_query, filters, facets['total'], latency_ms)
+    return cache_public_page(response, 'browse', 'locations')
+
+
+def search_suggestions(request):
+    """Search box autocomplete, answered from the in-memory SuggestService index"""
+    query = request.GET.get('q', '')[:100]
+    response = JsonResponse({'query': query, 'suggestions': SuggestService.suggest(query)})
+    # Names change rarely; let browsers reuse answers while someone types and deletes
+    patch_cache_control(response, public=True, max_age=60)
+    return response
+
+@condition(etag_func=detail_etag, last_modified_func=detail_last_modified)
 def accommodation_detail(request, pk):
-    accommodation = get_object_or_404(Accommodation, pk=pk, is_approved=True)
+    accommodation = get_object_or_404(Accommodation.objects.with_details(), pk=pk, is_approved=True)
 
      # Check if the accommodation is approved OR if the user is the landlord
     if not accommodation.is_approved and request.user != accommodation.landlord:
         messages.error(request, 'This accommodation is not available.')
         return redirect('accommodation_list')
 
-    return render(request, 'accommodations/detail.html', {
+    response = render(request, 'accommodations/detail.html', {
         'accommodation': accommodation
     })
+    if request.user.id != accommodation.landlord_id:
+        ListingStatsService.count(response, views=[accommodation.pk])
+    return cache_public_page(
+        response,
+        f'listing:{accommodation.pk}',
+        f'landlord:{accommodation.landlord_id}',
+        f'location:{accommodation.location_id}',
+    )
 
 
 @login_required
+@condition(etag_func=preview_etag)
 def accommodation_preview(request, pk):
     """Preview accommodation for landlords (even if not approved)"""
-    accommodation = get_object_or_404(Accommodation, pk=pk, landlord=request.user)
+    accommodation = get_object_or_404(Accommodation.objects.with_details(), pk=pk, landlord=request.user)
 
     return render(request, 'accommodations/detail.html', {
         'accommodation': accommodation,
@@ -186,37 +261,51 @@ def accommodation_preview(request, pk):
 
 
 @login_required
-@user_passes_test(is_landlord, login_url='/admin/login/')
+@landlord_required
 def landlord_dashboard(request):
     # Check if user is a landlord
-    if not request.user.groups.filter(name='Landlords').exists():
+    if request.user_role != LANDLORD:
         messages.error(request, 'You need a landlord account to access the dashboard.')
         return redirect('accommodation_list')
 
-    accommodations = Accommodation.objects.filter(landlord=request.user)
+    listings = Accommodation.objects.filter(landlord=request.user)
 
      # ✅ Get persistent submission history
     recent_submissions = SubmissionHistory.objects.filter(
         landlord=request.user
     ).order_by('-submitted_at')[:10]  # Last 10 submissions
     
-    # Calculate proper stats
-    total_listings = accommodations.count()
-    approved_listings = accommodations.filter(is_approved=True).count()
-    pending_listings = accommodations.filter(is_approved=False).count()
-
-    # Calculate total available rooms manually
-    approved_accommodations = accommodations.filter(is_approved=True)
-    available_rooms = 0
-    for accommodation in approved_accommodations:
-        available_rooms += accommodation.available_rooms
+    # All the stats in one query
+    stats = listings.aggregate(
+        total_listings=Count('pk'),
+        approved_listings=Count('pk', filter=Q(is_approved=True)),
+        pending_listings=Count('pk', filter=Q(is_approved=False)),
+        available_rooms=Coalesce(Sum('available_rooms', filter=Q(is_approved=True)), 0),
+    )
+
+    accommodations = listings.select_related('location', 'landlord__landlordprofile').annotate(
+        pending_photos=Count('images', filter=Q(images__status=AccommodationImage.PENDING))
+    ).order_by('-created_at', '-id')
+    # The listings were counted with the stats above
+    paginator = CountedPaginator(accommodations, DASHBOARD_PAGE_SIZE, stats['total_listings'])
+    page = paginator.get_page(request.GET.get('page'))
+
+    # Views/impressions over the last 30 days, from the daily rollups
+    seen = ListingStatsService.recent(listings).aggregate(
+        recent_views=Coalesce(Sum('views'), 0),
+        recent_impressions=Coalesce(Sum('impressions'), 0),
+    )
+    recent_totals = ListingStatsService.recent_totals([accommodation.pk for accommodation in page])
+    for accommodation in page:
+        totals = recent_totals.get(accommodation.pk, {})
+        accommodation.recent_views = totals.get('views', 0)
+        accommodation.recent_impressions = totals.get('impressions', 0)
 
     return render(request, 'accommodations/landlord_dashboard.html', {
-        'accommodations': accommodations,
-        'total_listings': total_listings,
-        'approved_listings': approved_listings,
-        'pending_listings': pending_listings,
-        'available_rooms': available_rooms,
+        'accommodations': page,
+        'page': page,
+        **stats,
+        **seen,
         'recent_submissions': recent_submissions,
          # banking details to context
         'bank_name': settings.BUSINESS_BANK_NAME,
@@ -232,10 +321,10 @@ def landlord_dashboard(request):
 
 
 @login_required
-@user_passes_test(is_landlord, login_url='/admin/login/')
+@landlord_required
 def accommodation_create(request):
     # Check if user is a landlord
-    if not request.user.groups.filter(name='Landlords').exists():
+    if request.user_role != LANDLORD:
         messages.error(request, 'You need a landlord account to list accommodations.')
         return redirect('accommodation_list')
 
@@ -253,21 +342,19 @@ def accommodation_create(request):
             )
             accommodation.save()
 
-            # Handle image uploads
-            images = []
+            # Only store the raw uploads here; validation, resizing and primary
+            # image selection run in the background (tasks.process_image)
             for i in range(1, 6):
                 image_field = f'image_{i}'
                 if image_field in request.FILES:
-                    is_primary = (i == 1)  # First image is primary
-                    accommodation_image = AccommodationImage(
+                    AccommodationImage.objects.create(
                         accommodation=accommodation,
                         image=request.FILES[image_field],
-                        is_primary=is_primary
+                        is_primary=(i == 1),  # First image is primary
+                        status=AccommodationImage.PENDING,
                     )
-                    accommodation_image.save()
-                    images.append(accommodation_image)
 
-            messages.success(request, 'Accommodation created successfully! It will be visible after approval.')
+            messages.success(request, 'Accommodation created successfully! Your photos are being processed. It will be visible after approval.')
             return redirect('landlord_dashboard')
         else:
             messages.error(request, 'Please correct the errors below.')
@@ -315,7 +402,7 @@ def accommodation_delete(request, pk):
 @login_required
 def landlord_profile_update(request):
     """Update landlord profile including phone number"""
-    if not request.user.groups.filter(name='Landlords').exists():
+    if request.user_role != LANDLORD:
         messages.error(request, 'You need a landlord account to access this page.')
         return redirect('accommodation_list')
 
@@ -349,46 +436,84 @@ def landlord_profile_update(request):
     })
 
 
-def terms_and_conditions(request):
-    content = get_object_or_404(SiteContent, content_type='terms', is_active=True)
-    return render(request, 'accommodations/site_content.html', {
+SITE_CONTENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _get_site_content(content_type):
+    """Active SiteContent as a plain dict, cached until the admin saves it"""
+    return cached_query(
+        f'sitecontent:{content_type}', SITE_CONTENT_CACHE_TIMEOUT,
+        lambda: SiteContent.objects.filter(content_type=content_type, is_active=True)
+        .values('content_type', 'title', 'content', 'last_updated').first(),
+        tags=[f'sitecontent:{content_type}'],
+    )
+
+
+def _site_content_etag(request, content_type):
+    content = _get_site_content(content_type)
+    who = viewer(request)
+    if content is None or who is None:
+        return None
+    # Logged-in pages differ per user (header), so they get their own validator
+    return f'{content_type}-{content["last_updated"].timestamp():.6f}-{who}'
+
+
+def _site_content_last_modified(request, content_type):
+    content = _get_site_content(content_type)
+    if content is None or viewer(request) != 'public':
+        return None
+    return content['last_updated']
+
+
+@condition(etag_func=_site_content_etag, last_modified_func=_site_content_last_modified)
+def site_content_page(request, content_type):
+    content = _get_site_content(content_type)
+    if content is None:
+        raise Http404("No SiteContent matches the given query.")
+    context = {
         'content': content,
-        'title': content.title
-    })
+        'title': content['title'],
+    }
+
+    if viewer(request) == 'public':
+        # Anonymous HTML is identical for everyone, so serve it pre-rendered
+        html = cached_query(
+            f'sitecontent:html:{content_type}:{content["last_updated"].timestamp():.6f}',
+            SITE_CONTENT_CACHE_TIMEOUT,
+            lambda: render_to_string('accommodations/site_content.html', context, request),
+            tags=[f'sitecontent:{content_type}'],
+        )
+        response = HttpResponse(html)
+        patch_cache_control(response, public=True, max_age=0, must_revalidate=True)
+    else:
+        response = render(request, 'accommodations/site_content.html', context)
+        patch_cache_control(response, private=True, max_age=0, must_revalidate=True)
+    return response
+
+
+def terms_and_conditions(request):
+    return site_content_page(request, 'terms')
 
 def privacy_policy(request):
-    content = get_object_or_404(SiteContent, content_type='privacy', is_active=True)
-    return render(request, 'accommodations/site_content.html', {
-        'content': content,
-        'title': content.title
-    })
+    return site_content_page(request, 'privacy')
 
 def about_us(request):
-    content = get_object_or_404(SiteContent, content_type='about', is_active=True)
-    return render(request, 'accommodations/site_content.html', {
-        'content': content,
-        'title': content.title
-    })
+    return site_content_page(request, 'about')
 
 def safety_guidelines(request):
-    content = get_object_or_404(SiteContent, content_type='safety', is_active=True)
-    return render(request, 'accommodations/site_content.html', {
-        'content': content,
-        'title': content.title
-    })
-
+    return site_content_page(request, 'safety')
 
 
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 import os
-from .services.email_service import EmailSubmissionService
 from .forms import PDFSubmissionForm
 
 @login_required
 def pdf_submission(request):
     """
-    Handle PDF submissions via email with history tracking
+    Store a PDF submission and email it from the background worker
+    (tasks.deliver_submission), so the request never waits on SMTP
     """
     if request.method == 'POST':
         form = PDFSubmissionForm(request.POST, request.FILES)
@@ -397,57 +522,48 @@ def pdf_submission(request):
             message = form.cleaned_data['message']
             
             try:
-                # Send email with PDF attachment
-                success = EmailSubmissionService.send_pdf_submission(
-                    user=request.user,
-                    pdf_file=pdf_file,
-                    message=message
-                )
-                
-                if success:
-                    # Log submission history
-                    SubmissionHistory.objects.create(
-                        landlord=request.user,
-                        filename=pdf_file.name,
-                        file_size=pdf_file.size,
-                        message=message or '',
-                        status='sent'
-                    )
-                    messages.success(
-                        request, 
-                        '✅ Proof of payment submitted successfully! We have received your document via email.'
-                    )
-                else:
-                    # Track failed attempts too
-                    SubmissionHistory.objects.create(
+                # Log submission history; the worker moves it to sent/failed
+                with transaction.atomic():
+                    submission = SubmissionHistory.objects.create(
                         landlord=request.user,
                         filename=pdf_file.name,
                         file_size=pdf_file.size,
                         message=message or '',
-                        status='failed'
-                    )
-                    messages.error(
-                        request,
-                        '❌ Failed to submit document. Please try again or contact support.'
+                        file=pdf_file,
+                        status=SubmissionHistory.PENDING,
                     )
-                    
-            except Exception as e:
-                # Track errors too
-                SubmissionHistory.objects.create(
-                    landlord=request.user,
-                    filename=pdf_file.name if pdf_file in locals() else 'unknown',
-                    file_size=pdf_file.size if 'pdf_file' in locals() else 0,
-                    message=message or '',
-                    status='failed'
-                )
-                messages.error(
-                    request,
-                    f'❌ Error submitting document: {str(e)}'
-                )
-            
+            except (OSError, DatabaseError):
+                logger.exception(f"Could not store proof of payment from user {request.user.pk}")
+                messages.error(request, '❌ We could not save your document. Please try again.')
+                return redirect('landlord_dashboard')
+
+            # robust: if queueing fails the submission is still stored, and
+            # tasks.retry_submissions queues it within a few minutes
+            transaction.on_commit(
+                lambda: async_task('accommodations.tasks.deliver_submission', submission.pk),
+                robust=True,
+            )
+            messages.success(
+                request, 
+                '✅ Proof of payment received! It will be emailed to our team shortly - you can follow its status below.'
+            )
             return redirect('landlord_dashboard')
     
     # If GET request or form invalid, show error
     messages.error(request, 'Please select a valid PDF file to submit.')
     return redirect('landlord_dashboard')
 
+
+def _sitemap_response(rendered):
+    response = HttpResponse(rendered['content'], content_type='application/xml')
+    response['X-Robots-Tag'] = 'noindex, noodp, noarchive'
+    if rendered['last_modified']:
+        response['Last-Modified'] = rendered['last_modified']
+    return response
+
+def sitemap_index(request, sitemaps):
+    """Sitemap index, one entry per section page. Cached until a section changes"""
+    return _sitemap_response(SitemapService.render_index(request, sitemaps, 'sitemap_section'))
+
+def sitemap_section(request, sitemaps, section):
+    return _sitemap_response(SitemapService.render_section(request, sitemaps, section))
@@ -1,3 +1,29 @@
 from django.contrib import admin
+from .models import AreaListingStats, Region, Subregion
 
-# Register your models here.
+
+class SubregionInline(admin.TabularInline):
+    model = Subregion
+    extra = 1
+    prepopulated_fields = {'slug': ('name',)}
+
+
+@admin.register(Region)
+class RegionAdmin(admin.ModelAdmin):
+    list_display = ['name', 'slug']
+    search_fields = ['name']
+    prepopulated_fields = {'slug': ('name',)}
+    inlines = [SubregionInline]
+
+
+@admin.register(AreaListingStats)
+class AreaListingStatsAdmin(admin.ModelAdmin):
+    # Maintained by AreaStatsService; read-only here
+    list_display = ['__str__', 'listing_count', 'min_price', 'median_price', 'updated_at']
+    list_select_related = ['region', 'subregion__region']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
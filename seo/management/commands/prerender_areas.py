@@ -0,0 +1,13 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from seo.services.prerender_service import PrerenderService
+
+
+class Command(BaseCommand):
+    help = "Render every region and subregion page to static files on this host (web processes also do it when they're out of date)"
+
+    def handle(self, *args, **options):
+        count = PrerenderService.render_all()
+        self.stdout.write(self.style.SUCCESS(
+            f'Pre-rendered {count} area pages to {settings.PRERENDER_ROOT}'
+        ))
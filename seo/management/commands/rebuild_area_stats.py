@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from seo.models import AreaListingStats
+from seo.services.area_stats_service import AreaStatsService
+
+
+class Command(BaseCommand):
+    help = 'Recompute the listing count and prices of every region and subregion'
+
+    def handle(self, *args, **options):
+        AreaStatsService.refresh_all()
+        self.stdout.write(self.style.SUCCESS(
+            f'Refreshed {AreaListingStats.objects.count()} area stats rows'
+        ))
@@ -0,0 +1,62 @@
+import os
+
+from django.conf import settings
+from django.urls import reverse
+from whitenoise.base import WhiteNoise
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from accommodations.middleware import is_anonymous_visitor
+from .services.prerender_service import PrerenderService
+
+
+class PrerenderedPageMiddleware:
+    """
+    Serves area pages from the files PrerenderService writes, before sessions
+    and the rest of the stack run. The files are the anonymous version of a
+    page, so visitors with a session or pending messages get the normal view,
+    as does any URL without a file and every area URL while this host's
+    files are out of date.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix = None
+        # {build directory: WhiteNoise}; only the served build is kept
+        self.pages = {}
+
+    def build_pages(self, build):
+        pages = self.pages.get(build)
+        if pages is None:
+            # autorefresh: look each request up on disk (a few stat calls) rather
+            # than indexing the build when it is first served
+            pages = WhiteNoise(
+                None,
+                autorefresh=True,
+                index_file=True,
+                max_age=settings.PRERENDER_MAX_AGE,
+                allow_all_origins=False,
+            )
+            # The build directory itself, not the `current` symlink, so a request
+            # never mixes files from two builds
+            pages.add_files(os.path.join(settings.PRERENDER_ROOT, build))
+            self.pages = {build: pages}
+        return pages
+
+    def __call__(self, request):
+        if self.prefix is None:
+            # /area/ (region_page is /area/<slug>/); only these URLs have files
+            self.prefix = reverse('region_page', args=['x'])[:-len('x/')]
+        path = request.path_info
+        if (
+            request.method in ('GET', 'HEAD')
+            and path.startswith(self.prefix)
+            and path.endswith('/')
+            and '/.' not in path
+            and is_anonymous_visitor(request)
+        ):
+            build = PrerenderService.served_build()
+            if build is not None:
+                page = self.build_pages(build).find_file(path)
+                if page is not None:
+                    return WhiteNoiseMiddleware.serve(page, request)
+        return self.get_response(request)
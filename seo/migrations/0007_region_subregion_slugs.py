@@ -0,0 +1,85 @@
+# Generated by Django 5.2.7 on 2026-10-18 11:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from seo.slugs import unique_slug
+
+
+def fill_slugs(apps, schema_editor):
+    Region = apps.get_model('seo', 'Region')
+    Subregion = apps.get_model('seo', 'Subregion')
+
+    def claim(name, taken):
+        slug = unique_slug(name, taken.__contains__)
+        taken.add(slug)
+        return slug
+
+    taken = set()
+    for region in Region.objects.order_by('pk'):
+        region.slug = claim(region.name, taken)
+        region.save(update_fields=['slug'])
+
+    taken_per_region = {}
+    for subregion in Subregion.objects.order_by('pk'):
+        subregion.slug = claim(subregion.name, taken_per_region.setdefault(subregion.region_id, set()))
+        subregion.save(update_fields=['slug'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('seo', '0006_alter_subregion_unique_together_remove_region_slug_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AreaListingStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('listing_count', models.PositiveIntegerField(default=0)),
+                ('min_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('median_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Area listing stats',
+            },
+        ),
+        migrations.AddField(
+            model_name='region',
+            name='slug',
+            field=models.SlugField(blank=True, max_length=110, db_index=False, default=''),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='subregion',
+            name='slug',
+            field=models.SlugField(blank=True, max_length=110, default=''),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_slugs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='region',
+            name='slug',
+            field=models.SlugField(blank=True, max_length=110, unique=True),
+        ),
+        migrations.AddConstraint(
+            model_name='subregion',
+            constraint=models.UniqueConstraint(fields=('region', 'slug'), name='seo_subregion_region_slug'),
+        ),
+        migrations.AddField(
+            model_name='arealistingstats',
+            name='region',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='listing_stats', to='seo.region'),
+        ),
+        migrations.AddField(
+            model_name='arealistingstats',
+            name='subregion',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='listing_stats', to='seo.subregion'),
+        ),
+        migrations.AddConstraint(
+            model_name='arealistingstats',
+            constraint=models.CheckConstraint(condition=models.Q(models.Q(('region__isnull', False), ('subregion__isnull', True)), models.Q(('region__isnull', True), ('subregion__isnull', False)), _connector='OR'), name='seo_areastats_one_area'),
+        ),
+    ]
@@ -1,7 +1,15 @@
 from django.db import models
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from django.urls import reverse
+from accommodations.models import Accommodation, Location
+from accommodations.services.cache_service import invalidate_on_commit, tags_invalidated
+from .slugs import unique_slug
 
 class Region(models.Model):
     name = models.CharField(max_length=100, unique=True)
+    # URL key, filled from the name (see region_page)
+    slug = models.SlugField(max_length=110, unique=True, blank=True)
 
     class Meta:
         verbose_name = "Main Region / Town"
@@ -10,14 +18,155 @@ class Region(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            others = Region.objects.exclude(pk=self.pk)
+            self.slug = unique_slug(self.name, lambda slug: others.filter(slug=slug).exists())
+        super().save(*args, **kwargs)
+
+    def get_absolute_url(self):
+        return reverse("region_page", args=[self.slug])
+
 
 class Subregion(models.Model):
     region = models.ForeignKey(Region, on_delete=models.CASCADE, related_name="subregions")
     name = models.CharField(max_length=100)
+    slug = models.SlugField(max_length=110, blank=True)
 
     class Meta:
         verbose_name = "Area / Neighborhood"
-       
+        constraints = [
+            models.UniqueConstraint(fields=['region', 'slug'], name='seo_subregion_region_slug'),
+        ]
+
 
     def __str__(self):
         return f"{self.name} ({self.region.name})"
+
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            others = Subregion.objects.filter(region_id=self.region_id).exclude(pk=self.pk)
+            self.slug = unique_slug(self.name, lambda slug: others.filter(slug=slug).exists())
+        super().save(*args, **kwargs)
+
+    def get_absolute_url(self):
+        return reverse("subregion_page", args=[self.region.slug, self.slug])
+
+
+class AreaListingStats(models.Model):
+    """
+    Available listings and prices per region or subregion, kept current by
+    AreaStatsService whenever a listing in the area changes, so area pages
+    never aggregate on request. Exactly one of region/subregion is set.
+    """
+    region = models.OneToOneField(Region, null=True, blank=True, on_delete=models.CASCADE, related_name="listing_stats")
+    subregion = models.OneToOneField(Subregion, null=True, blank=True, on_delete=models.CASCADE, related_name="listing_stats")
+    listing_count = models.PositiveIntegerField(default=0)
+    min_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    median_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Area listing stats"
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(region__isnull=False, subregion__isnull=True)
+                | models.Q(region__isnull=True, subregion__isnull=False),
+                name='seo_areastats_one_area',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.subregion or self.region}: {self.listing_count} listings"
+
+
+@receiver(post_save, sender=Region)
+@receiver(post_delete, sender=Region)
+@receiver(post_save, sender=Subregion)
+@receiver(post_delete, sender=Subregion)
+def invalidate_areas(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    invalidate_on_commit('areas')
+
+@receiver(post_save, sender=Region)
+@receiver(post_delete, sender=Region)
+@receiver(post_save, sender=Subregion)
+@receiver(post_delete, sender=Subregion)
+def suggest_area_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    from accommodations.services.suggest_service import AREA, SuggestService
+    name = None if kwargs.get('signal') is post_delete else instance.name
+    SuggestService.publish((sender._meta.model_name, instance.pk), AREA, name)
+
+
+# Area stats: refresh only the areas a change can affect
+def _area_state(instance):
+    # Read straight from __dict__ so deferred fields aren't loaded; None means "unknown"
+    values = instance.__dict__
+    available = values.get('available_rooms')
+    return (
+        values.get('location_id'),
+        values.get('price'),
+        values.get('is_approved'),
+        None if available is None else available > 0,
+    )
+
+@receiver(post_init, sender=Accommodation)
+def remember_area_state(sender, instance, **kwargs):
+    instance._saved_area_state = _area_state(instance)
+
+@receiver(post_save, sender=Accommodation)
+def accommodation_area_changed(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    from .services.area_stats_service import AreaStatsService
+    previous = instance._saved_area_state
+    current = _area_state(instance)
+    if created or previous != current:
+        AreaStatsService.refresh_on_commit(location_ids={previous[0], current[0]} - {None})
+    instance._saved_area_state = current
+
+@receiver(post_delete, sender=Accommodation)
+def accommodation_area_removed(sender, instance, **kwargs):
+    from .services.area_stats_service import AreaStatsService
+    AreaStatsService.refresh_on_commit(location_ids=[instance.location_id])
+
+@receiver(post_init, sender=Location)
+def remember_location_subregion(sender, instance, **kwargs):
+    instance._saved_subregion_id = instance.__dict__.get('subregion_id')
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def location_area_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    from .services.area_stats_service import AreaStatsService
+    subregion_ids = {instance._saved_subregion_id, instance.subregion_id} - {None}
+    if subregion_ids and (kwargs.get('signal') is post_delete or instance._saved_subregion_id != instance.subregion_id):
+        AreaStatsService.refresh_on_commit(subregion_ids=subregion_ids)
+    instance._saved_subregion_id = instance.subregion_id
+
+@receiver(post_init, sender=Subregion)
+def remember_subregion_region(sender, instance, **kwargs):
+    instance._saved_region_id = instance.__dict__.get('region_id')
+
+@receiver(post_save, sender=Subregion)
+def subregion_area_changed(sender, instance, raw=False, **kwargs):
+    if raw or instance._saved_region_id == instance.region_id:
+        return
+    from .services.area_stats_service import AreaStatsService
+    AreaStatsService.refresh_on_commit(
+        subregion_ids=[instance.pk],
+        region_ids={instance._saved_region_id} - {None},
+    )
+    instance._saved_region_id = instance.region_id
+
+
+@receiver(tags_invalidated)
+def rebuild_area_pages(sender, tags, **kwargs):
+    from .views import AREA_PAGE_TAGS
+    if tags.intersection(AREA_PAGE_TAGS):
+        from .services.prerender_service import PrerenderService
+        PrerenderService.schedule_rebuild()
@@ -0,0 +1,79 @@
+from django.db import transaction
+from django.db.models import Count, Min
+
+from accommodations.models import Accommodation, Location
+from accommodations.services.cache_service import invalidate_tags
+from ..models import AreaListingStats, Region, Subregion
+
+
+class AreaStatsService:
+    """
+    Maintains AreaListingStats. Each refresh recomputes only the areas a
+    change touched (a subregion and its region) with a couple of indexed
+    queries; area pages just read the stored row.
+    """
+
+    @staticmethod
+    def compute(queryset):
+        """Count, min and median price of the public listings in queryset"""
+        queryset = queryset.public()
+        totals = queryset.aggregate(listing_count=Count('pk'), min_price=Min('price'))
+        count = totals['listing_count']
+        median = None
+        if count:
+            # Middle one or two prices, fetched with an OFFSET instead of loading every price
+            middle = count // 2
+            start = middle - 1 if count % 2 == 0 else middle
+            prices = list(queryset.order_by('price').values_list('price', flat=True)[start:middle + 1])
+            median = sum(prices) / len(prices)
+        return {'listing_count': count, 'min_price': totals['min_price'], 'median_price': median}
+
+    @staticmethod
+    def refresh_subregions(subregion_ids, region_ids=()):
+        region_ids = set(region_ids)
+        for subregion in Subregion.objects.filter(pk__in=subregion_ids):
+            stats = AreaStatsService.compute(
+                Accommodation.objects.filter(location__subregion=subregion)
+            )
+            AreaListingStats.objects.update_or_create(subregion=subregion, defaults=stats)
+            region_ids.add(subregion.region_id)
+        AreaStatsService.refresh_regions(region_ids)
+
+    @staticmethod
+    def refresh_regions(region_ids):
+        for region_id in region_ids:
+            stats = AreaStatsService.compute(
+                Accommodation.objects.filter(location__subregion__region_id=region_id)
+            )
+            AreaListingStats.objects.update_or_create(region_id=region_id, defaults=stats)
+        if region_ids:
+            invalidate_tags('areas')
+
+    @staticmethod
+    def refresh_for_locations(location_ids):
+        subregion_ids = set(
+            Location.objects.filter(pk__in=location_ids, subregion__isnull=False)
+            .values_list('subregion_id', flat=True)
+        )
+        if subregion_ids:
+            AreaStatsService.refresh_subregions(subregion_ids)
+
+    @staticmethod
+    def refresh_on_commit(location_ids=(), subregion_ids=(), region_ids=()):
+        """Refresh once the current transaction commits (listing saves call this)"""
+        location_ids, subregion_ids, region_ids = set(location_ids), set(subregion_ids), set(region_ids)
+
+        def refresh():
+            if location_ids:
+                AreaStatsService.refresh_for_locations(location_ids)
+            if subregion_ids or region_ids:
+                AreaStatsService.refresh_subregions(subregion_ids, region_ids)
+
+        transaction.on_commit(refresh)
+
+    @staticmethod
+    def refresh_all():
+        AreaStatsService.refresh_subregions(
+            Subregion.objects.values_list('pk', flat=True),
+            region_ids=Region.objects.values_list('pk', flat=True),
+        )
@@ -0,0 +1,222 @@
+import fcntl
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.http import Http404, HttpRequest
+from django.urls import resolve
+from whitenoise.compress import Compressor
+
+from accommodations.services.cache_service import clear_local_cache
+from ..models import Region
+
+logger = logging.getLogger(__name__)
+
+# Changed whenever area pages need rebuilding; every host compares it with its own copy
+GENERATION_KEY = 'seo:prerender:generation'
+# How often a process looks at GENERATION_KEY (one cache read)
+CHECK_INTERVAL = 2.0
+# PRERENDER_ROOT/current is a symlink to the served build, .build-<generation>-<random>
+CURRENT = 'current'
+BUILD_PREFIX = '.build-'
+LINK_PREFIX = '.current-'
+
+
+class PrerenderService:
+    """
+    Renders every region/subregion page as <url>/index.html (+ .gz/.br),
+    which PrerenderedPageMiddleware serves to anonymous visitors. Pages come
+    from the real views, so they match what the dynamic fallback returns.
+
+    The files live on each web host's own disk, so each host builds them
+    itself: changes only start a new generation in the shared cache, and a
+    web process that sees its host's copy is out of date rebuilds it in a
+    background thread (one process per host, under a file lock). Until then
+    the pages are served dynamically. A build goes into a fresh directory
+    and replaces the old one by swapping the `current` symlink in one rename.
+
+    Listing edits start a new generation too (area pages show listings), so
+    a host rebuilds at most once per PRERENDER_MAX_AGE; in between, changed
+    pages come from the views.
+    """
+
+    _generation = None
+    _checked_at = 0.0
+    _builder = None
+    _builder_lock = threading.Lock()
+
+    @staticmethod
+    def area_urls():
+        for region in Region.objects.prefetch_related('subregions').order_by('name'):
+            yield region.get_absolute_url()
+            for subregion in sorted(region.subregions.all(), key=lambda sub: sub.name):
+                yield subregion.get_absolute_url()
+
+    @staticmethod
+    def render(url):
+        """HTML an anonymous visitor gets for url, or None if it isn't a plain 200 page"""
+        request = HttpRequest()
+        request.method = 'GET'
+        request.path = request.path_info = url
+        request.user = AnonymousUser()
+        match = resolve(url)
+        try:
+            response = match.func(request, *match.args, **match.kwargs)
+        except Http404:
+            return None
+        if response.status_code != 200:
+            return None
+        return response.content
+
+    @staticmethod
+    def write(path, content):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+        compressor = Compressor(quiet=True)
+        path.with_name(path.name + '.gz').write_bytes(compressor.compress_gzip(content))
+        if compressor.use_brotli:
+            path.with_name(path.name + '.br').write_bytes(compressor.compress_brotli(content))
+
+    @staticmethod
+    def generation():
+        """The generation area pages should be at, starting one if the cache has none"""
+        generation = cache.get(GENERATION_KEY)
+        if generation is None:
+            cache.add(GENERATION_KEY, uuid.uuid4().hex, None)
+            generation = cache.get(GENERATION_KEY)
+        return generation
+
+    @staticmethod
+    def schedule_rebuild():
+        """Start a new generation once the current transaction commits"""
+        transaction.on_commit(lambda: cache.set(GENERATION_KEY, uuid.uuid4().hex, None))
+
+    @staticmethod
+    def current_build(root=None):
+        """Directory name the `current` symlink points at, or None"""
+        try:
+            return os.readlink(Path(root or settings.PRERENDER_ROOT) / CURRENT)
+        except OSError:
+            return None
+
+    @staticmethod
+    def build_generation(build):
+        return build[len(BUILD_PREFIX):].rsplit('-', 1)[0] if build else None
+
+    @staticmethod
+    def build_age(build, root=None):
+        """Seconds since build was written, None if there is no build"""
+        try:
+            return time.time() - os.stat(Path(root or settings.PRERENDER_ROOT) / build).st_mtime
+        except (OSError, TypeError):
+            return None
+
+    @staticmethod
+    def served_build():
+        """
+        Build directory to serve pages from, or None while this host's copy is
+        missing or out of date (a rebuild is started when noticed).
+        """
+        now = time.monotonic()
+        if PrerenderService._generation is None or now - PrerenderService._checked_at >= CHECK_INTERVAL:
+            PrerenderService._checked_at = now
+            PrerenderService._generation = PrerenderService.generation()
+            current = PrerenderService.current_build()
+            if PrerenderService.build_generation(current) != PrerenderService._generation:
+                age = PrerenderService.build_age(current)
+                if age is None or age >= settings.PRERENDER_MAX_AGE:
+                    PrerenderService.rebuild_in_background()
+        build = PrerenderService.current_build()
+        if PrerenderService.build_generation(build) != PrerenderService._generation:
+            return None
+        return build
+
+    @staticmethod
+    def rebuild_in_background():
+        if settings.TESTING:
+            # Tests call render_all() themselves
+            return
+        with PrerenderService._builder_lock:
+            if PrerenderService._builder is not None and PrerenderService._builder.is_alive():
+                return
+            PrerenderService._builder = threading.Thread(
+                target=PrerenderService._rebuild, name='prerender-areas', daemon=True,
+            )
+            PrerenderService._builder.start()
+
+    @staticmethod
+    def _rebuild():
+        try:
+            count = PrerenderService.render_all(wait=False)
+            if count is not None:
+                logger.info(f"Pre-rendered {count} area pages")
+        except Exception:
+            logger.exception("Could not pre-render area pages")
+        finally:
+            connections.close_all()
+
+    @staticmethod
+    def render_all(wait=True):
+        """
+        Build the current generation and swap it in; returns the page count.
+        With wait=False, returns None without building when another process
+        on this host is already at it or has just built this generation.
+        """
+        root = Path(settings.PRERENDER_ROOT)
+        root.mkdir(parents=True, exist_ok=True)
+        with open(root / '.lock', 'w') as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return None
+            generation = PrerenderService.generation()
+            if not wait and PrerenderService.build_generation(PrerenderService.current_build(root)) == generation:
+                return None
+
+            # Render from the shared cache, not from this process's few-seconds-old L1
+            clear_local_cache()
+            # Dot-directories are never served (see PrerenderedPageMiddleware)
+            build = Path(tempfile.mkdtemp(prefix=f'{BUILD_PREFIX}{generation}-', dir=root))
+            try:
+                count = 0
+                for url in PrerenderService.area_urls():
+                    content = PrerenderService.render(url)
+                    if content is not None:
+                        PrerenderService.write(build / url.strip('/') / 'index.html', content)
+                        count += 1
+                previous = PrerenderService._swap(root, build)
+            except BaseException:
+                shutil.rmtree(build, ignore_errors=True)
+                raise
+            PrerenderService._sweep(root, keep={build.name, previous})
+        return count
+
+    @staticmethod
+    def _swap(root, build):
+        """Point `current` at build in one atomic rename; returns the previous build"""
+        previous = PrerenderService.current_build(root)
+        link = root / f'{LINK_PREFIX}{uuid.uuid4().hex}'
+        os.symlink(build.name, link)
+        os.replace(link, root / CURRENT)
+        return previous
+
+    @staticmethod
+    def _sweep(root, keep):
+        # The previous build stays for requests that resolved `current` just before
+        # the swap; older ones and leftovers of interrupted builds go
+        for entry in root.iterdir():
+            if entry.name in keep:
+                continue
+            if entry.name.startswith(BUILD_PREFIX):
+                shutil.rmtree(entry, ignore_errors=True)
+            elif entry.name.startswith(LINK_PREFIX):
+                entry.unlink(missing_ok=True)
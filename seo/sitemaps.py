@@ -4,20 +4,22 @@ from .models import Region, Subregion
 class RegionSitemap(Sitemap):
     changefreq = "weekly"
     priority = 0.9
+    cache_tags = ['areas']
 
     def items(self):
-        return Region.objects.all()
+        return Region.objects.order_by("name")
 
     def location(self, obj):
-        return f"/area/{obj.name}/"
+        return obj.get_absolute_url()
 
 
 class SubregionSitemap(Sitemap):
     changefreq = "weekly"
     priority = 0.8
+    cache_tags = ['areas']
 
     def items(self):
-        return Subregion.objects.select_related("region").all()
+        return Subregion.objects.select_related("region").order_by("region__name", "name")
 
     def location(self, obj):
-        return f"/area/{obj.region.name}/{obj.name}/"
+        return obj.get_absolute_url()
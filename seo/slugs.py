@@ -0,0 +1,17 @@
+from django.utils.text import slugify
+
+# Room for a "-N" suffix in the 110-character slug fields
+BASE_LENGTH = 100
+
+
+def unique_slug(name, is_taken):
+    """
+    slugify(name), or 'area' if nothing is left of it, with -2, -3, ...
+    appended until is_taken(slug) is false. Used by Region/Subregion.save()
+    and the migration that first filled the slugs, so both agree.
+    """
+    base = slugify(name)[:BASE_LENGTH].strip('-') or 'area'
+    slug, n = base, 2
+    while is_taken(slug):
+        slug, n = f'{base}-{n}', n + 1
+    return slug
@@ -1,3 +1,353 @@
-from django.test import TestCase
+import fcntl
+import importlib
+import os
+import shutil
+import tempfile
+import time
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from accommodations.services.cache_service import clear_local_cache
+from accommodations.tests.utils import make_landlord, make_listing, make_location
+from .models import AreaListingStats, Region, Subregion
+from .services.area_stats_service import AreaStatsService
+from .services.prerender_service import CURRENT, GENERATION_KEY, PrerenderService
+from .slugs import unique_slug
+
+
+class PrerenderTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root)
+        settings_override = override_settings(PRERENDER_ROOT=self.root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        PrerenderService._generation = None
+        self.addCleanup(setattr, PrerenderService, '_generation', None)
+        self.region = Region.objects.create(name='Empangeni')
+        Subregion.objects.create(region=self.region, name='Richem')
+
+    def builds(self):
+        return sorted(entry.name for entry in self.root.iterdir() if entry.name.startswith('.build-'))
+
+
+class RenderAllTests(PrerenderTestCase):
+
+    def test_builds_every_area_page_and_points_current_at_it(self):
+        self.assertEqual(PrerenderService.render_all(), 2)
+
+        build = PrerenderService.current_build()
+        self.assertEqual(PrerenderService.build_generation(build), cache.get(GENERATION_KEY))
+        self.assertTrue((self.root / CURRENT).is_symlink())
+        page = self.root / CURRENT / 'area' / 'empangeni' / 'index.html'
+        self.assertIn(b'Empangeni', page.read_bytes())
+        self.assertTrue(page.with_name('index.html.gz').exists())
+        self.assertTrue((self.root / CURRENT / 'area' / 'empangeni' / 'richem' / 'index.html').exists())
+
+    def test_rebuild_swaps_current_and_sweeps_old_builds(self):
+        PrerenderService.render_all()
+        first = PrerenderService.current_build()
+        # Leftovers of a build that died half-way
+        (self.root / '.build-dead-xyz').mkdir()
+        os.symlink('.build-dead-xyz', self.root / '.current-dead')
+
+        PrerenderService.schedule_rebuild()
+        PrerenderService.render_all()
+        second = PrerenderService.current_build()
+        self.assertNotEqual(first, second)
+        # The previous build stays for requests already reading it
+        self.assertEqual(self.builds(), sorted([first, second]))
+
+        PrerenderService.render_all()
+        third = PrerenderService.current_build()
+        self.assertEqual(self.builds(), sorted([second, third]))
+        self.assertEqual(
+            sorted(entry.name for entry in self.root.iterdir() if not entry.name.startswith('.build-')),
+            ['.lock', CURRENT],
+        )
+
+    def test_failed_build_leaves_current_alone(self):
+        PrerenderService.render_all()
+        build = PrerenderService.current_build()
+
+        with mock.patch.object(PrerenderService, 'render', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                PrerenderService.render_all()
+        self.assertEqual(PrerenderService.current_build(), build)
+        self.assertEqual(self.builds(), [build])
+
+    def test_background_build_skips_a_current_tree(self):
+        PrerenderService.render_all()
+        build = PrerenderService.current_build()
+
+        self.assertIsNone(PrerenderService.render_all(wait=False))
+        self.assertEqual(PrerenderService.current_build(), build)
+
+    def test_background_build_skips_while_another_process_builds(self):
+        self.root.mkdir(exist_ok=True)
+        with open(self.root / '.lock', 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self.assertIsNone(PrerenderService.render_all(wait=False))
+        self.assertIsNone(PrerenderService.current_build())
+
+    def test_area_changes_start_a_new_generation(self):
+        generation = PrerenderService.generation()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Subregion.objects.create(region=self.region, name='Nseleni')
+        self.assertNotEqual(PrerenderService.generation(), generation)
+
+
+class PrerenderedPageMiddlewareTests(PrerenderTestCase):
+
+    def setUp(self):
+        super().setUp()
+        PrerenderService.render_all()
+        # Mark the file so responses served from it can be told apart from the view's
+        page = self.root / CURRENT / 'area' / 'empangeni' / 'index.html'
+        page.write_bytes(b'pre-rendered')
+        page.with_name('index.html.gz').unlink()
+        page.with_name('index.html.br').unlink(missing_ok=True)
+
+    def get(self, url='/area/empangeni/', **headers):
+        with mock.patch.object(PrerenderService, 'rebuild_in_background') as rebuild:
+            response = self.client.get(url, **headers)
+        return response, rebuild
+
+    def test_serves_current_files_to_anonymous_visitors(self):
+        response, rebuild = self.get()
+        self.assertEqual(b''.join(response.streaming_content), b'pre-rendered')
+        rebuild.assert_not_called()
+
+    def age_build(self, seconds):
+        build = self.root / PrerenderService.current_build()
+        then = time.time() - seconds
+        os.utime(build, (then, then))
+
+    def test_falls_back_to_the_view_and_rebuilds_when_out_of_date(self):
+        self.age_build(settings.PRERENDER_MAX_AGE)
+        with self.captureOnCommitCallbacks(execute=True):
+            PrerenderService.schedule_rebuild()
+
+        response, rebuild = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Empangeni', response.content)
+        rebuild.assert_called_once_with()
+
+    def test_rebuilds_at_most_once_per_max_age(self):
+        self.age_build(settings.PRERENDER_MAX_AGE - 10)
+        with self.captureOnCommitCallbacks(execute=True):
+            PrerenderService.schedule_rebuild()
+
+        # Out of date, but only just built: the view serves the page for now
+        response, rebuild = self.get()
+        self.assertIn(b'Empangeni', response.content)
+        rebuild.assert_not_called()
+
+        self.age_build(settings.PRERENDER_MAX_AGE)
+        PrerenderService._generation = None
+        response, rebuild = self.get()
+        rebuild.assert_called_once_with()
+
+    def test_listing_edits_start_no_build_threads_in_tests(self):
+        self.age_build(settings.PRERENDER_MAX_AGE)
+        location = make_location()
+        location.subregion = self.region.subregions.get()
+        location.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            make_listing(make_landlord(), location)
+
+        with mock.patch('seo.services.prerender_service.threading.Thread') as thread:
+            response = self.client.get('/area/empangeni/')
+        self.assertIn(b'Empangeni', response.content)
+        thread.assert_not_called()
+        self.assertIsNone(PrerenderService._builder)
+
+    @override_settings(TESTING=False)
+    def test_rebuilds_run_in_one_background_thread(self):
+        with mock.patch('seo.services.prerender_service.threading.Thread') as thread:
+            thread.return_value.is_alive.return_value = True
+            self.addCleanup(setattr, PrerenderService, '_builder', None)
+            PrerenderService.rebuild_in_background()
+            PrerenderService.rebuild_in_background()
+        thread.assert_called_once_with(target=PrerenderService._rebuild, name='prerender-areas', daemon=True)
+        thread.return_value.start.assert_called_once_with()
+
+    def test_visitors_with_a_session_get_the_view(self):
+        self.client.cookies['sessionid'] = 'abc'
+        response, rebuild = self.get()
+        self.assertIn(b'Empangeni', response.content)
+
+    def test_only_area_urls_are_looked_up(self):
+        (self.root / CURRENT / 'about').mkdir()
+        (self.root / CURRENT / 'about' / 'index.html').write_bytes(b'pre-rendered')
+        with mock.patch.object(PrerenderService, 'served_build') as served_build:
+            self.client.get('/about/')
+        served_build.assert_not_called()
+
+
+class UniqueSlugTests(SimpleTestCase):
+
+    def test_suffixes_until_free(self):
+        self.assertEqual(unique_slug('St. Lucia', set().__contains__), 'st-lucia')
+        self.assertEqual(unique_slug('St Lucia', {'st-lucia', 'st-lucia-2'}.__contains__), 'st-lucia-3')
+
+    def test_names_without_slug_characters(self):
+        self.assertEqual(unique_slug('???', set().__contains__), 'area')
+        self.assertEqual(unique_slug('x' * 100 + ' y', set().__contains__), 'x' * 100)
+
+
+class AreaSlugTests(TestCase):
+
+    def test_colliding_region_names_get_suffixes(self):
+        first = Region.objects.create(name='St. Lucia')
+        second = Region.objects.create(name='St Lucia')
+        self.assertEqual((first.slug, second.slug), ('st-lucia', 'st-lucia-2'))
+        # Saving again keeps the slug
+        second.save()
+        self.assertEqual(Region.objects.get(pk=second.pk).slug, 'st-lucia-2')
+
+    def test_subregion_slugs_are_unique_per_region(self):
+        empangeni = Region.objects.create(name='Empangeni')
+        richards_bay = Region.objects.create(name='Richards Bay')
+        subregions = [
+            Subregion.objects.create(region=empangeni, name='Central'),
+            Subregion.objects.create(region=empangeni, name='Central!'),
+            Subregion.objects.create(region=richards_bay, name='Central'),
+        ]
+        self.assertEqual([sub.slug for sub in subregions], ['central', 'central-2', 'central'])
+
+    def test_migration_fills_slugs_the_same_way(self):
+        migration = importlib.import_module('seo.migrations.0007_region_subregion_slugs')
+        region = Region.objects.create(name='Empangeni', slug='old')
+        Region.objects.bulk_create([Region(name='St. Lucia', slug='old-2'), Region(name='St Lucia', slug='old-3')])
+        Subregion.objects.bulk_create([
+            Subregion(region=region, name='Central', slug='old'), Subregion(region=region, name='Central!', slug='old-2'),
+        ])
+
+        migration.fill_slugs(apps, None)
+        self.assertEqual(
+            list(Region.objects.order_by('pk').values_list('slug', flat=True)),
+            ['empangeni', 'st-lucia', 'st-lucia-2'],
+        )
+        self.assertEqual(
+            list(Subregion.objects.order_by('pk').values_list('slug', flat=True)), ['central', 'central-2'],
+        )
+
+
+class AreaTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        self.region = Region.objects.create(name='Empangeni')
+        self.subregion = Subregion.objects.create(region=self.region, name='Richem Park')
+        self.other = Subregion.objects.create(region=self.region, name='Nseleni')
+        self.landlord = make_landlord()
+        self.location = make_location('Campus')
+        self.location.subregion = self.subregion
+        self.location.save()
+
+    def add(self, price, location=None, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            return make_listing(self.landlord, location or self.location, price=Decimal(price), **fields)
+
+    def stats(self, **area):
+        stats = AreaListingStats.objects.get(**area)
+        return stats.listing_count, stats.min_price, stats.median_price
+
+
+class AreaStatsServiceTests(AreaTestCase):
+
+    def test_median_of_odd_and_even_counts(self):
+        for price in (1800, 1200, 3000):
+            self.add(price)
+        self.assertEqual(self.stats(subregion=self.subregion), (3, Decimal(1200), Decimal(1800)))
+        self.add(1500)
+        self.assertEqual(self.stats(subregion=self.subregion), (4, Decimal(1200), Decimal(1650)))
+
+    def test_only_public_listings_count(self):
+        self.add(1000, is_approved=False)
+        self.add(1100, available_rooms=0)
+        self.add(2000)
+        self.assertEqual(self.stats(subregion=self.subregion), (1, Decimal(2000), Decimal(2000)))
+
+    def test_regions_cover_their_subregions(self):
+        nseleni = make_location('Nseleni Village')
+        nseleni.subregion = self.other
+        nseleni.save()
+        self.add(1000)
+        self.add(2000, location=nseleni)
+        self.add(4000, location=nseleni)
+        self.assertEqual(self.stats(subregion=self.other), (2, Decimal(2000), Decimal(3000)))
+        self.assertEqual(self.stats(region=self.region), (3, Decimal(1000), Decimal(2000)))
+
+    def test_listing_changes_refresh_the_areas(self):
+        listing = self.add(1000)
+        listing.is_approved = False
+        with self.captureOnCommitCallbacks(execute=True):
+            listing.save()
+        self.assertEqual(self.stats(subregion=self.subregion), (0, None, None))
+
+        # Moving the location to another subregion refreshes both
+        listing.is_approved = True
+        with self.captureOnCommitCallbacks(execute=True):
+            listing.save()
+        self.location.subregion = self.other
+        with self.captureOnCommitCallbacks(execute=True):
+            self.location.save()
+        self.assertEqual(self.stats(subregion=self.subregion)[0], 0)
+        self.assertEqual(self.stats(subregion=self.other)[0], 1)
+
+    def test_refresh_all(self):
+        self.add(1000)
+        AreaListingStats.objects.all().delete()
+        AreaStatsService.refresh_all()
+        self.assertEqual(AreaListingStats.objects.count(), 3)
+        self.assertEqual(self.stats(region=self.region)[0], 1)
+
+
+class AreaPageTests(AreaTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # Only the views here, not the pre-rendered copies
+        patcher = mock.patch.object(PrerenderService, 'served_build', return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_pages_show_the_stored_stats(self):
+        self.add(1500)
+        response = self.client.get('/area/empangeni/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['stats'], AreaListingStats.objects.get(region=self.region))
+        self.assertContains(response, '1 listing from R1500')
+
+        response = self.client.get('/area/empangeni/richem-park/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['subregion'], self.subregion)
+
+    def test_old_name_urls_redirect_permanently(self):
+        for old, new in (
+            ('/area/Empangeni/', '/area/empangeni/'),
+            ('/area/Empangeni/Richem%20Park/', '/area/empangeni/richem-park/'),
+            ('/area/empangeni/RICHEM PARK/', '/area/empangeni/richem-park/'),
+        ):
+            with self.subTest(url=old):
+                response = self.client.get(old)
+                self.assertEqual(response.status_code, 301)
+                self.assertEqual(response['Location'], new)
+
+    def test_unknown_areas_are_404s(self):
+        for url in ('/area/eshowe/', '/area/empangeni/eshowe/', '/area/eshowe/richem-park/'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
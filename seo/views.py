@@ -1,17 +1,68 @@
-from django.shortcuts import render, get_object_or_404
-from .models import Region
-from django.shortcuts import render, get_object_or_404
+from django.db.models import Prefetch
+from django.http import Http404
+from django.shortcuts import redirect, render
+from django.utils.text import slugify
+from accommodations.models import Accommodation, BROWSE_SORTS, DEFAULT_SORT
+from accommodations.services.cache_service import cache_public_page, cached_query
 from .models import Region, Subregion
 
+# Listing cards shown on an area page
+AREA_LISTINGS = 24
+# Everything an area page is built from is cached under these
+AREA_PAGE_TAGS = ('areas', 'browse')
 
-def region_page(request, region_name):
-    region = get_object_or_404(Region, name__iexact=region_name)
-    return render(request, "seo/region_page.html", {"region": region})
 
-def subregion_page(request, region_name, sub_name):
-    region = get_object_or_404(Region, name__iexact=region_name)
-    subregion = get_object_or_404(Subregion, region=region, name__iexact=sub_name)
-    return render(request, "seo/subregion_page.html", {
+def _get_region(region_slug):
+    region = cached_query(
+        f'seo:region:{region_slug}', 3600,
+        lambda: Region.objects.filter(slug=region_slug).select_related('listing_stats').prefetch_related(
+            Prefetch('subregions', Subregion.objects.select_related('listing_stats').order_by('name'))
+        ).first(),
+        tags=['areas'],
+    )
+    if region is None:
+        raise Http404("No Region matches the given query.")
+    return region
+
+
+def _area_listings(key, area_filter):
+    return cached_query(
+        f'seo:listings:{key}', 600,
+        lambda: list(
+            Accommodation.objects.public().filter(**area_filter)
+            .for_cards().order_by(*BROWSE_SORTS[DEFAULT_SORT][1])[:AREA_LISTINGS]
+        ),
+        tags=AREA_PAGE_TAGS,
+    )
+
+
+def region_page(request, region_slug):
+    # Old links used the display name (/area/KwaDlangezwa/); send them to the slug URL
+    region = _get_region(slugify(region_slug))
+    if region_slug != region.slug:
+        return redirect(region, permanent=True)
+
+    response = render(request, "seo/region_page.html", {
+        "region": region,
+        "stats": getattr(region, 'listing_stats', None),
+        "accommodations": _area_listings(f'region:{region.pk}', {'location__subregion__region': region}),
+    })
+    return cache_public_page(response, *AREA_PAGE_TAGS)
+
+def subregion_page(request, region_slug, sub_slug):
+    region = _get_region(slugify(region_slug))
+    normalized = slugify(sub_slug)
+    subregion = next((sub for sub in region.subregions.all() if sub.slug == normalized), None)
+    if subregion is None:
+        raise Http404("No Subregion matches the given query.")
+    subregion.region = region
+    if (region_slug, sub_slug) != (region.slug, subregion.slug):
+        return redirect(subregion, permanent=True)
+
+    response = render(request, "seo/subregion_page.html", {
         "region": region,
-        "subregion": subregion
+        "subregion": subregion,
+        "stats": getattr(subregion, 'listing_stats', None),
+        "accommodations": _area_listings(f'subregion:{subregion.pk}', {'location__subregion': subregion}),
     })
+    return cache_public_page(response, *AREA_PAGE_TAGS)
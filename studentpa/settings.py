@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 from logging import config
 import os
+import sys
 from dotenv import load_dotenv
 from pathlib import Path
 import dj_database_url
@@ -31,13 +32,22 @@ SECRET_KEY = os.getenv('SECURITY_KEY')
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.getenv('DEBUG')
 
+# Running `manage.py test` (which turns DEBUG off): production-only checks and
+# background threads that write to the database stay off
+TESTING = sys.argv[1:2] == ['test']
+
 # reCAPTCHA KEYS
 RECAPTCHA_PUBLIC_KEY = os.getenv('RECAPTCHA_PUBLIC_KEY')
 RECAPTCHA_PRIVATE_KEY = os.getenv('RECAPTCHA_PRIVATE_KEY')
 # SESSIONS
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
 SESSION_COOKIE_AGE = 1800
-SESSION_SAVE_EVERY_REQUEST = True
+# Sliding expiry without a DB write per request: sessions are read from the
+# cache and only re-saved when they change or have less than
+# SESSION_REFRESH_THRESHOLD seconds left (accommodations.middleware.LowWriteSessionMiddleware)
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_SAVE_EVERY_REQUEST = False
+SESSION_REFRESH_THRESHOLD = 1500
 # SESSION_COOKIE_SECURE = True    # Only if using HTTPS
 SESSION_COOKIE_HTTPONLY = True  # Always recommended
 
@@ -78,6 +88,7 @@ INSTALLED_APPS = [
     "django.contrib.sites",
     'accommodations',
     'django_recaptcha',
+    'django_q',
     'seo',
     
 
@@ -87,10 +98,15 @@ SITE_ID = 1
 MIDDLEWARE = [
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'seo.middleware.PrerenderedPageMiddleware',
+    'accommodations.middleware.ListingCounterMiddleware',
+    'accommodations.middleware.SearchLogMiddleware',
+    'accommodations.middleware.AnonymousPageCacheMiddleware',
+    'accommodations.middleware.LowWriteSessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accommodations.middleware.RoleMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -136,6 +152,58 @@ DATABASES = {
 }
 
 
+# Cache
+# Production needs Redis (REDIS_URL): cache tags bumped by the worker or another
+# web worker have to reach all of them, and page-cache hits and cached_db
+# sessions are only cheap if the cache isn't the database (see accommodations.checks).
+# Without REDIS_URL every process gets its own in-memory cache. That is fine for
+# local development with one web process and Q_SYNC=True, but changes made in
+# one process are not seen by the others until their entries expire.
+# accommodations.services.cache_service adds a short-lived in-process L1 on top.
+REDIS_URL = os.getenv('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'studentpa',
+            'TIMEOUT': 300,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'studentpa',
+            'TIMEOUT': 300,
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+
+CACHE_L1_TIMEOUT = int(os.getenv('CACHE_L1_TIMEOUT', 5))
+CACHE_L1_MAX_ENTRIES = int(os.getenv('CACHE_L1_MAX_ENTRIES', 512))
+
+
+# Background tasks (django-q), run with `python manage.py qcluster`.
+# Uses Redis as the broker when available, otherwise the database.
+# Q_SYNC=True runs tasks inline, handy for local development.
+Q_CLUSTER = {
+    'name': 'studentpa',
+    'workers': int(os.getenv('Q_WORKERS', 2)),
+    'timeout': 120,
+    'retry': 180,
+    # Failed tasks are presented again after `retry` seconds, this many times at most
+    'max_attempts': 5,
+    'queue_limit': 50,
+    'sync': os.getenv('Q_SYNC', 'False').lower() == 'true',
+}
+if REDIS_URL:
+    Q_CLUSTER['redis'] = REDIS_URL
+else:
+    Q_CLUSTER['orm'] = 'default'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -178,12 +246,47 @@ STATIC_DIR = [os.path.join(BASE_DIR, 'static'),
 
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
+# Anonymous full-page cache (accommodations.middleware.AnonymousPageCacheMiddleware);
+# pages are dropped as soon as their cache tags change, this is just an upper bound
+PAGE_CACHE_TIMEOUT = 600
+
+# Listing views/impressions are counted in memory and written to
+# ListingDailyStats this often (accommodations.services.listing_stats_service);
+# 0 starts no writer thread, counts are only written by flush() (tests)
+LISTING_COUNTER_FLUSH_INTERVAL = 0 if TESTING else 60
+
+# Search analytics (accommodations.services.search_analytics_service): searches
+# are logged from memory in batches, sampled above SEARCH_LOG_MAX_PER_SECOND per
+# process, and rolled up hourly by the worker
+SEARCH_LOG_FLUSH_INTERVAL = 60
+SEARCH_LOG_MAX_PER_SECOND = 20
+SEARCH_LOG_RETENTION_DAYS = 14
+
+# Static copies of the /area/ pages on each web host's disk, rebuilt by the web
+# processes when areas or listings change (seo.middleware serves them)
+PRERENDER_ROOT = BASE_DIR / 'prerendered'
+# Browser cache lifetime of the files, and the least time between two rebuilds
+# on a host (changes in between are served by the views)
+PRERENDER_MAX_AGE = 60
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Uploads are saved by the web processes and read back by the qcluster worker
+# (image renditions, proof of payment emails), which runs on its own dyno with
+# its own disk. Production needs storage both can reach: set MEDIA_STORAGE to a
+# shared backend (e.g. 'storages.backends.s3.S3Storage' and its AWS_* settings),
+# or Q_SYNC=True to run the tasks in the web process instead. Local disk is only
+# for development (checked by accommodations.E002).
+STORAGES = {
+    'default': {'BACKEND': os.getenv('MEDIA_STORAGE', 'django.core.files.storage.FileSystemStorage')},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+
 
 # email configuration
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# SMTP, but streams file attachments instead of building the whole message in memory
+EMAIL_BACKEND = 'accommodations.mail.StreamingSMTPBackend'
 EMAIL_HOST = os.getenv('EMAIL_HOST', 'smtp.gmail.com')
 EMAIL_PORT = int(os.getenv('EMAIL_PORT', 587))
 EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'True').lower() == 'true'
@@ -192,6 +295,12 @@ EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', EMAIL_HOST_USER)
 ADMIN_EMAIL = os.getenv('ADMIN_EMAIL', EMAIL_HOST_USER)
 
+# Landlord notifications (services/notification_service.py). Set the backend to
+# django.core.mail.backends.console.EmailBackend to print them locally
+NOTIFICATION_EMAIL_BACKEND = os.getenv('NOTIFICATION_EMAIL_BACKEND', EMAIL_BACKEND)
+NOTIFICATION_RATE_LIMIT = int(os.getenv('NOTIFICATION_RATE_LIMIT', 5))     # emails per second, 0 = unthrottled
+NOTIFICATION_BATCH_SIZE = int(os.getenv('NOTIFICATION_BATCH_SIZE', 100))   # emails per SMTP connection
+
 # Business Banking Details from Environment Variables
 BUSINESS_BANK_NAME = os.getenv('BUSINESS_BANK_NAME')
 BUSINESS_ACCOUNT_NAME = os.getenv('BUSINESS_ACCOUNT_NAME')
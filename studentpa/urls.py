@@ -21,7 +21,6 @@ from django.conf.urls.static import static
 from django.contrib.auth import views as auth_views
 from accommodations import views
 from django.views.generic import TemplateView
-from django.contrib.sitemaps.views import sitemap
 from accommodations.sitemaps import StaticViewSitemap, AccommodationSitemap
 from seo.sitemaps import RegionSitemap, SubregionSitemap
 
@@ -34,6 +33,7 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('', views.landing_page, name='home'),
     path("area/", include("seo.urls")),
+    path("api/v1/", include("accommodations.api_urls")),
 
 
     # Authentication URLs
@@ -47,6 +47,7 @@ urlpatterns = [
     # Accommodation URLs
     path('dashboard/profile/', views.landlord_profile_update, name='landlord_profile_update'),
     path('accommodations/', views.accommodation_list, name='accommodation_list'),
+    path('accommodations/suggest/', views.search_suggestions, name='search_suggestions'),
     path('accommodations/<int:pk>/', views.accommodation_detail, name='accommodation_detail'),
     path('dashboard/', views.landlord_dashboard, name='landlord_dashboard'),
     path('dashboard/accommodation/new/', views.accommodation_create, name='accommodation_create'),
@@ -81,7 +82,8 @@ sitemaps = {
 }
 
 urlpatterns += [
-    path("sitemap.xml", sitemap, {"sitemaps": sitemaps}, name="django.contrib.sitemaps.views.sitemap"),
+    path("sitemap.xml", views.sitemap_index, {"sitemaps": sitemaps}, name="sitemap_index"),
+    path("sitemap-<section>.xml", views.sitemap_section, {"sitemaps": sitemaps}, name="sitemap_section"),
 ]
 
 